@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import HealthProfile
+from .models import HealthProfile, ChatSession
 
 # Register your models here.
 
@@ -15,4 +15,13 @@ class HealthProfileAdmin(admin.ModelAdmin):
         'updated_at',
     )
     search_fields = ('user__username',)
-    list_filter = ('created_at', 'updated_at')
\ No newline at end of file
+    list_filter = ('created_at', 'updated_at')
+
+
+
+
+@admin.register(ChatSession)
+class ChatSessionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'session_id', 'created_at', 'updated_at')
+    search_fields = ('user__email', 'session_id')
+    readonly_fields = ('created_at', 'updated_at')
@@ -0,0 +1,260 @@
+"""
+Per-user, per-date context for StreamingChatAPIView.
+
+The profile, the active meal/workout plans and the requested date's entries are loaded with a
+fixed number of queries (7, however many plans, days and entries there are), rendered once to
+compact text (profile on one line, the day's entries as delimited tables) and cached per
+(user, date) for CHAT_CONTEXT_CACHE_SECONDS, so follow-up chat turns cost no database access.
+
+Cached contexts are invalidated per user by bumping a version number that is part of the
+cache key (AiChat.signals does it on Profile/plan/day/entry saves, after the transaction
+commits). Code that changes plans with queryset.update() or bulk_create() after the plan row
+was saved calls invalidate_chat_context() itself.
+
+Invalidation only reaches other worker processes through a shared cache (Redis, Memcached,
+database). With a process-local one (LocMemCache, the default) contexts are kept for
+CHAT_CONTEXT_LOCAL_CACHE_SECONDS only, so another worker serves a stale plan for seconds at most.
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Prefetch
+from accounts.models import Profile
+from meal.models import MealPlan, DailyMeal, MealEntry
+from workoutplan.models import WorkoutPlan, DailyWorkout, WorkoutEntry
+from Fitness.prompt_encoding import encode_rows, truncate_text
+
+logger = logging.getLogger(__name__)
+
+
+def _cache():
+    return caches[getattr(settings, 'CHAT_CONTEXT_CACHE', 'default')]
+
+
+
+
+def _timeout(cache):
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        return getattr(settings, 'CHAT_CONTEXT_LOCAL_CACHE_SECONDS', 5)
+    return getattr(settings, 'CHAT_CONTEXT_CACHE_SECONDS', 600)
+
+
+
+
+def _version_key(user_id):
+    return f"chat-context-version:{user_id}"
+
+
+
+
+def invalidate_chat_context(user_id):
+    """Forget every cached context of the user (all dates)."""
+    _cache().set(_version_key(user_id), time.time_ns(), None)
+
+
+
+
+def load_chat_context(user, requested_date):
+    """Profile (or None) and active meal/workout plans with only `requested_date`'s days and entries prefetched."""
+    profile = Profile.objects.filter(user=user).first()
+
+    meal_plans = list(
+        MealPlan.objects.filter(user=user, is_completed=False, is_cancelled=False).prefetch_related(
+            Prefetch('daily_meals', queryset=DailyMeal.objects.filter(date=requested_date).prefetch_related(
+                Prefetch('meals', queryset=MealEntry.objects.select_related('recipe').order_by('id'))
+            ))
+        )
+    )
+    workout_plans = list(
+        WorkoutPlan.objects.filter(user=user, is_completed=False, is_cancelled=False).prefetch_related(
+            Prefetch('daily_workouts', queryset=DailyWorkout.objects.filter(date=requested_date).prefetch_related(
+                Prefetch('workouts', queryset=WorkoutEntry.objects.select_related('workout').order_by('id'))
+            ))
+        )
+    )
+    return profile, meal_plans, workout_plans
+
+
+
+
+PROFILE_FIELDS = [
+    ("name", "fullname"), ("gender", "gender"), ("born", "date_of_birth"), ("weight", "weight"),
+    ("height", "height"), ("abdominal", "abdominal"), ("sacroiliac", "sacroiliac"),
+    ("subscapularis", "subscapularis"), ("triceps", "triceps"), ("fitness level", "fitness_level"),
+    ("interested workout", "interested_workout"), ("injuries", "injuries_discomfort"),
+    ("medical conditions", "medical_conditions"), ("diet", "dietary_preferences"),
+]
+MEAL_COLUMNS = [
+    "meal", "recipe", "type", "for", "time", "grams", "kcal", "protein g", "carbs g", "fat g",
+    "ingredients", "instructions", "status",
+]
+WORKOUT_COLUMNS = [
+    "workout", "body part", "type", "minutes", "kcal burn", "equipment", "sets", "reps", "benefits", "status",
+]
+TEXT_LIMIT = 100   # characters of ingredients/instructions/benefits sent per entry
+
+
+
+
+def _status(entry):
+    if getattr(entry, 'cancelled', False):
+        return "cancelled"
+    return "done" if entry.completed else "pending"
+
+
+
+
+def _twelve_hour(value):
+    return value.strftime("%I:%M %p").lstrip("0") if value else None
+
+
+
+
+def render_profile(profile):
+    """One line of the filled-in profile fields; allergies and goals are always stated."""
+    fields = [f"{label}: {getattr(profile, name)}" for label, name in PROFILE_FIELDS if getattr(profile, name) not in (None, '', [])]
+    fields.append(f"allergies: {', '.join(profile.allergies) if profile.allergies else 'none'}")
+    fields.append(f"goals: {', '.join(profile.fitness_goals) if profile.fitness_goals else 'not provided'}")
+    return "User profile: " + "; ".join(fields)
+
+
+
+
+def render_meal_plans(meal_plans, requested_date):
+    if not meal_plans:
+        return "Meal plan: none active."
+
+    parts = []
+    for plan in meal_plans:
+        parts.append(f"Meal plan '{plan.meal_plan_name}' {plan.start_date} to {plan.end_date}, tags: {plan.tags or 'none'}")
+        rows = []
+        for daily_meal in plan.daily_meals.all():
+            for entry in daily_meal.meals.all():
+                recipe = entry.recipe
+                if recipe:
+                    rows.append([
+                        entry.meal_type, recipe.recipe_name, recipe.recipe_type, recipe.for_time,
+                        _twelve_hour(entry.eating_time), entry.grams, recipe.calories, recipe.protein,
+                        recipe.carbs, recipe.fat, truncate_text(recipe.ingredients, TEXT_LIMIT),
+                        truncate_text(recipe.instructions, TEXT_LIMIT), _status(entry),
+                    ])
+                else:
+                    rows.append([
+                        entry.meal_type, "no recipe", None, None, _twelve_hour(entry.eating_time), entry.grams,
+                        None, None, None, None, truncate_text(entry.ingredients_en or entry.ingredients_es, TEXT_LIMIT),
+                        None, _status(entry),
+                    ])
+        if rows:
+            parts.append(f"Meals on {requested_date}:\n{encode_rows(MEAL_COLUMNS, rows)}")
+        else:
+            parts.append(f"No meals scheduled on {requested_date}.")
+    return "\n".join(parts)
+
+
+
+
+def render_workout_plans(workout_plans, requested_date):
+    if not workout_plans:
+        return "Workout plan: none active."
+
+    parts = []
+    for plan in workout_plans:
+        parts.append(f"Workout plan '{plan.workout_plan_name}' {plan.start_date} to {plan.end_date}, tags: {plan.tags or 'none'}")
+        rows, titles = [], []
+        for daily_workout in plan.daily_workouts.all():
+            titles.append(daily_workout.title)
+            for entry in daily_workout.workouts.all():
+                workout = entry.workout
+                if workout is None:
+                    continue
+                rows.append([
+                    workout.workout_name, workout.for_body_part, workout.workout_type,
+                    round(workout.time_needed.total_seconds() / 60) if workout.time_needed else None,
+                    workout.calories_burn, workout.equipment_needed or 'none', entry.set_of, entry.reps,
+                    truncate_text(workout.benefits, TEXT_LIMIT), _status(entry),
+                ])
+        if rows:
+            parts.append(f"Workouts on {requested_date} ({', '.join(titles)}):\n{encode_rows(WORKOUT_COLUMNS, rows)}")
+        else:
+            parts.append(f"No workouts scheduled on {requested_date}.")
+    return "\n".join(parts)
+
+
+
+
+def render_chat_context(profile, meal_plans, workout_plans, requested_date):
+    """The user's profile and plans for `requested_date`, each stated once, as compact text."""
+    return "\n".join([
+        f"Requested date: {requested_date}",
+        render_profile(profile),
+        render_meal_plans(meal_plans, requested_date),
+        render_workout_plans(workout_plans, requested_date),
+    ])
+
+
+
+
+def plan_day_snapshot(meal_plans, workout_plans):
+    """Plain-data view of the loaded day (cacheable), used for templated answers (AiChat.intents)."""
+    meals, workouts = [], []
+    for plan in meal_plans:
+        for daily_meal in plan.daily_meals.all():
+            for entry in daily_meal.meals.all():
+                recipe = entry.recipe
+                meals.append({
+                    "meal_type": entry.meal_type,
+                    "recipe": recipe.recipe_name if recipe else None,
+                    "eating_time": entry.eating_time.strftime("%H:%M") if entry.eating_time else None,
+                    "grams": float(entry.grams) if entry.grams else None,
+                    "calories": float(recipe.calories) if recipe and recipe.calories is not None else None,
+                    "completed": entry.completed,
+                })
+    for plan in workout_plans:
+        for daily_workout in plan.daily_workouts.all():
+            for entry in daily_workout.workouts.all():
+                if entry.workout is None:
+                    continue
+                workouts.append({
+                    "title": daily_workout.title,
+                    "name": entry.workout.workout_name,
+                    "sets": entry.set_of,
+                    "reps": entry.reps,
+                    "minutes": round(entry.workout.time_needed.total_seconds() / 60) if entry.workout.time_needed else None,
+                    "completed": entry.completed,
+                })
+    return {
+        "has_meal_plan": bool(meal_plans),
+        "has_workout_plan": bool(workout_plans),
+        "meals": meals,
+        "workouts": workouts,
+    }
+
+
+
+
+def get_chat_context(user, requested_date):
+    """
+    {"text", "day"} for the user on `requested_date` (render_chat_context's text and
+    plan_day_snapshot's data), from the cache when possible. None when the user has no profile.
+    """
+    cache = _cache()
+    version = cache.get(_version_key(user.pk), 0)
+    key = f"chat-context:v3:{user.pk}:{version}:{requested_date.isoformat()}"
+    context = cache.get(key)
+    if context is not None:
+        return context
+
+    profile, meal_plans, workout_plans = load_chat_context(user, requested_date)
+    if profile is None:
+        return None
+
+    context = {
+        "text": render_chat_context(profile, meal_plans, workout_plans, requested_date),
+        "day": plan_day_snapshot(meal_plans, workout_plans),
+    }
+    cache.set(key, context, _timeout(cache))
+    logger.info(f"Built chat context for user {user.pk} on {requested_date}")
+    return context
@@ -0,0 +1,130 @@
+"""
+Token-budgeted chat history.
+
+build_prompt() fits a chat turn into CHAT_PROMPT_TOKEN_BUDGET tokens: the system messages and
+the new user message always go in, then the session's rolling summary, then as many of the
+most recent stored turns (at most CHAT_SESSION_MAX_TURNS) as fit. Turns that are not sent are
+folded into the rolling summary by summarize_session(), which runs on a small background pool
+after the reply was sent; the session store keeps them until then. So the prompt size stays
+flat however long the conversation gets, and no turn is dropped before it was summarized.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import openai
+from django.conf import settings
+from django.db import connection
+from Fitness.prompt_encoding import estimate_tokens
+from .sessions import get_session_store
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_OVERHEAD_TOKENS = 4   # role and separators the API adds per message
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and a health and fitness "
+    "assistant. Merge the new messages into the existing summary. Keep facts the assistant may "
+    "need later (goals, preferences, problems, advice given, open questions); drop greetings and "
+    "plan listings. Answer with the summary only, at most {words} words."
+)
+_summary_pool = None
+_summary_pool_lock = threading.Lock()
+
+
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+
+
+def summary_message(summary):
+    return {"role": "system", "content": f"Summary of the earlier conversation: {summary}"}
+
+
+
+
+def build_prompt(system_messages, state, user_message, budget=None):
+    """
+    Messages for one turn within `budget` tokens (default CHAT_PROMPT_TOKEN_BUDGET), given
+    the session's SessionState. Only whole turns (user message first) are included.
+
+    Returns (messages, cutoff, tokens): cutoff is the number of the first stored message that
+    was sent; messages before it should be covered by the summary (see schedule_summary).
+    """
+    budget = budget or getattr(settings, 'CHAT_PROMPT_TOKEN_BUDGET', 6000)
+    head = list(system_messages)
+    if state.summary:
+        head.append(summary_message(state.summary))
+    used = sum(message_tokens(m) for m in head) + message_tokens(user_message)
+
+    kept = 0
+    window = state.messages[-2 * getattr(settings, 'CHAT_SESSION_MAX_TURNS', 10):]
+    for message in reversed(window):
+        cost = message_tokens(message)
+        if used + cost > budget:
+            break
+        used += cost
+        kept += 1
+    recent = state.messages[len(state.messages) - kept:]
+    while recent and recent[0]["role"] != "user":
+        used -= message_tokens(recent[0])
+        recent = recent[1:]
+
+    cutoff = state.total - len(recent)
+    return head + recent + [user_message], cutoff, used
+
+
+
+
+def summarize_session(user_id, session_id, upto):
+    """Fold the stored messages before number `upto` that the summary does not cover yet into it."""
+    store = get_session_store()
+    state = store.get_state(user_id, session_id)
+    first = state.total - len(state.messages)  # number of the oldest stored message
+    start = max(state.summary_upto, first)
+    if upto <= start:
+        return
+    pending = state.messages[start - first:upto - first]
+    if not pending:
+        return
+
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in pending)
+    words = getattr(settings, 'CHAT_SUMMARY_MAX_WORDS', 150)
+    chat = openai.ChatCompletion.create(
+        model="gpt-5-nano",
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT.format(words=words)},
+            {"role": "user", "content": f"Existing summary:\n{state.summary or '(none)'}\n\nNew messages:\n{transcript}"},
+        ],
+    )
+    summary = chat.choices[0].message.content.strip()
+    if summary:
+        store.set_summary(user_id, session_id, summary, upto)
+
+
+
+
+def _summarize_in_thread(user_id, session_id, upto):
+    try:
+        summarize_session(user_id, session_id, upto)
+    except Exception as e:
+        logger.error(f"Summarizing chat session {session_id} failed: {e}")
+    finally:
+        # The pool's threads each have their own DB connection
+        connection.close()
+
+
+
+
+def schedule_summary(user_id, session_id, state, cutoff):
+    """Summarize in the background if turns before `cutoff` are neither sent nor summarized."""
+    global _summary_pool
+    if cutoff <= state.summary_upto:
+        return
+    with _summary_pool_lock:
+        if _summary_pool is None:
+            _summary_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CHAT_SUMMARY_WORKERS', 2), thread_name_prefix='chat-summary'
+            )
+    _summary_pool.submit(_summarize_in_thread, user_id, session_id, cutoff)
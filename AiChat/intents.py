@@ -0,0 +1,297 @@
+"""
+Local intent router for the chatbot.
+
+Most chat messages are plan lookups ("what's my meal plan today?", "¿qué entrenamiento tengo
+mañana?"). classify() scores a message with keyword/regex rules in English and Spanish; when it
+is a lookup of the user's own plan (it asks something: "what", "show", "qué", a question mark,
+..., about "my" plan or what "I have"), the answer is rendered from the cached plan data of the
+requested date (AiChat.context, "day") and streamed without an LLM round trip. Anything
+open-ended ("why", "can I", "replace", ...), general ("for beginners", "best"), asking for a new
+plan ("give me", "create") or reporting a problem ("my knee hurts", "I skipped breakfast") goes
+to the LLM as before.
+
+Routed, cached (AiChat.response_cache) and LLM answers are counted in the cache
+(CHAT_CONTEXT_CACHE) with their latency, so router_metrics() can report the hit rates and the
+latency saved.
+"""
+import re
+from collections import namedtuple
+from datetime import datetime
+from django.conf import settings
+from django.core.cache import caches
+
+
+Intent = namedtuple('Intent', ['topic', 'language', 'score'])   # topic: "meal", "workout" or "both"
+
+# (pattern, language); language None when the word is the same in both
+MEAL_WORDS = [
+    (r"\bmeals?\b|\beat(ing)?\b|\bfood\b|\bbreakfast\b|\blunch\b|\bdinner\b|\bsnacks?\b|\bdiet\b|\brecipes?\b", "en"),
+    (r"\bcomidas?\b|\bcomer\b|\bdesayuno\b|\balmuerzo\b|\bcena\b|\bmerienda\b|\bdieta\b|\bmen[uú]\b|\brecetas?\b"
+     r"|\bqu[eé] (como|ceno)\b", "es"),
+]
+WORKOUT_WORDS = [
+    (r"\bworkouts?\b|\bexercises?\b|\btraining\b|\btrain\b|\bgym\b|\bsession\b", "en"),
+    (r"\bentrenamientos?\b|\bejercicios?\b|\bentrenar\b|\brutina\b|\bgimnasio\b", "es"),
+]
+# A lookup asks for something: a message needs one of these to be routed at all
+QUESTION_CUES = [
+    (r"^(what|which|when|show|list|tell|give|get)\b|\bwhat'?s\b|\bdo i have\b", "en"),
+    (r"^¿?(qu[eé]|cu[aá]l(es)?|cu[aá]ndo|mu[eé]strame|dime|ens[eé][ñn]ame)\b|\bqué\b|\bcuál(es)?\b", "es"),
+    (r"[¿?]", None),
+]
+# A lookup is about the user's own plan: a message needs one of these too
+SELF_REFERENCE = [
+    (r"\bmy\b|\bi have\b|\bi've got\b|\bam i\b", "en"),
+    (r"\bmis?\b|\btengo\b|\bme toca\b|\bqu[eé] (como|ceno|desayuno|entreno)\b", "es"),
+]
+# Scored cues of a lookup: (pattern, points, language)
+LOOKUP_CUES = [
+    (r"^(what|which|show|list|tell|give|get)\b|\bwhat'?s\b", 1, "en"),
+    (r"\bmy\b", 1, "en"),
+    (r"\btoday\b|\btonight\b|\btomorrow\b|\byesterday\b|\b\d{4}-\d{2}-\d{2}\b|\b(january|february|march|april|may|june|july|august|september|october|november|december)\b", 1, "en"),
+    (r"\bschedule\b|\bscheduled\b|\bhave\b", 1, "en"),
+    (r"^¿?(qu[eé]|cu[aá]l(es)?|mu[eé]strame|dime|ens[eé][ñn]ame)\b|\bqu[eé]\b", 1, "es"),
+    (r"\bmis?\b|\btengo\b|\bme toca\b", 1, "es"),
+    (r"\bhoy\b|\bma[ñn]ana\b|\bayer\b", 1, "es"),
+    (r"\bplan\b|\bprograma\b|\bprogramad[oa]s?\b", 1, None),
+]
+# Open-ended, general and generation requests and reported problems need the LLM whatever else the message contains
+OPEN_ENDED = [
+    (r"\bwhy\b|\bhow\b|\bshould\b|\bcould\b|\bcan i\b|\binstead\b|\breplace\b|\bswap\b|\bsubstitute\b|\bchange\b"
+     r"|\brecommend|\bsuggest|\bhealthy\b|\bbetter\b|\bcook\b|\bprepare\b|\bexplain\b|\bif\b"
+     r"|^(is|are|does|will|would|am)\b|\bprotein|\bcarb|\bfat\b|\bcalor|\ballerg|\bgluten|\bsugar"
+     r"|\bhurts?\b|\bpain|\b\w*ache|\bsore\b|\binjur|\bmissed\b|\bskipped\b|\bforgot\b"
+     r"|\bbest\b|\bfor (a |an |the )?(beginners?|vegetarians?|vegans?|women|men|kids|children|seniors|athletes|runners|people|someone|everyone)\b"
+     r"|\bgive me\b|\bcreate\b|\bmake me\b|\bgenerate\b|\bbuild\b|\bnew plan\b", "en"),
+    (r"\bpor qu[eé]\b|\bcómo\b|^¿?como (puedo|hago|se|debo|preparo|cocino)\b|\bdeber[ií]a\b|\bpuedo\b|\ben vez\b|\bcambiar\b|\bsustitu|\breemplaz"
+     r"|\brecomi[ée]nd|\bsugi[ée]r|\bsaludable\b|\bmejor\b|\bcocinar\b|\bpreparar\b|\bexplica|\bsi\b"
+     r"|^¿?(es|son|tiene|contiene)\b|\bprote[ií]na|\bcarbohidrat|\bgrasas?\b|\bcal[oó]r|\bal[ée]rg|\bgluten|\baz[uú]car"
+     r"|\bduel[ea]n?\b|\bdolor|\blesi[oó]n|\blastim|\bme salt[eé]\b|\bolvid[eé]\b|\bno (hice|com[ií])\b"
+     r"|\bpara (principiantes|vegetarian[oa]s|vegan[oa]s|mujeres|hombres|niñ[oa]s|mayores|deportistas|personas|alguien|todos)\b"
+     r"|\bdame\b|\bcrea(r|me)?\b|\bgenera(r|me)?\b|\bhazme\b|\bnuevo plan\b", "es"),
+]
+SPANISH_HINTS = r"[¿¡ñáéíóú]|\b(el|la|los|las|de|del|para|tengo|hoy|ma[ñn]ana|ayer|qu[eé]|mis?)\b"
+_COMPILED = {}
+
+
+
+
+def _re(pattern):
+    if pattern not in _COMPILED:
+        _COMPILED[pattern] = re.compile(pattern, re.IGNORECASE)
+    return _COMPILED[pattern]
+
+
+
+
+def _matches(rules, text):
+    return [language for pattern, language in rules if _re(pattern).search(text)]
+
+
+
+
+def classify(text):
+    """Intent of a plan lookup message, or None if the message should go to the LLM."""
+    text = text.strip().lower()
+    if not text or len(text) > getattr(settings, 'CHAT_INTENT_MAX_LENGTH', 120):
+        return None
+    if _matches(OPEN_ENDED, text):
+        return None
+
+    questions = _matches(QUESTION_CUES, text)
+    if not questions:
+        return None
+    own = _matches(SELF_REFERENCE, text)
+    if not own:
+        return None
+
+    meal, workout = _matches(MEAL_WORDS, text), _matches(WORKOUT_WORDS, text)
+    if not meal and not workout:
+        return None
+    topic = "both" if meal and workout else "meal" if meal else "workout"
+
+    score, languages = 0, meal + workout + questions + own
+    for pattern, points, language in LOOKUP_CUES:
+        if _re(pattern).search(text):
+            score += points
+            languages.append(language)
+    if score < getattr(settings, 'CHAT_INTENT_MIN_SCORE', 2):
+        return None
+
+    spanish = languages.count("es") + len(_re(SPANISH_HINTS).findall(text))
+    language = "es" if spanish > languages.count("en") else "en"
+    return Intent(topic, language, score)
+
+
+
+
+TEMPLATES = {
+    "en": {
+        "meal_title": "Here is your meal plan for {date}:",
+        "no_meal_plan": "You don't have an active meal plan yet.",
+        "no_meals": "There are no meals scheduled for {date}.",
+        "meal_line": "- {meal_type}{time}: {recipe}{details}{done}",
+        "no_recipe": "no recipe linked",
+        "workout_title": "Here is your workout for {date}{title}:",
+        "no_workout_plan": "You don't have an active workout plan yet.",
+        "no_workouts": "There are no workouts scheduled for {date}.",
+        "workout_line": "- {name}: {sets} sets x {reps} reps{minutes}{done}",
+        "done": " (done)",
+        "minutes": ", {minutes} min",
+    },
+    "es": {
+        "meal_title": "Este es tu plan de comidas para el {date}:",
+        "no_meal_plan": "Todavía no tienes un plan de comidas activo.",
+        "no_meals": "No hay comidas programadas para el {date}.",
+        "meal_line": "- {meal_type}{time}: {recipe}{details}{done}",
+        "no_recipe": "sin receta",
+        "workout_title": "Este es tu entrenamiento para el {date}{title}:",
+        "no_workout_plan": "Todavía no tienes un plan de entrenamiento activo.",
+        "no_workouts": "No hay entrenamientos programados para el {date}.",
+        "workout_line": "- {name}: {sets} series x {reps} repeticiones{minutes}{done}",
+        "done": " (hecho)",
+        "minutes": ", {minutes} min",
+    },
+}
+
+
+
+
+def _twelve_hour(hh_mm):
+    return datetime.strptime(hh_mm, "%H:%M").strftime("%I:%M %p").lstrip("0")
+
+
+
+
+def _number(value):
+    return f"{value:g}"
+
+
+
+
+def render_meals(day, requested_date, language):
+    t = TEMPLATES[language]
+    if not day["has_meal_plan"]:
+        return [t["no_meal_plan"]]
+    if not day["meals"]:
+        return [t["no_meals"].format(date=requested_date)]
+
+    lines = [t["meal_title"].format(date=requested_date)]
+    for meal in day["meals"]:
+        details = [f"{_number(meal['grams'])} g"] if meal["grams"] else []
+        if meal["calories"] is not None:
+            details.append(f"{_number(meal['calories'])} kcal")
+        lines.append(t["meal_line"].format(
+            meal_type=meal["meal_type"].capitalize(),
+            time=f" ({_twelve_hour(meal['eating_time'])})" if meal["eating_time"] else "",
+            recipe=meal["recipe"] or t["no_recipe"],
+            details=f" - {', '.join(details)}" if details else "",
+            done=t["done"] if meal["completed"] else "",
+        ))
+    return lines
+
+
+
+
+def render_workouts(day, requested_date, language):
+    t = TEMPLATES[language]
+    if not day["has_workout_plan"]:
+        return [t["no_workout_plan"]]
+    if not day["workouts"]:
+        return [t["no_workouts"].format(date=requested_date)]
+
+    title = day["workouts"][0]["title"]
+    lines = [t["workout_title"].format(date=requested_date, title=f" ({title})" if title else "")]
+    for workout in day["workouts"]:
+        lines.append(t["workout_line"].format(
+            name=workout["name"],
+            sets=workout["sets"],
+            reps=workout["reps"],
+            minutes=t["minutes"].format(minutes=workout["minutes"]) if workout["minutes"] else "",
+            done=t["done"] if workout["completed"] else "",
+        ))
+    return lines
+
+
+
+
+def render_answer(intent, day, requested_date):
+    """Templated answer to a lookup, as a list of lines."""
+    lines = []
+    if intent.topic in ("meal", "both"):
+        lines += render_meals(day, requested_date, intent.language)
+    if intent.topic == "both":
+        lines.append("")
+    if intent.topic in ("workout", "both"):
+        lines += render_workouts(day, requested_date, intent.language)
+    return lines
+
+
+
+
+def _metrics_cache():
+    return caches[getattr(settings, 'CHAT_CONTEXT_CACHE', 'default')]
+
+
+
+
+def _incr(cache, key, delta):
+    # cache.incr raises on a missing key; add() is a no-op when another worker created it first
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+
+
+ANSWER_KINDS = ("routed", "cached", "llm")   # intent router, semantic response cache, LLM
+
+
+
+
+def _metric_keys():
+    return [f"chat-router:{kind}:{field}" for kind in ANSWER_KINDS for field in ("count", "micros")]
+
+
+
+
+def record_answer(kind, seconds):
+    """Count one answer of `kind` (one of ANSWER_KINDS) and its latency."""
+    cache = _metrics_cache()
+    _incr(cache, f"chat-router:{kind}:count", 1)
+    _incr(cache, f"chat-router:{kind}:micros", int(seconds * 1_000_000))
+
+
+
+
+def router_metrics():
+    """
+    Answers per kind with their mean latency, the share answered without the LLM (hit_rate:
+    router, cache_hit_rate: response cache) and the latency saved (answers x (mean LLM latency -
+    mean latency of their kind)).
+    """
+    values = _metrics_cache().get_many(_metric_keys())
+    counts = {kind: values.get(f"chat-router:{kind}:count", 0) for kind in ANSWER_KINDS}
+    mean_ms = {
+        kind: values.get(f"chat-router:{kind}:micros", 0) / 1000 / counts[kind] if counts[kind] else None
+        for kind in ANSWER_KINDS
+    }
+    total = sum(counts.values())
+    saved = None
+    if mean_ms["llm"] is not None:
+        saved = sum(counts[kind] * (mean_ms["llm"] - mean_ms[kind]) for kind in ("routed", "cached") if counts[kind]) / 1000
+    return {
+        **counts,
+        "hit_rate": round(counts["routed"] / total, 4) if total else 0,
+        "cache_hit_rate": round(counts["cached"] / total, 4) if total else 0,
+        **{f"avg_{kind}_ms": round(mean_ms[kind], 2) if mean_ms[kind] is not None else None for kind in ANSWER_KINDS},
+        "latency_saved_seconds": round(saved, 2) if saved is not None else None,
+    }
+
+
+
+
+def reset_router_metrics():
+    _metrics_cache().delete_many(_metric_keys())
@@ -0,0 +1,82 @@
+import asyncio
+import statistics
+import time
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the chat endpoints over HTTP: concurrent chat requests against the sync view (chat/Ai/, "
+        "served by a WSGI server) and the async SSE view (chat/Ai/stream/, served by uvicorn), reporting "
+        "throughput, time to the first chunk and total time per request. Start both servers first, e.g. "
+        "`python manage.py runserver 8000` and `uvicorn Fitness.asgi:application --port 8001`. Every request "
+        "is a real chat turn against OpenAI; a plan lookup message measures the local intent router instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="User the requests are sent as (a JWT is issued for it).")
+        parser.add_argument("--sync-url", default="http://127.0.0.1:8000/chat/Ai/")
+        parser.add_argument("--async-url", default="http://127.0.0.1:8001/chat/Ai/stream/")
+        parser.add_argument("--only", choices=["sync", "async"], help="Benchmark one endpoint only.")
+        parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at a time.")
+        parser.add_argument("--message", default="Give me one short tip for drinking more water.")
+        parser.add_argument("--timeout", type=float, default=120.0, help="Seconds before a request counts as failed.")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).first()
+        if user is None:
+            raise CommandError(f"No user with email {options['email']}.")
+        token = str(RefreshToken.for_user(user).access_token)
+
+        targets = [("sync", options["sync_url"]), ("async SSE", options["async_url"])]
+        if options["only"]:
+            targets = [targets[0] if options["only"] == "sync" else targets[1]]
+
+        self.stdout.write(f"{'endpoint':<10} {'ok':>5} {'errors':>6} {'wall s':>7} {'req/s':>7} "
+                          f"{'first chunk p50/p95 ms':>24} {'total p50/p95 ms':>20}")
+        for label, url in targets:
+            self._report(label, *asyncio.run(self._run(url, token, options)), options)
+
+    async def _run(self, url, token, options):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        headers = {"Authorization": f"Bearer {token}"}
+
+        async def one_request(client, number):
+            async with semaphore:
+                started, first = time.perf_counter(), None
+                try:
+                    payload = {"message": options["message"], "session_id": f"bench-{number}"}
+                    async with client.stream("POST", url, json=payload, headers=headers) as response:
+                        if response.status_code != 200:
+                            return None
+                        async for chunk in response.aiter_text():
+                            if first is None and chunk.strip() and not chunk.startswith(("event: session", ":")):
+                                first = time.perf_counter() - started
+                except httpx.HTTPError:
+                    return None
+                return first, time.perf_counter() - started
+
+        limits = httpx.Limits(max_connections=options["concurrency"])
+        async with httpx.AsyncClient(timeout=options["timeout"], limits=limits) as client:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(one_request(client, n) for n in range(options["requests"])))
+            return time.perf_counter() - started, results
+
+    def _report(self, label, wall, results, options):
+        ok = [result for result in results if result is not None]
+        firsts = sorted(first * 1000 for first, _ in ok if first is not None)
+        totals = sorted(total * 1000 for _, total in ok)
+
+        def p50_p95(values):
+            if not values:
+                return "-"
+            return f"{statistics.median(values):.0f} / {values[max(0, int(len(values) * 0.95) - 1)]:.0f}"
+
+        self.stdout.write(
+            f"{label:<10} {len(ok):>5} {len(results) - len(ok):>6} {wall:>7.2f} {len(ok) / wall:>7.1f} "
+            f"{p50_p95(firsts):>24} {p50_p95(totals):>20}"
+        )
@@ -0,0 +1,42 @@
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from AiChat.sessions import UNSUMMARIZED_FACTOR, MemorySessionStore
+
+
+MESSAGE = "How many grams of protein should I eat after my leg day workout? " * 4
+
+
+class Command(BaseCommand):
+    help = "Measure memory and time of the in-process chat session store under many users/sessions."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=2000)
+        parser.add_argument("--sessions-per-user", type=int, default=5)
+        parser.add_argument("--messages", type=int, default=40, help="Messages appended per session.")
+        parser.add_argument("--max-sessions", type=int, default=1000)
+        parser.add_argument("--max-turns", type=int, default=10)
+
+    def handle(self, *args, **options):
+        store = MemorySessionStore(max_sessions=options["max_sessions"], max_turns=options["max_turns"], ttl=3600)
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        appends = 0
+        for user_id in range(options["users"]):
+            for session in range(options["sessions_per_user"]):
+                for _ in range(options["messages"] // 2):
+                    store.append(user_id, f"s{session}", [
+                        {"role": "user", "content": MESSAGE},
+                        {"role": "assistant", "content": MESSAGE},
+                    ])
+                    appends += 1
+        elapsed = time.perf_counter() - started
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        longest = max((len(store.get(*key)) for key in list(store._sessions)), default=0)
+        self.stdout.write(f"appends:           {appends} ({elapsed / appends * 1e6:.1f} µs each)")
+        self.stdout.write(f"sessions kept:     {len(store)} (limit {options['max_sessions']})")
+        self.stdout.write(f"longest session:   {longest} messages (limit {UNSUMMARIZED_FACTOR * 2 * options['max_turns']} without summaries)")
+        self.stdout.write(f"memory now / peak: {current / 1e6:.1f} MB / {peak / 1e6:.1f} MB")
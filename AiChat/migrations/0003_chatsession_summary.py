@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('AiChat', '0002_chatsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='message_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summary_upto',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
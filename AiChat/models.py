@@ -18,4 +18,25 @@ class HealthProfile(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"HealthProfile for {self.user.username}"
\ No newline at end of file
+        return f"HealthProfile for {self.user.username}"
+
+
+
+class ChatSession(models.Model):
+    """Stored user/assistant messages of one chatbot session (see AiChat.sessions)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_sessions')
+    session_id = models.CharField(max_length=64)
+    messages = models.JSONField(default=list)
+    summary = models.TextField(blank=True)  # rolling summary of the messages no longer sent to the LLM
+    summary_upto = models.PositiveIntegerField(default=0)  # number of messages the summary covers
+    message_count = models.PositiveIntegerField(default=0)  # messages ever appended
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'session_id')
+        indexes = [models.Index(fields=['updated_at'])]
+
+    def __str__(self):
+        return f"{self.user.email} - chat {self.session_id}"
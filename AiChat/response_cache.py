@@ -0,0 +1,240 @@
+"""
+Semantic cache of chatbot answers to general health questions.
+
+Questions that stand on their own ("how much water should I drink?", "is keto safe?": a health
+topic, no personal context, no reference to earlier turns like "why?" or "what about for kids?")
+are answered without the user's profile, plans or history (see prepare_chat), so the answer can
+be replayed to anyone who asks the same thing. Questions are normalized, reduced to their
+content words (stop words dropped, common paraphrases like "daily"/"per day" or "need"/"drink"
+folded together) and embedded as hashed word and character n-grams; a lookup is one
+matrix-vector product (cosine similarity, the rows are unit length) and hits at
+CHAT_RESPONSE_CACHE_THRESHOLD or above. Words that flip the meaning of an otherwise similar
+question (CONTRAST_WORDS) must match too, so "...a man eat to lose weight?" never gets the answer
+for a woman, for gaining weight or for burning calories.
+
+The index lives in the process, holds at most CHAT_RESPONSE_CACHE_SIZE answers (least recently
+used evicted first) and forgets answers older than CHAT_RESPONSE_CACHE_TTL_SECONDS.
+"""
+import re
+import threading
+import time
+import unicodedata
+import zlib
+import numpy as np
+from django.conf import settings
+
+
+DIMENSIONS = 1024
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+FILLER_WORDS = {"please", "hi", "hey", "hello", "thanks", "porfa", "hola", "gracias"}
+# Anything about the user, their plans or dates is personal context
+PERSONAL = re.compile(
+    r"\b(my|mine|myself|i'?m|i am|i have|i'?ve|i was|i weigh|i'?ll|we|our|me toca|mis?|m[ií]os?|tengo|soy|estoy|peso|yo)\b"
+    r"|\b(today|tonight|tomorrow|yesterday|hoy|ma[ñn]ana|ayer|plan|schedule|programa|rutina)\b"
+    r"|\d",
+    re.IGNORECASE,
+)
+# Follow-ups only make sense with the earlier turns ("why?", "tell me more", "is that healthy?",
+# "what about for kids?", "ok, and the second one?")
+FOLLOW_UP = re.compile(
+    r"^\W*(and|but|so|ok|okay|also|then|why|what about|how about|what if|y|pero|entonces|vale|tambi[eé]n|por qu[eé]|qu[eé] tal|y si)\b"
+    r"|\b(it|that|this|these|those|they|them|one|ones|above|previous|again|else|same|more|less|instead"
+    r"|eso|esto|ese|esa|esos|esas|este|esta|estos|estas|ello|anterior|otra vez|mismo|misma|m[aá]s|menos)\b",
+    re.IGNORECASE,
+)
+# A general question has to name a health topic
+HEALTH_TOPIC = re.compile(
+    r"\b(calor\w*|protein\w*|prote[ií]na\w*|carb\w*|fat|fats|grasas?|fib(er|re)|fibra|sugars?|az[uú]car\w*|salt|sodium|sal|sodio"
+    r"|vitamin\w*|mineral\w*|cholesterol|colesterol|keto\w*|diet\w*|fasting|ayuno|nutri\w*|food\w*|aliment\w*|comidas?"
+    r"|eat\w*|comer|fruits?|frutas?|vegetables?|verduras?|water|agua|hydrat\w*|hidrat\w*|caffeine|cafe[ií]na|alcohol"
+    r"|sleep\w*|dormir|sue[ñn]o|exercis\w*|ejercicios?|workouts?|entrenamientos?|train\w*|entren\w*|cardio|hiit|yoga"
+    r"|stretch\w*|estira\w*|run\w*|correr|walk\w*|caminar|muscles?|m[uú]sculos?|strength|fuerza|weight|peso|bmi|imc"
+    r"|metabol\w*|recovery|recuperaci[oó]n|injur\w*|lesi[oó]n\w*|heart|coraz[oó]n|blood|sangre|supplements?|suplementos?)\b",
+    re.IGNORECASE,
+)
+MIN_WORDS = 3
+# Words that do not change what a question asks; they are left out of the embedding
+STOP_WORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "do", "does", "did", "should", "can", "could", "would", "will",
+    "how", "what", "which", "when", "much", "many", "i", "you", "someone", "person", "people", "one", "to",
+    "of", "for", "in", "on", "at", "per", "with", "and", "or", "it", "there", "good", "ok", "okay", "really",
+    "el", "la", "los", "las", "un", "una", "es", "son", "de", "del", "para", "por", "en", "con", "y", "o",
+    "que", "cuanto", "cuanta", "cuantos", "cuantas", "como", "cual", "cuales", "debo", "debe", "puedo",
+    "se", "me", "te", "lo", "al", "each", "every", "cada", "todos",
+}
+# Paraphrases folded into one word before embedding
+SYNONYMS = {
+    "daily": "day", "everyday": "day", "days": "day", "diario": "dia", "diaria": "dia", "dias": "dia",
+    "drink": "intake", "eat": "intake", "need": "intake", "consume": "intake", "take": "intake",
+    "beber": "intake", "tomar": "intake", "comer": "intake", "necesito": "intake", "consumir": "intake",
+}
+# Words that flip what an otherwise similar question asks; the ones a question has must match for a hit
+CONTRAST_WORDS = {
+    "man", "men", "woman", "women", "male", "female", "boy", "girl", "kid", "child", "children", "teen", "adult",
+    "senior", "elderly", "pregnant", "hombre", "mujer", "nino", "nina", "adulto", "mayore", "embarazada",
+    "lose", "losing", "gain", "gaining", "perder", "ganar", "bajar", "subir",
+    "before", "after", "during", "antes", "despue", "durante",
+    "intake", "burn", "burning", "quemar",
+    "morning", "night", "evening", "noche", "tarde",
+    "high", "low", "alto", "bajo", "increase", "decrease", "aumentar", "reducir",
+    "safe", "dangerous", "seguro", "peligroso",
+}
+
+
+
+
+def normalize(text):
+    """Lowercase, accents and punctuation removed, fillers dropped, whitespace collapsed."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    words = _WHITESPACE.sub(' ', _PUNCTUATION.sub(' ', text)).split()
+    return ' '.join(word for word in words if word not in FILLER_WORDS)
+
+
+
+
+def content_words(normalized):
+    """The words of a normalized question that decide what it asks, in order (paraphrases folded, plural "s" dropped)."""
+    words = []
+    for word in normalized.split():
+        if word in STOP_WORDS:
+            continue
+        word = SYNONYMS.get(word, word)
+        words.append(word[:-1] if len(word) > 3 and word.endswith('s') else word)
+    return words
+
+
+
+
+def contrast_words(words):
+    return frozenset(word for word in words if word in CONTRAST_WORDS)
+
+
+
+
+def is_general_question(text):
+    """
+    True when the question stands on its own: it names a health topic, does not depend on the
+    user's data and does not refer to the conversation.
+    """
+    if not text.strip() or len(text) > getattr(settings, 'CHAT_RESPONSE_CACHE_MAX_LENGTH', 200):
+        return False
+    if PERSONAL.search(text) or FOLLOW_UP.search(text) or not HEALTH_TOPIC.search(text):
+        return False
+    return len(normalize(text).split()) >= MIN_WORDS
+
+
+
+
+def _features(normalized):
+    words = normalized.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return features
+
+
+
+
+def embed(normalized):
+    """Unit-length hashed n-gram vector of the content words of a normalized question."""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for feature in _features(' '.join(content_words(normalized)) or normalized):
+        vector[zlib.crc32(feature.encode()) % DIMENSIONS] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+
+
+class ResponseCache:
+    """Fixed-size vector index of (question, answer) pairs. Thread-safe."""
+
+    def __init__(self, size=None, ttl=None, threshold=None):
+        self.size = size or getattr(settings, 'CHAT_RESPONSE_CACHE_SIZE', 1000)
+        self.ttl = ttl or getattr(settings, 'CHAT_RESPONSE_CACHE_TTL_SECONDS', 24 * 60 * 60)
+        self.threshold = threshold or getattr(settings, 'CHAT_RESPONSE_CACHE_THRESHOLD', 0.85)
+        self._vectors = np.zeros((self.size, DIMENSIONS), dtype=np.float32)
+        self._entries = [None] * self.size          # row -> (question, answer, created_at, contrast words)
+        self._used = np.full(self.size, -np.inf)    # row -> last use (monotonic); -inf is free
+        self._rows = {}                             # normalized question -> row
+        self._lock = threading.Lock()
+
+    def _free(self, row):
+        self._rows.pop(self._entries[row][0], None)
+        self._entries[row] = None
+        self._vectors[row] = 0.0
+        self._used[row] = -np.inf
+
+    def lookup(self, question):
+        """
+        (answer, similarity) of the closest cached question with the same contrast words, or None
+        when there is none at the threshold or above.
+        """
+        normalized = normalize(question)
+        if not normalized:
+            return None
+        vector = embed(normalized)
+        words = contrast_words(content_words(normalized))
+        now = time.monotonic()
+        with self._lock:
+            if not self._rows:
+                return None
+            similarities = self._vectors @ vector
+            candidates = np.flatnonzero(similarities >= self.threshold)
+            for row in candidates[np.argsort(-similarities[candidates])]:
+                entry = self._entries[row]
+                if entry is None or entry[3] != words:
+                    continue
+                if now - entry[2] > self.ttl:
+                    self._free(row)
+                    continue
+                self._used[row] = now
+                return entry[1], float(similarities[row])
+            return None
+
+    def store(self, question, answer):
+        normalized = normalize(question)
+        if not normalized or not answer:
+            return
+        vector = embed(normalized)
+        now = time.monotonic()
+        with self._lock:
+            row = self._rows.get(normalized)
+            if row is None:
+                row = int(np.argmin(self._used))   # a free row, else the least recently used
+                if self._entries[row] is not None:
+                    self._free(row)
+            self._vectors[row] = vector
+            self._entries[row] = (normalized, answer, now, contrast_words(content_words(normalized)))
+            self._used[row] = now
+            self._rows[normalized] = row
+
+    def clear(self):
+        with self._lock:
+            for row in list(self._rows.values()):
+                self._free(row)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+
+
+def get_response_cache():
+    """The process-wide cache (None when CHAT_RESPONSE_CACHE is off)."""
+    global _cache
+    if not getattr(settings, 'CHAT_RESPONSE_CACHE', True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
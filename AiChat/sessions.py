@@ -0,0 +1,229 @@
+"""
+Chat session history for StreamingChatAPIView.
+
+Sessions belong to a user and are addressed by (user, session_id), so a session id can never
+reach another user's history. Only the user/assistant messages are stored; the system prompt
+and the per-request profile/plan context are added by the view. Every store keeps the last
+CHAT_SESSION_MAX_TURNS turns per session plus older ones the rolling summary does not cover yet
+(see AiChat.history), at most CHAT_SESSION_MAX_SESSIONS sessions (least recently used evicted
+first) and forgets sessions idle for CHAT_SESSION_TTL_SECONDS.
+
+Backends (settings.CHAT_SESSION_STORE):
+  "db"      ChatSession rows; shared by every process and node (default)
+  "memory"  in-process LRU; fast, but each process has its own sessions
+"""
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .models import ChatSession
+
+
+# messages: stored user/assistant messages (oldest first); total: messages ever appended, so
+# messages[0] is message number total - len(messages); summary covers messages [0, summary_upto)
+SessionState = namedtuple('SessionState', ['messages', 'summary', 'summary_upto', 'total'])
+EMPTY_STATE = SessionState([], "", 0, 0)
+UNSUMMARIZED_FACTOR = 3   # turns kept while the summary lags behind, as a multiple of max_turns
+
+
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+
+
+def _limits():
+    return (
+        getattr(settings, 'CHAT_SESSION_MAX_SESSIONS', 10000),
+        getattr(settings, 'CHAT_SESSION_MAX_TURNS', 10),
+        getattr(settings, 'CHAT_SESSION_TTL_SECONDS', 24 * 60 * 60),
+    )
+
+
+
+
+class SessionStore(ABC):
+    """Interface of the session backends. Returned lists are copies; callers may modify them."""
+
+    def __init__(self, max_sessions=None, max_turns=None, ttl=None):
+        default_sessions, default_turns, default_ttl = _limits()
+        self.max_sessions = max_sessions or default_sessions
+        self.max_turns = max_turns or default_turns
+        self.ttl = ttl or default_ttl
+
+    def _trim(self, messages, first, summary_upto):
+        """
+        Drop the oldest of `messages` (message number `first` onwards) beyond max_turns turns, but
+        only those the summary covers (number < summary_upto), so no turn is lost unsummarized.
+        If summaries keep failing, the session is still capped at UNSUMMARIZED_FACTOR * max_turns turns.
+        """
+        # A turn is one user message and one assistant reply
+        keep = 2 * self.max_turns
+        drop = max(0, min(len(messages) - keep, summary_upto - first))
+        drop = max(drop, len(messages) - UNSUMMARIZED_FACTOR * keep)
+        return messages[drop:]
+
+    def get(self, user_id, session_id):
+        """Stored messages of the session ([] for an unknown or expired session)."""
+        return self.get_state(user_id, session_id).messages
+
+    @abstractmethod
+    def get_state(self, user_id, session_id):
+        """SessionState of the session (EMPTY_STATE for an unknown or expired session)."""
+
+    @abstractmethod
+    def append(self, user_id, session_id, messages):
+        """Add messages to the session (created if needed), trimmed as described in _trim()."""
+
+    @abstractmethod
+    def set_summary(self, user_id, session_id, summary, upto):
+        """Store a rolling summary of messages [0, upto); ignored if a newer summary is stored."""
+
+    @abstractmethod
+    def delete(self, user_id, session_id):
+        """Forget the session."""
+
+
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store. Thread-safe; not shared between worker processes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sessions = OrderedDict()  # (user_id, session_id) -> (touched_at, SessionState)
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        entry = self._sessions.get(key)
+        if entry is None or now - entry[0] > self.ttl:
+            self._sessions.pop(key, None)
+            return None
+        return entry[1]
+
+    def get_state(self, user_id, session_id):
+        key = (user_id, session_id)
+        with self._lock:
+            state = self._live(key, time.monotonic())
+            if state is None:
+                return EMPTY_STATE
+            self._sessions.move_to_end(key)
+            return state._replace(messages=list(state.messages))
+
+    def append(self, user_id, session_id, messages):
+        key = (user_id, session_id)
+        now = time.monotonic()
+        with self._lock:
+            state = self._live(key, now) or EMPTY_STATE
+            self._sessions.pop(key, None)
+            self._sessions[key] = (now, state._replace(
+                messages=self._trim(state.messages + list(messages), state.total - len(state.messages), state.summary_upto),
+                total=state.total + len(messages),
+            ))
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def set_summary(self, user_id, session_id, summary, upto):
+        key = (user_id, session_id)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None and upto > entry[1].summary_upto:
+                self._sessions[key] = (entry[0], entry[1]._replace(summary=summary, summary_upto=upto))
+
+    def delete(self, user_id, session_id):
+        with self._lock:
+            self._sessions.pop((user_id, session_id), None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+
+
+class DatabaseSessionStore(SessionStore):
+    """ChatSession-backed store; works across processes and nodes."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._evicted_at = None
+        self._evict_lock = threading.Lock()
+
+    def _expired_before(self):
+        return timezone.now() - timedelta(seconds=self.ttl)
+
+    def get_state(self, user_id, session_id):
+        session = ChatSession.objects.filter(
+            user_id=user_id, session_id=session_id, updated_at__gte=self._expired_before()
+        ).only('messages', 'summary', 'summary_upto', 'message_count').first()
+        if session is None:
+            return EMPTY_STATE
+        return SessionState(list(session.messages), session.summary, session.summary_upto, session.message_count)
+
+    def append(self, user_id, session_id, messages):
+        # Row lock, so two replies finishing at the same time cannot drop each other's messages
+        with transaction.atomic():
+            session, created = ChatSession.objects.select_for_update().get_or_create(user_id=user_id, session_id=session_id)
+            if session.updated_at < self._expired_before():
+                session.messages, session.summary, session.summary_upto, session.message_count = [], "", 0, 0
+            first = session.message_count - len(session.messages)
+            session.messages = self._trim(session.messages + list(messages), first, session.summary_upto)
+            session.message_count += len(messages)
+            session.save(update_fields=['messages', 'summary', 'summary_upto', 'message_count', 'updated_at'])
+        if created:
+            self.maybe_evict()
+
+    def set_summary(self, user_id, session_id, summary, upto):
+        # No updated_at change: summarizing is not activity
+        ChatSession.objects.filter(user_id=user_id, session_id=session_id, summary_upto__lt=upto).update(
+            summary=summary, summary_upto=upto
+        )
+
+    def delete(self, user_id, session_id):
+        ChatSession.objects.filter(user_id=user_id, session_id=session_id).delete()
+
+    def maybe_evict(self):
+        """evict(), at most once per CHAT_SESSION_EVICT_INTERVAL_SECONDS in this process."""
+        interval = getattr(settings, 'CHAT_SESSION_EVICT_INTERVAL_SECONDS', 300)
+        now = time.monotonic()
+        with self._evict_lock:
+            if self._evicted_at is not None and now - self._evicted_at < interval:
+                return
+            self._evicted_at = now
+        self.evict()
+
+    def evict(self):
+        """Delete expired sessions and, when there are more than max_sessions, the least recently used ones."""
+        ChatSession.objects.filter(updated_at__lt=self._expired_before()).delete()
+        if ChatSession.objects.count() <= self.max_sessions:
+            return
+        stale = list(ChatSession.objects.order_by('-updated_at').values_list('pk', flat=True)[self.max_sessions:])
+        if stale:
+            ChatSession.objects.filter(pk__in=stale).delete()
+
+
+
+
+SESSION_STORES = {
+    "memory": MemorySessionStore,
+    "db": DatabaseSessionStore,
+}
+_store = None
+_store_lock = threading.Lock()
+
+
+
+
+def get_session_store():
+    """The process-wide store selected by settings.CHAT_SESSION_STORE."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SESSION_STORES[getattr(settings, 'CHAT_SESSION_STORE', 'db')]()
+        return _store
@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from accounts.models import Profile
+from meal.models import MealPlan, DailyMeal, MealEntry
+from workoutplan.models import WorkoutPlan, DailyWorkout, WorkoutEntry
+from .context import invalidate_chat_context
+
+
+def _invalidate(user_id):
+    # After commit, so a chat request running meanwhile cannot cache the old rows under the new version.
+    # A day or entry deleted with its plan finds no owner here; the plan's own post_delete covers it.
+    if user_id:
+        transaction.on_commit(lambda: invalidate_chat_context(user_id))
+
+
+
+
+@receiver([post_save, post_delete], sender=Profile)
+@receiver([post_save, post_delete], sender=MealPlan)
+@receiver([post_save, post_delete], sender=WorkoutPlan)
+def plan_owner_changed(sender, instance, **kwargs):
+    _invalidate(instance.user_id)
+
+
+
+
+@receiver([post_save, post_delete], sender=DailyMeal)
+def daily_meal_changed(sender, instance, **kwargs):
+    _invalidate(MealPlan.objects.filter(pk=instance.meal_plan_id).values_list('user_id', flat=True).first())
+
+
+
+
+@receiver([post_save, post_delete], sender=MealEntry)
+def meal_entry_changed(sender, instance, **kwargs):
+    _invalidate(DailyMeal.objects.filter(pk=instance.daily_meal_id).values_list('meal_plan__user_id', flat=True).first())
+
+
+
+
+@receiver([post_save, post_delete], sender=DailyWorkout)
+def daily_workout_changed(sender, instance, **kwargs):
+    _invalidate(WorkoutPlan.objects.filter(pk=instance.workout_plan_id).values_list('user_id', flat=True).first())
+
+
+
+
+@receiver([post_save, post_delete], sender=WorkoutEntry)
+def workout_entry_changed(sender, instance, **kwargs):
+    _invalidate(DailyWorkout.objects.filter(pk=instance.daily_workout_id).values_list('workout_plan__user_id', flat=True).first())
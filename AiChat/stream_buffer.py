@@ -0,0 +1,217 @@
+"""
+Resumable chat replies.
+
+A reply is produced by a background thread into a buffer in the cache (CHAT_STREAM_BUFFER_CACHE)
+keyed by a message id; the HTTP response only reads the buffer. If the client drops the
+connection the reply is still completed and saved, and the client can fetch the rest with
+read_buffer(message_id, offset), offset being the number of characters it already received,
+without a new LLM call.
+
+The buffer is a meta entry ({"user_id", "session_id", "started", "count", "done"}) and immutable chunks
+0..count-1. Deltas are coalesced into chunks of CHAT_STREAM_CHUNK_CHARS characters (or what
+arrived within CHAT_STREAM_FLUSH_SECONDS), a buffer has at most CHAT_STREAM_MAX_CHUNKS chunks
+(the rest of a reply goes into the last one) and expires CHAT_STREAM_BUFFER_TTL_SECONDS after
+its last write. Readers in the producing process are woken up on every flush; readers in other
+processes poll.
+
+Replies are produced on a pool of CHAT_STREAM_WORKERS threads per process; a reply waits in
+its queue while all of them are busy, and readers only count a stall once it started. Resuming
+from another worker process needs a cache shared between processes (Redis, Memcached,
+database): with a process-local one (LocMemCache, the default) replies are not buffered at all
+and ChatResumeAPIView refuses to resume, see buffer_is_shared().
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 0.25   # wait between cache reads of a reader that was not woken up
+_flushed = threading.Condition()
+_generation = 0       # flushes in this process, so readers do not sleep through one
+_producer_pool = None
+_producer_pool_lock = threading.Lock()
+
+
+
+
+def _cache():
+    return caches[getattr(settings, 'CHAT_STREAM_BUFFER_CACHE', 'default')]
+
+
+
+
+def buffer_is_shared():
+    """Whether other worker processes can read this process's buffers (CHAT_STREAM_BUFFER_CACHE is not process-local)."""
+    return not isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+
+
+def _ttl():
+    return getattr(settings, 'CHAT_STREAM_BUFFER_TTL_SECONDS', 300)
+
+
+
+
+def _meta_key(message_id):
+    return f"chat-stream:{message_id}"
+
+
+
+
+def _chunk_key(message_id, index):
+    return f"chat-stream:{message_id}:{index}"
+
+
+
+
+class StreamBuffer:
+    """Writer side of a buffer. Not thread-safe: one producer per message."""
+
+    def __init__(self, message_id, user_id, session_id):
+        self.message_id = message_id
+        self.meta = {"user_id": user_id, "session_id": session_id, "started": False, "count": 0, "done": False}
+        self.max_chunks = getattr(settings, 'CHAT_STREAM_MAX_CHUNKS', 1000)
+        self.chunk_chars = getattr(settings, 'CHAT_STREAM_CHUNK_CHARS', 64)
+        self.flush_seconds = getattr(settings, 'CHAT_STREAM_FLUSH_SECONDS', 0.05)
+        self._pending = ""
+        self._flushed_at = 0.0
+        _cache().set(_meta_key(message_id), self.meta, _ttl())
+
+    def start(self):
+        self.meta["started"] = True
+        self._flush()
+
+    def append(self, text):
+        self._pending += text
+        if self.meta["count"] >= self.max_chunks - 1:
+            return  # the last chunk takes the rest of the reply, written by finish()
+        if len(self._pending) >= self.chunk_chars or time.monotonic() - self._flushed_at >= self.flush_seconds:
+            self._flush()
+
+    def finish(self):
+        self.meta["done"] = True
+        self._flush()
+
+    def _flush(self):
+        values = {}
+        if self._pending:
+            values[_chunk_key(self.message_id, self.meta["count"])] = self._pending
+            self.meta["count"] += 1
+            self._pending = ""
+        values[_meta_key(self.message_id)] = dict(self.meta)
+        _cache().set_many(values, _ttl())
+        self._flushed_at = time.monotonic()
+        global _generation
+        with _flushed:
+            _generation += 1
+            _flushed.notify_all()
+
+
+
+
+def _produce(buffer, stream):
+    try:
+        buffer.start()
+        for text in stream:
+            buffer.append(text)
+    except Exception as e:
+        logger.error(f"Producing chat message {buffer.message_id} failed: {e}")
+    finally:
+        buffer.finish()
+
+
+
+
+def _produce_in_thread(buffer, stream):
+    try:
+        _produce(buffer, stream)
+    finally:
+        # The producer thread has its own DB connection (save_reply writes the session)
+        connection.close()
+
+
+
+
+def start_buffered_stream(user_id, session_id, stream, background=True):
+    """
+    Drain `stream` (a generator of text that saves the reply at its end, like text_chat_stream)
+    into a new buffer, on the producer pool unless `background` is False. Returns the message id.
+    """
+    global _producer_pool
+    message_id = uuid.uuid4().hex
+    buffer = StreamBuffer(message_id, user_id, session_id)
+    if background:
+        with _producer_pool_lock:
+            if _producer_pool is None:
+                _producer_pool = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'CHAT_STREAM_WORKERS', 8), thread_name_prefix='chat-stream'
+                )
+        _producer_pool.submit(_produce_in_thread, buffer, stream)
+    else:
+        _produce(buffer, stream)
+    return message_id
+
+
+
+
+def buffer_info(message_id, user_id):
+    """Meta of the user's buffer, or None when unknown, expired or someone else's."""
+    meta = _cache().get(_meta_key(message_id))
+    if meta is None or meta["user_id"] != user_id:
+        return None
+    return meta
+
+
+
+
+def read_buffer(message_id, offset=0):
+    """
+    Text of the reply from character `offset` on, as it is produced. Ends when the reply is
+    complete, the buffer expired or nothing was written for CHAT_STREAM_STALL_SECONDS since
+    its producer started (time spent waiting for a free producer thread does not count).
+    """
+    cache = _cache()
+    stall = getattr(settings, 'CHAT_STREAM_STALL_SECONDS', 120)
+    index, position = 0, 0
+    started, progressed_at = False, time.monotonic()
+    while True:
+        with _flushed:
+            seen = _generation
+        meta = cache.get(_meta_key(message_id))
+        if meta is None:
+            logger.warning(f"Chat message {message_id} expired while streaming")
+            return
+        if index < meta["count"]:
+            keys = [_chunk_key(message_id, i) for i in range(index, meta["count"])]
+            chunks = cache.get_many(keys)
+            for key in keys:
+                text = chunks.get(key)
+                if text is None:
+                    return
+                if position + len(text) > offset:
+                    yield text[max(0, offset - position):]
+                position += len(text)
+            index = meta["count"]
+            progressed_at = time.monotonic()
+            continue
+        if meta["done"]:
+            return
+        if not started:
+            # Waiting for a free producer thread is no stall: the clock starts with the producer
+            started = meta.get("started", False)
+            progressed_at = time.monotonic()
+        elif time.monotonic() - progressed_at > stall:
+            logger.warning(f"Chat message {message_id} stalled")
+            return
+        with _flushed:
+            if _generation == seen:
+                _flushed.wait(POLL_SECONDS)
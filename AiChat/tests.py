@@ -1,3 +1,377 @@
-from django.test import TestCase
+import tempfile
+import threading
+from datetime import date, timedelta
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import Profile, User
+from meal.models import MealPlan, DailyMeal, MealEntry
+from workoutplan.models import WorkoutPlan, DailyWorkout, WorkoutEntry
+from . import history, signals, stream_buffer
+from .context import get_chat_context
+from .intents import classify
+from .response_cache import ResponseCache, is_general_question
+from .models import ChatSession
+from .sessions import UNSUMMARIZED_FACTOR, DatabaseSessionStore, MemorySessionStore, SessionStore
+from .stream_buffer import StreamBuffer, read_buffer, start_buffered_stream
 
 # Create your tests here.
+
+
+
+
+class GeneralQuestionTests(SimpleTestCase):
+    def test_stand_alone_health_questions_are_general(self):
+        for text in [
+            "How much water should I drink a day?",
+            "Is keto safe for beginners?",
+            "How many calories should a man eat to lose weight?",
+            "¿Cuánta proteína necesita un adulto?",
+        ]:
+            with self.subTest(text=text):
+                self.assertTrue(is_general_question(text))
+
+    def test_follow_ups_are_not_general(self):
+        for text in [
+            "why?",
+            "tell me more",
+            "is that healthy?",
+            "what about for kids?",
+            "ok, and the second one?",
+            "¿y eso es sano?",
+            "¿por qué?",
+        ]:
+            with self.subTest(text=text):
+                self.assertFalse(is_general_question(text))
+
+    def test_personal_or_off_topic_questions_are_not_general(self):
+        for text in [
+            "What should I eat today?",
+            "Is my diet too low in protein?",
+            "I weigh 80 kg, how much water should I drink?",
+            "Who won the game yesterday?",
+            "What is the capital of France?",
+        ]:
+            with self.subTest(text=text):
+                self.assertFalse(is_general_question(text))
+
+
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = ResponseCache(size=10, ttl=60)
+
+    def test_rephrasing_hits(self):
+        self.cache.store("How much water should I drink per day?", "About 2 liters.")
+        hit = self.cache.lookup("how much water should i drink a day")
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit[0], "About 2 liters.")
+
+    def test_paraphrases_hit(self):
+        self.cache.store("How much water should I drink per day?", "About 2 liters.")
+        for text in [
+            "How much water should I drink daily?",
+            "How much water should I drink each day?",
+            "How much water should I drink every day",
+            "How much water do I need per day?",
+        ]:
+            with self.subTest(text=text):
+                self.assertEqual(self.cache.lookup(text)[0], "About 2 liters.")
+
+    def test_other_topics_do_not_hit(self):
+        self.cache.store("How much water should I drink per day?", "About 2 liters.")
+        self.cache.store("Is keto safe for beginners?", "keto")
+        for text in ["How much coffee should I drink per day?", "How much protein should I eat per day?",
+                     "Is fasting safe for beginners?"]:
+            with self.subTest(text=text):
+                self.assertIsNone(self.cache.lookup(text))
+
+    def test_near_miss_pairs_do_not_hit(self):
+        self.cache.store("How many calories should a man eat to lose weight?", "answer for men losing weight")
+        for text in [
+            "How many calories should a woman eat to lose weight?",
+            "How many calories should a man eat to gain weight?",
+            "How many calories should a man burn to lose weight?",
+        ]:
+            with self.subTest(text=text):
+                self.assertIsNone(self.cache.lookup(text))
+
+    def test_near_miss_pairs_keep_their_own_answers(self):
+        self.cache.store("Is cardio good before a workout?", "before")
+        self.cache.store("Is cardio good after a workout?", "after")
+        self.assertEqual(self.cache.lookup("is cardio good after a workout")[0], "after")
+        self.assertEqual(self.cache.lookup("Is cardio good before a workout?")[0], "before")
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ResponseCache(size=2, ttl=60)
+        cache.store("Is keto safe for beginners?", "keto")
+        cache.store("Is fasting safe for beginners?", "fasting")
+        cache.lookup("Is keto safe for beginners?")
+        cache.store("Is yoga safe for beginners?", "yoga")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.lookup("Is fasting safe for beginners?"))
+        self.assertEqual(cache.lookup("Is keto safe for beginners?")[0], "keto")
+
+
+
+
+def _turn(i):
+    return [{"role": "user", "content": f"u{i}"}, {"role": "assistant", "content": f"a{i}"}]
+
+
+
+
+class UnsummarizedTurnsTests(SimpleTestCase):
+    def setUp(self):
+        self.store = MemorySessionStore(max_turns=2)
+
+    def test_turns_are_kept_until_summarized(self):
+        for i in range(4):
+            self.store.append(1, "s", _turn(i))
+        self.assertEqual(len(self.store.get(1, "s")), 8)
+
+        self.store.set_summary(1, "s", "summary", 4)
+        self.store.append(1, "s", _turn(4))
+        state = self.store.get_state(1, "s")
+        self.assertEqual([m["content"] for m in state.messages][0], "u2")
+        self.assertEqual(state.total, 10)
+
+    def test_unsummarized_turns_are_capped(self):
+        for i in range(20):
+            self.store.append(1, "s", _turn(i))
+        self.assertEqual(len(self.store.get(1, "s")), 12)
+
+    def test_summary_behind_trimmed_messages_is_ignored(self):
+        for i in range(20):
+            self.store.append(1, "s", _turn(i))
+        with mock.patch.object(history, "get_session_store", return_value=self.store), \
+                mock.patch.object(history.openai.ChatCompletion, "create") as create:
+            history.summarize_session(1, "s", 10)
+        create.assert_not_called()
+        self.assertEqual(self.store.get_state(1, "s").summary_upto, 0)
+
+
+
+
+class IntentRouterTests(SimpleTestCase):
+    def test_plan_lookups_are_routed(self):
+        for text, topic, language in [
+            ("What's my meal plan today?", "meal", "en"),
+            ("show my workout for tomorrow", "workout", "en"),
+            ("do I have a workout today", "workout", "en"),
+            ("¿qué entrenamiento tengo mañana?", "workout", "es"),
+            ("qué como hoy", "meal", "es"),
+            ("muéstrame mis comidas de hoy", "meal", "es"),
+        ]:
+            with self.subTest(text=text):
+                intent = classify(text)
+                self.assertIsNotNone(intent)
+                self.assertEqual((intent.topic, intent.language), (topic, language))
+
+    def test_statements_and_symptoms_go_to_the_llm(self):
+        for text in [
+            "I have a headache after my workout",
+            "my knee hurts during my workout today",
+            "me duele la rodilla en mi entrenamiento de hoy",
+            "I skipped my breakfast today, what now?",
+            "Thanks for my meal plan!",
+            "¿cómo preparo mi cena de hoy?",
+            "what workouts do you have for beginners?",
+            "what meals do you have for vegetarians?",
+            "which diet plan is best for me",
+            "give me a meal plan for today",
+            "create my workout plan for tomorrow",
+            "¿qué comidas hay para vegetarianos?",
+            "dame un plan de comidas para hoy",
+        ]:
+            with self.subTest(text=text):
+                self.assertIsNone(classify(text))
+
+
+
+
+class SessionStoreContract:
+    """Behaviour every SessionStore backend must share; mixed into one TestCase per backend."""
+    store_class = None
+
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", email="alice@example.com")
+        self.bob = User.objects.create_user(username="bob", email="bob@example.com")
+        self.store = self.store_class(max_sessions=2, max_turns=2, ttl=60)
+
+    def expire(self, user_id, session_id):
+        raise NotImplementedError
+
+    def contents(self, user_id, session_id):
+        return [m["content"] for m in self.store.get(user_id, session_id)]
+
+    def test_append_and_turn_cap(self):
+        for i in range(3):
+            self.store.append(self.alice.pk, "s", _turn(i))
+        self.store.set_summary(self.alice.pk, "s", "summary", 6)
+        self.store.append(self.alice.pk, "s", _turn(3))
+        state = self.store.get_state(self.alice.pk, "s")
+        self.assertEqual([m["content"] for m in state.messages], ["u2", "a2", "u3", "a3"])
+        self.assertEqual((state.summary, state.summary_upto, state.total), ("summary", 6, 8))
+
+    def test_sessions_are_isolated_per_user(self):
+        self.store.append(self.alice.pk, "s", _turn(0))
+        self.assertEqual(self.store.get(self.bob.pk, "s"), [])
+        self.store.append(self.bob.pk, "s", _turn(1))
+        self.assertEqual(self.contents(self.alice.pk, "s"), ["u0", "a0"])
+        self.store.delete(self.bob.pk, "s")
+        self.assertEqual(self.contents(self.alice.pk, "s"), ["u0", "a0"])
+
+    def test_least_recently_used_session_is_evicted(self):
+        self.store.append(self.alice.pk, "first", _turn(0))
+        self.store.append(self.alice.pk, "second", _turn(1))
+        self.store.append(self.alice.pk, "first", _turn(2))
+        self.store.append(self.alice.pk, "third", _turn(3))
+        self.assertEqual(self.store.get(self.alice.pk, "second"), [])
+        self.assertEqual(self.contents(self.alice.pk, "first"), ["u0", "a0", "u2", "a2"])
+        self.assertEqual(self.contents(self.alice.pk, "third"), ["u3", "a3"])
+
+    def test_idle_sessions_expire(self):
+        self.store.append(self.alice.pk, "s", _turn(0))
+        self.expire(self.alice.pk, "s")
+        self.assertEqual(self.store.get_state(self.alice.pk, "s").total, 0)
+        self.store.append(self.alice.pk, "s", _turn(1))
+        self.assertEqual(self.contents(self.alice.pk, "s"), ["u1", "a1"])
+
+
+
+
+class MemorySessionStoreTests(SessionStoreContract, TestCase):
+    store_class = MemorySessionStore
+
+    def expire(self, user_id, session_id):
+        touched_at, state = self.store._sessions[(user_id, session_id)]
+        self.store._sessions[(user_id, session_id)] = (touched_at - 61, state)
+
+    def test_many_appends_stay_within_the_limits(self):
+        store = MemorySessionStore(max_sessions=50, max_turns=3, ttl=60)
+        for user_id in range(100):
+            for session in range(3):
+                for i in range(20):
+                    store.append(user_id, f"s{session}", _turn(i))
+        self.assertEqual(len(store), 50)
+        for user_id, session_id in list(store._sessions):
+            self.assertLessEqual(len(store.get(user_id, session_id)), UNSUMMARIZED_FACTOR * 2 * 3)
+
+
+
+
+@override_settings(CHAT_SESSION_EVICT_INTERVAL_SECONDS=0)
+class DatabaseSessionStoreTests(SessionStoreContract, TestCase):
+    store_class = DatabaseSessionStore
+
+    def expire(self, user_id, session_id):
+        ChatSession.objects.filter(user_id=user_id, session_id=session_id).update(
+            updated_at=timezone.now() - timedelta(seconds=61)
+        )
+
+    def test_eviction_is_throttled(self):
+        with override_settings(CHAT_SESSION_EVICT_INTERVAL_SECONDS=300), \
+                mock.patch.object(self.store, "evict") as evict:
+            for i in range(3):
+                self.store.append(self.alice.pk, f"s{i}", _turn(i))
+        self.assertEqual(evict.call_count, 1)
+
+    def test_store_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            SessionStore()
+
+
+
+
+class ChatResumeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", email="alice@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def resume(self, message_id, offset):
+        return self.client.get(reverse("chat-resume", args=[message_id]), {"offset": offset})
+
+    def test_process_local_cache_streams_without_buffer(self):
+        prepared = SimpleNamespace(answer="Hello there", save_reply=mock.Mock(), chat_history=None, prompt_tokens=0)
+        with mock.patch("AiChat.views.prepare_chat", return_value=prepared), \
+                mock.patch("AiChat.views.start_buffered_stream") as start:
+            response = self.client.post(reverse("chat"), {"message": "hi"}, format="json")
+            self.assertEqual(b"".join(response.streaming_content), b"Hello there")
+        start.assert_not_called()
+        self.assertNotIn("X-Message-Id", response)
+
+    def test_waiting_for_a_producer_is_not_a_stall(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CHAT_STREAM_STALL_SECONDS=0.05, CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory},
+        }):
+            buffer = StreamBuffer("m", self.user.pk, "s")
+            producer = threading.Timer(0.3, stream_buffer._produce, args=(buffer, iter(["late reply"])))
+            producer.start()
+            self.assertEqual("".join(read_buffer("m")), "late reply")
+            producer.join()
+
+    def test_process_local_cache_is_refused(self):
+        message_id = start_buffered_stream(self.user.pk, "s", iter(["Hello ", "there"]), background=False)
+        self.assertEqual(self.resume(message_id, 0).status_code, 501)
+
+    def test_shared_cache_resumes_from_offset(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory,
+        }}):
+            message_id = start_buffered_stream(self.user.pk, "s", iter(["Hello ", "there"]), background=False)
+            response = self.resume(message_id, 6)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(b"".join(response.streaming_content), b"there")
+
+
+
+
+class ChatContextInvalidationTests(TestCase):
+    def test_deleting_days_and_entries_invalidates(self):
+        user = User.objects.create_user(username="alice", email="alice@example.com")
+        meal_plan = MealPlan.objects.create(user=user, meal_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        workout_plan = WorkoutPlan.objects.create(user=user, workout_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        daily_meal = DailyMeal.objects.create(meal_plan=meal_plan, date=date.today())
+        daily_workout = DailyWorkout.objects.create(workout_plan=workout_plan, date=date.today())
+        meal_entry = MealEntry.objects.create(daily_meal=daily_meal, meal_type="lunch")
+        workout_entry = WorkoutEntry.objects.create(daily_workout=daily_workout)
+
+        for obj in [meal_entry, workout_entry, daily_meal, daily_workout]:
+            with self.subTest(model=type(obj).__name__), \
+                    mock.patch.object(signals, "invalidate_chat_context") as invalidate, \
+                    self.captureOnCommitCallbacks(execute=True):
+                obj.delete()
+            invalidate.assert_called_with(user.pk)
+
+
+
+
+class ChatContextCacheTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="alice", email="alice@example.com")
+        self.profile = Profile.objects.create(user=user, fullname="Alice")
+
+    def cached_for(self, cache_settings):
+        with override_settings(CACHES={"default": cache_settings}), \
+                mock.patch.object(caches["default"].__class__, "set", autospec=True) as cache_set:
+            self.assertIsNotNone(get_chat_context(self.profile.user, date.today()))
+        return cache_set.call_args.args[-1]
+
+    def test_process_local_cache_keeps_contexts_briefly(self):
+        with override_settings(CHAT_CONTEXT_LOCAL_CACHE_SECONDS=5):
+            timeout = self.cached_for({"BACKEND": "django.core.cache.backends.locmem.LocMemCache"})
+        self.assertEqual(timeout, 5)
+
+    def test_shared_cache_keeps_contexts_longer(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CHAT_CONTEXT_CACHE_SECONDS=600):
+            timeout = self.cached_for({
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory,
+            })
+        self.assertEqual(timeout, 600)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import StreamingChatAPIView
+from .views import StreamingChatAPIView, AsyncStreamingChatView, ChatResumeAPIView, ChatRouterMetricsView
 
 
 router = DefaultRouter()
@@ -8,4 +8,7 @@ router = DefaultRouter()
 urlpatterns = [
     path('', include(router.urls)),
     path('Ai/',  StreamingChatAPIView.as_view(), name='chat'),
+    path('Ai/stream/', AsyncStreamingChatView.as_view(), name='chat-stream'),
+    path('Ai/resume/<str:message_id>/', ChatResumeAPIView.as_view(), name='chat-resume'),
+    path('Ai/router-metrics/', ChatRouterMetricsView.as_view(), name='chat-router-metrics'),
 ]
\ No newline at end of file
@@ -4,17 +4,33 @@ from django.conf import settings
 import openai
 from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import JSONParser
-import time
+from rest_framework.response import Response
+import asyncio
+import json
 import logging
-from accounts.models import Profile
-from meal.models import MealPlan, DailyMeal, MealEntry
-from workoutplan.models import WorkoutPlan,DailyWorkout,WorkoutEntry
-from recipe.models import Recipe
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+import time
+from collections import namedtuple
 from datetime import date, timedelta
 import re
 from dateutil.parser import parse
+from .sessions import EMPTY_STATE, get_session_store, new_session_id
+from .context import get_chat_context
+from .history import build_prompt, schedule_summary
+from .intents import classify, render_answer, record_answer, router_metrics
+from .response_cache import get_response_cache, is_general_question
+from .stream_buffer import buffer_info, buffer_is_shared, read_buffer, start_buffered_stream
+from accounts.permissions import IsAdminRole
 
 # Swagger imports
 from drf_yasg.utils import swagger_auto_schema
@@ -25,19 +41,44 @@ logger = logging.getLogger(__name__)
 
 openai.api_key = settings.OPENAI_API_KEY
 
-# System prompt
+# System prompt. Static (no per-user data), so it is the same prefix on every request and
+# cacheable by the API; the user's profile and plans follow in a second system message.
 SYSTEM_PROMPT = {
     "role": "system",
     "content": (
-        "You are a professional health and fitness advisor. "
-        "User help cooking her recipe informations"
-        "Provide accurate, safe advice on diet, exercise, and meal planning. "
-        "Respond to every user message with a new, relevant response."
+        "You are a professional health and fitness advisor. Help the user cook their recipes. "
+        "Provide accurate, safe advice on diet, exercise, and meal planning, tailored to the user's "
+        "dietary preferences, allergies and fitness goals. Be encouraging. "
+        "Respond to every user message with a new, relevant response.\n"
+        "The next system message holds the user's profile and active plans for the requested date. "
+        "Plan entries are tables: a header row, then one row per entry, columns separated by '|'; "
+        "an empty cell means not specified.\n"
+        "When the user asks for their meal plan, list every meal entry of the requested date with "
+        "all its details: meal, recipe, type, for, eating time (12-hour clock), total food weight, "
+        "ingredients with their weights, calories and macros, instructions and status. "
+        "Do not omit meal plan details unless explicitly requested."
     )
 }
 
-SESSION_CHAT_HISTORY = {}
-print(SESSION_CHAT_HISTORY)
+
+
+
+# System prompt of general questions (AiChat.response_cache): sent without any user data, so
+# the answer can be replayed to every user asking the same question.
+GENERAL_SYSTEM_PROMPT = {
+    "role": "system",
+    "content": (
+        "You are a professional health and fitness advisor. Provide accurate, safe, general "
+        "advice on diet, exercise, and meal planning. You know nothing about the user: do not "
+        "assume their profile, plans or goals; mention briefly when the answer depends on them."
+    )
+}
+
+
+
+
+PreparedChat = namedtuple('PreparedChat', ['chat_history', 'save_reply', 'answer', 'prompt_tokens'])
+
 
 def get_requested_date(user_input):
     """
@@ -53,6 +94,15 @@ def get_requested_date(user_input):
         return date.today() + timedelta(days=1)
     elif "yesterday" in user_input:
         return date.today() - timedelta(days=1)
+    # Spanish ("esta mañana" is this morning)
+    elif re.search(r'\bpasado ma[ñn]ana\b', user_input):
+        return date.today() + timedelta(days=2)
+    elif re.search(r'\bhoy\b|\besta ma[ñn]ana\b', user_input):
+        return date.today()
+    elif re.search(r'\bma[ñn]ana\b', user_input):
+        return date.today() + timedelta(days=1)
+    elif re.search(r'\bayer\b', user_input):
+        return date.today() - timedelta(days=1)
 
     try:
         parsed_date = parse(user_input, fuzzy=True).date()
@@ -66,7 +116,7 @@ def get_requested_date(user_input):
 
 
 class StreamingChatAPIView(APIView):
-    permission_classes = [AllowAny]
+    permission_classes = [IsAuthenticated]
     parser_classes = [JSONParser]
 
     @swagger_auto_schema(
@@ -77,256 +127,358 @@ class StreamingChatAPIView(APIView):
             required=["message"],
             properties={
                 "message": openapi.Schema(type=openapi.TYPE_STRING, description="User message to the health chatbot"),
-                "session_id": openapi.Schema(type=openapi.TYPE_STRING, description="Unique session ID (optional)")
+                "session_id": openapi.Schema(type=openapi.TYPE_STRING, description="Session ID from the X-Session-Id header of an earlier reply (optional)")
             },
         ),
-        responses={200: "Streaming text response"}
+        responses={200: "Streaming text response; the session id is returned in the X-Session-Id header and the "
+                        "message id (for Ai/resume/<message_id>/, when the server can resume replies) in X-Message-Id"}
     )
     def post(self, request):
         user_input = request.data.get("message")
-        session_id = request.data.get("session_id", str(time.time()))  # Unique session_id if not provided
+        session_id = str(request.data.get("session_id") or new_session_id())[:64]
 
         if not user_input:
             return StreamingHttpResponse("error: no input", status=400)
 
-        # Initialize or get chat history
-        if session_id not in SESSION_CHAT_HISTORY:
-            SESSION_CHAT_HISTORY[session_id] = [SYSTEM_PROMPT]
+        prepared = prepare_chat(request.user, user_input, session_id)
+        if prepared is None:
+            return StreamingHttpResponse("error: profile not found", status=404)
+
+        if prepared.answer is not None:
+            stream = local_chat_stream(prepared.answer, prepared.save_reply)
         else:
-            # Ensure the system prompt is always included
-            if SESSION_CHAT_HISTORY[session_id][0] != SYSTEM_PROMPT:
-                SESSION_CHAT_HISTORY[session_id].insert(0, SYSTEM_PROMPT)
-
-        chat_history = SESSION_CHAT_HISTORY[session_id]
-
-        max_history_length = 5
-        chat_history = chat_history[-max_history_length:]
-
-        requested_date = get_requested_date(user_input)
-        print(requested_date)
-        logger.info(f"Requested date for meal plan: {requested_date}")
-
-        # Inject personalized data if authenticated
-        profile = Profile.objects.get(user=request.user)
-
-        # Build profile summary (basic, for context)
-        profile_summary = f"""
-                User Profile:
-                - Name: {profile.fullname or 'Not provided'}
-                - gender: {profile.gender or 'Not provided'}
-                - date_of_birth: {profile.date_of_birth or 'Not provided'}
-                - weight: {profile.weight or 'Not provided'}
-                - height: {profile.height or 'Not provided'}
-                - abdominal: {profile.abdominal or 'Not provided'}
-                - sacroiliac: {profile.sacroiliac or 'Not provided'}
-                - subscapularis: {profile.subscapularis or 'Not provided'}
-                - triceps: {profile.triceps or 'Not provided'}
-                - fitness_level: {profile.fitness_level or 'Not provided'}
-                - interested_workout: {profile.interested_workout or 'Not provided'}
-                - injuries_discomfort: {profile.injuries_discomfort or 'Not provided'}
-                - medical_conditions: {profile.medical_conditions or 'Not provided'}
-                - Dietary Preferences: {profile.dietary_preferences or 'Not provided'}
-                - Allergies: {', '.join(profile.allergies) if profile.allergies else 'None'}
-                - Fitness Goals: {', '.join(profile.fitness_goals) if profile.fitness_goals else 'Not provided'}
-        """
-        
-        # Call the function to get meal plan summary
-        meal_plan_summary = self.get_meal_plan_summary(request, requested_date)
-        workout_plan_summary = self.get_workout_plan_summary(request, requested_date)
-        
-        full_context = {
-            "role": "system",
-            "content": f"""
-                You are a professional health and fitness advisor AI.
-                {profile_summary}
-                {meal_plan_summary}
-                {workout_plan_summary}   
-                Provide a detailed summary of the user's meal plan for the requested date ({requested_date}), including all meal entries, recipes, and nutritional details. Ensure the response is accurate, encouraging, and tailored to the user's dietary preferences, allergies, and fitness goals. Do not omit any meal plan details unless explicitly requested.
-                when you give response give the {meal_plan_summary} in the response when the user asks for her meal plan or any sort of meal plan..strictly follow this rule..
-                {meal_plan_summary} must be send  Meal,Recipe,Category,Type,For,Tags,Eating Time,Total Food Weight for Today,Ingredients,Ingredients_weight,InstructionsCompleted,..
-                Ingredients_weight must be send..
-                Eating Time show as 12 hours..
-            """
-        }
-
-        # Insert user context after the system prompt
-        chat_history.insert(1, full_context)
-
-        # Add user message
-        chat_history.append({"role": "user", "content": user_input})
-
-        logger.info(f"Received message: {user_input}, session_id: {session_id}")
-
-        # Define a generator to stream the response
-        def event_stream():
-            try:
-                response = openai.ChatCompletion.create(
-                    model="gpt-5-nano",
-                    messages=chat_history,
-                    # temperature=0.1,
-                    stream=True
-                )
-
-                full_reply = ""
-                for chunk in response:
-                    if 'choices' in chunk and len(chunk['choices']) > 0:
-                        delta = chunk['choices'][0]['delta']
-                        if 'content' in delta:
-                            content = delta['content']
-                            full_reply += content
-                            logger.debug(f"Streaming chunk: {content}")
-                            yield content
-                            time.sleep(0.05)  # Reduced delay for smoother streaming
-
-                chat_history.append({"role": "assistant", "content": full_reply})
-                logger.info(f"Completed response: {full_reply}, session_id: {session_id}")
-
-            except Exception as e:
-                error_msg = f"\n[ERROR]: {str(e)}"
-                logger.error(f"Error in stream: {str(e)}, session_id: {session_id}")
-                yield error_msg
-
-        return StreamingHttpResponse(event_stream(), content_type='text/plain')
-
-    def get_meal_plan_summary(self, request, requested_date):
-        meal_plan_summary = ""
-        if request.user and request.user.is_authenticated:
-            try:
-                active_plans = MealPlan.objects.filter(
-                    user=request.user,
-                    is_completed=False,
-                    is_cancelled=False,        
-                )
-
-                # Log active plans for debugging
-                logger.info(f"Requested date for meal plan: {requested_date}")
-                logger.info(f"Active meal plans for today: {active_plans}")
-
-                # Build meal plan summary for today
-                if not active_plans:
-                    meal_plan_summary = "No active meal plans for today."
-                    logger.warning(f"No active meal plans for user: {request.user.email}")
-                else:
-                    for plan in active_plans:
-                        meal_plan_summary += f"""
-                            Active Meal Plan: '{plan.meal_plan_name}'
-                            - Duration: {plan.start_date} to {plan.end_date}
-                            - Tags: {plan.tags or 'None'}
-                        """
-                        # Fetch daily meals for today only
-                        daily_meals = DailyMeal.objects.filter(meal_plan=plan, date=requested_date)
-                        
-                        logger.info(f"Today's daily meals: {daily_meals}")
-
-                        if not daily_meals:
-                            meal_plan_summary += "\nNo meals scheduled for today."
-                            logger.warning(f"No meals scheduled for today for user: {request.user.email}")
-                        else:
-                            for daily_meal in daily_meals:
-                                meal_plan_summary += f"\nToday's Meal Schedule ({daily_meal.date}):"
-                                # Fetch meal entries for today
-                                meal_entries = MealEntry.objects.filter(daily_meal=daily_meal)
-                                logger.info(f"Meal entries for today: {meal_entries}")
-
-                                if not meal_entries:
-                                    meal_plan_summary += "\nNo meal entries for today."
-                                    logger.warning(f"No meal entries found for user: {request.user.email}")
-                                else:
-                                    for entry in meal_entries:
-                                        recipe = entry.recipe
-                                        if recipe:
-                                            meal_plan_summary += f"""
-                                                - Meal: {entry.meal_type}
-                                                - Recipe: {recipe.recipe_name}
-                                                - Type: {recipe.recipe_type}
-                                                - For: {recipe.for_time}
-                                                - Eating Time: {entry.eating_time or 'Not specified'}
-                                                - Total Food Weight for Today: {entry.grams if entry.grams else 'Not specified'}
-                                                - Ingredients: {recipe.ingredients[:100] + '...' if recipe.ingredients else 'None'}
-                                                - Calories: {recipe.calories} kcal
-                                                - Protein: {recipe.protein}g
-                                                - Carbs: {recipe.carbs}g
-                                                - Fat: {recipe.fat}g
-                                                - Instructions: {recipe.instructions[:100] + '...' if recipe.instructions else 'None'}
-                                                - Completed: {entry.completed}
-                                            """
-                                        else:
-                                            meal_plan_summary += f"""
-                                                - Meal: {entry.meal_type}
-                                                - No recipe linked.
-                                                - Eating Time: {entry.eating_time or 'Not specified'}
-                                                - Grams: {entry.grams or 'Not specified'}
-                                                - Ingredients (EN): {entry.ingredients_en or 'Not provided'}
-                                                - Ingredients (ES): {entry.ingredients_es or 'Not provided'}
-                                                - Completed: {entry.completed}
-                                                - Cancelled: {entry.cancelled}
-                                            """
-            except Exception as e:
-                meal_plan_summary = f"Error retrieving meal plan: {str(e)}"
-                logger.error(f"Error fetching meal plan for user {request.user.email}: {str(e)}")
-
-        return meal_plan_summary
-
-   
-    
-    def get_workout_plan_summary(self, request, requested_date):
-        workout_plan_summary = ""
-        if request.user and request.user.is_authenticated:
-            try:
-                profile = Profile.objects.get(user=request.user)
-                active_workout_plans = WorkoutPlan.objects.filter(
-                    user=request.user,
-                    is_completed=False,
-                    is_cancelled=False,
-                )
-
-                if not active_workout_plans:
-                    workout_plan_summary = "No active workout plans for today."
-                    logger.warning(f"No active workout plans for user: {request.user.email}")
-                else:
-                    for plan in active_workout_plans:
-                        workout_plan_summary += f"""
-                            Active Workout Plan: '{plan.workout_plan_name}'
-                            - Duration: {plan.start_date} to {plan.end_date}
-                            - Tags: {plan.tags or 'None'}
-                        """
-
-                        # Fetch daily workouts for today
-                        daily_workouts = DailyWorkout.objects.filter(workout_plan=plan, date=requested_date)
-                        
-                        if not daily_workouts:
-                            workout_plan_summary += "\nNo workouts scheduled for today."
-                            logger.warning(f"No workouts scheduled for today for user: {request.user.email}")
-                        else:
-                            for daily_workout in daily_workouts:
-                                workout_plan_summary += f"\nToday's Workout ({daily_workout.date}):"
-                                # Fetch workout entries for today
-                                workout_entries = WorkoutEntry.objects.filter(daily_workout=daily_workout)
-
-                                if not workout_entries:
-                                    workout_plan_summary += "\nNo workout entries for today."
-                                    logger.warning(f"No workout entries found for user: {request.user.email}")
-                                else:
-                                    for entry in workout_entries:
-                                        workout_plan_summary += f"""
-                                            - Workout: {entry.workout.workout_name}
-                                            - For body part: {entry.workout.for_body_part}
-                                            - Time Needed: {entry.workout.time_needed}
-                                            - workout type: {entry.workout.workout_type}
-                                            - Calories Burn: {entry.workout.calories_burn}
-                                            - Equipment Needed: {entry.workout.equipment_needed}
-                                            - Benefits: {entry.workout.benefits}
-                                            - Sets: {entry.set_of}
-                                            - Reps: {entry.reps}
-                                            - Completed: {entry.completed}
-                                        """
-            except Exception as e:
-                logger.error(f"Failed to load workout data: {e}")
-                workout_plan_summary = "Error retrieving workout plan data for today."
-
-        return workout_plan_summary
+            stream = text_chat_stream(prepared.chat_history, prepared.save_reply, session_id)
+
+        # With a shared cache the reply is produced into a buffer, so it survives a dropped
+        # connection (see ChatResumeAPIView); a process-local cache could not serve a resume
+        message_id = None
+        if buffer_is_shared():
+            message_id = start_buffered_stream(
+                request.user.pk, session_id, stream, background=prepared.answer is None
+            )
+            stream = read_buffer(message_id)
+        response = StreamingHttpResponse(stream, content_type='text/plain')
+        response["X-Session-Id"] = session_id
+        if message_id:
+            response["X-Message-Id"] = message_id
+        response["X-Prompt-Tokens"] = str(prepared.prompt_tokens)
+        return response
 
 
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncStreamingChatView(View):
+    """
+    ASGI-native version of StreamingChatAPIView: the completion is streamed with the async
+    OpenAI client as Server-Sent Events, so a stream holds no worker thread while it waits
+    for tokens. Authentication is the project's DRF authentication (JWT).
+
+    Events: "session" {"session_id"}, unnamed {"delta"} per chunk, "done" {}, "error"
+    {"detail"}; a ": keep-alive" comment is sent every CHAT_SSE_KEEPALIVE_SECONDS without
+    tokens. When the client disconnects the OpenAI request is cancelled.
+
+    Needs an ASGI server (`uvicorn Fitness.asgi:application`): under WSGI Django would buffer
+    the whole stream, so the view answers 501 there instead.
+    """
+
+    async def post(self, request):
+        if not isinstance(request, ASGIRequest):
+            logger.error("AsyncStreamingChatView called under WSGI; serve Fitness.asgi:application with an ASGI server.")
+            return JsonResponse(
+                {"detail": "This endpoint needs the ASGI server; use chat/Ai/ under WSGI."}, status=501
+            )
+
+        drf_request = Request(
+            request,
+            parsers=[JSONParser()],
+            authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+        )
+        try:
+            user, data = await sync_to_async(lambda: (drf_request.user, drf_request.data))()
+        except (AuthenticationFailed, ParseError) as e:
+            return JsonResponse({"detail": str(e.detail)}, status=e.status_code)
+        if not user or not user.is_authenticated:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        user_input = data.get("message")
+        session_id = str(data.get("session_id") or new_session_id())[:64]
+        if not user_input:
+            return JsonResponse({"detail": "message is required."}, status=400)
+
+        prepared = await sync_to_async(prepare_chat)(user, user_input, session_id)
+        if prepared is None:
+            return JsonResponse({"detail": "Profile not found."}, status=404)
+
+        if prepared.answer is not None:
+            stream = sse_local_stream(prepared.answer, prepared.save_reply, session_id)
+        else:
+            stream = sse_chat_stream(prepared.chat_history, prepared.save_reply, session_id)
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx must not buffer the stream
+        response["X-Session-Id"] = session_id
+        response["X-Prompt-Tokens"] = str(prepared.prompt_tokens)
+        return response
+
+
+
+
+class ChatResumeAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Continue a chat reply after a dropped connection: streams the reply from `offset` "
+                              "(characters already received) on, without a new AI call. Replies are kept for a few minutes. "
+                              "Needs a cache shared between worker processes (CHAT_STREAM_BUFFER_CACHE).",
+        tags=["Health Chatbot"],
+        manual_parameters=[
+            openapi.Parameter('offset', openapi.IN_QUERY, description="Characters of the reply already received (default 0)", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: "Streaming text response (rest of the reply)", 400: "Invalid offset", 404: "Unknown or expired message", 501: "Reply buffers are in a process-local cache"}
+    )
+    def get(self, request, message_id):
+        # 1. Another worker process may have produced the reply: only a shared cache can tell
+        if not buffer_is_shared():
+            logger.error("ChatResumeAPIView needs a shared cache; set CHAT_STREAM_BUFFER_CACHE to a Redis/Memcached/database cache.")
+            return Response({"detail": "Resuming replies is not available on this server."}, status=501)
+
+        # 2. Offset the client already has
+        try:
+            offset = int(request.query_params.get("offset", 0))
+        except ValueError:
+            offset = -1
+        if offset < 0:
+            return Response({"detail": "offset must be a non-negative integer."}, status=400)
+
+        # 3. Only the user's own, unexpired replies
+        meta = buffer_info(message_id, request.user.pk)
+        if meta is None:
+            return Response({"detail": "Message not found or expired."}, status=404)
+
+        # 4. Rest of the reply, live if it is still being produced
+        response = StreamingHttpResponse(read_buffer(message_id, offset), content_type='text/plain')
+        response["X-Session-Id"] = meta["session_id"]
+        response["X-Message-Id"] = message_id
+        return response
+
+
+
+
+class ChatRouterMetricsView(APIView):
+    permission_classes = [IsAdminRole]
+
+    @swagger_auto_schema(
+        operation_description="Hit rate of the local intent router (plan lookups answered without the LLM) and the latency it saved.",
+        tags=["Health Chatbot"],
+        responses={200: "routed, llm, hit_rate, avg_routed_ms, avg_llm_ms, latency_saved_seconds"}
+    )
+    def get(self, request):
+        return Response(router_metrics())
+
+
 
+
+def prepare_chat(user, user_input, session_id):
+    """
+    PreparedChat for one chat turn. Plan lookups recognised by the intent router and general
+    questions found in the response cache come with a ready `answer` and no chat_history;
+    otherwise chat_history holds the messages for the LLM, answer is None and prompt_tokens is
+    their size. General questions are sent with GENERAL_SYSTEM_PROMPT only (and their answer
+    cached); anything else with the static system prompt, user context, summary and recent
+    history within the token budget. save_reply(text) stores the turn in the session, schedules
+    the rolling summary and records the latency for the router metrics. None without a profile.
+    """
+    started = time.perf_counter()
+
+    # Stored messages and rolling summary of this user's session (a copy, safe to extend)
+    store = get_session_store()
+    state = store.get_state(user.pk, session_id)
+
+    requested_date = get_requested_date(user_input)
+    logger.info(f"Requested date for meal plan: {requested_date}")
+
+    # Profile, plans and the requested date's entries (cached per user and date)
+    context = get_chat_context(user, requested_date)
+    if context is None:
+        return None
+    user_message = {"role": "user", "content": user_input}
+
+    # Plan lookups ("what's my meal plan tomorrow?") are answered from the plan data, no LLM
+    intent = classify(user_input) if getattr(settings, 'CHAT_INTENT_ROUTER', True) else None
+    if intent is not None:
+        answer = "\n".join(render_answer(intent, context["day"], requested_date))
+        logger.info(f"Routed message locally: {user_input}, intent: {intent}, session_id: {session_id}")
+
+        def save_answer(full_reply):
+            store.append(user.pk, session_id, [user_message, {"role": "assistant", "content": full_reply}])
+            record_answer("routed", time.perf_counter() - started)
+
+        return PreparedChat(None, save_answer, answer, 0)
+
+    # General questions ("is keto safe?") get a user-independent answer, cached for everyone
+    response_cache = get_response_cache() if is_general_question(user_input) else None
+    if response_cache is not None:
+        hit = response_cache.lookup(user_input)
+        if hit is not None:
+            answer, similarity = hit
+            logger.info(f"Answered from response cache: {user_input}, similarity: {similarity:.3f}, session_id: {session_id}")
+
+            def save_cached(full_reply):
+                store.append(user.pk, session_id, [user_message, {"role": "assistant", "content": full_reply}])
+                record_answer("cached", time.perf_counter() - started)
+
+            return PreparedChat(None, save_cached, answer, 0)
+
+        chat_history, _, prompt_tokens = build_prompt([GENERAL_SYSTEM_PROMPT], EMPTY_STATE, user_message)
+        logger.info(f"Received general question: {user_input}, session_id: {session_id}, prompt tokens: {prompt_tokens}")
+
+        def save_general(full_reply):
+            store.append(user.pk, session_id, [user_message, {"role": "assistant", "content": full_reply}])
+            response_cache.store(user_input, full_reply)
+            record_answer("llm", time.perf_counter() - started)
+
+        return PreparedChat(chat_history, save_general, None, prompt_tokens)
+
+    # Profile and plans, each stated once (the instructions are in SYSTEM_PROMPT)
+    full_context = {"role": "system", "content": context["text"]}
+
+    # System prompt, user context, summary and the recent turns that fit the token budget, then the new message
+    chat_history, cutoff, prompt_tokens = build_prompt([SYSTEM_PROMPT, full_context], state, user_message)
+
+    logger.info(f"Received message: {user_input}, session_id: {session_id}, prompt tokens: {prompt_tokens}")
+
+    def save_reply(full_reply):
+        store.append(user.pk, session_id, [user_message, {"role": "assistant", "content": full_reply}])
+        schedule_summary(user.pk, session_id, state, cutoff)
+        record_answer("llm", time.perf_counter() - started)
+
+    return PreparedChat(chat_history, save_reply, None, prompt_tokens)
+
+
+
+
+def text_chat_stream(chat_history, save_reply, session_id):
+    """Plain-text stream of the completion (StreamingChatAPIView)."""
+    try:
+        response = openai.ChatCompletion.create(
+            model="gpt-5-nano",
+            messages=chat_history,
+            # temperature=0.1,
+            stream=True
+        )
+
+        full_reply = ""
+        for chunk in response:
+            if 'choices' in chunk and len(chunk['choices']) > 0:
+                delta = chunk['choices'][0]['delta']
+                if 'content' in delta:
+                    content = delta['content']
+                    full_reply += content
+                    logger.debug(f"Streaming chunk: {content}")
+                    yield content
+
+        save_reply(full_reply)
+        logger.info(f"Completed response: {full_reply}, session_id: {session_id}")
+
+    except Exception as e:
+        error_msg = f"\n[ERROR]: {str(e)}"
+        logger.error(f"Error in stream: {str(e)}, session_id: {session_id}")
+        yield error_msg
+
+
+
+
+def local_chat_stream(answer, save_reply):
+    """Plain-text stream of a routed answer, line by line."""
+    for line in answer.splitlines(keepends=True):
+        yield line
+    save_reply(answer)
+
+
+
+
+def sse_event(data, event=None):
+    """One Server-Sent Events frame with a JSON payload."""
+    frame = f"event: {event}\n" if event else ""
+    return f"{frame}data: {json.dumps(data)}\n\n"
+
+
+
+
+async def _completion_deltas(response):
+    try:
+        async for chunk in response:
+            if chunk.get("choices"):
+                content = chunk["choices"][0].get("delta", {}).get("content")
+                if content:
+                    yield content
+    finally:
+        # Releases the HTTP connection of a stream that was not read to the end
+        if hasattr(response, "aclose"):
+            await response.aclose()
+
+
+
+
+async def sse_chat_stream(chat_history, save_reply, session_id, keepalive=None):
+    """
+    SSE stream of the completion (AsyncStreamingChatView). Sends a keep-alive comment when no
+    token arrived for `keepalive` seconds. The OpenAI request and every read of its stream run
+    as a task, which is cancelled when the client goes away (the ASGI handler cancels this
+    generator), so an abandoned request never keeps waiting for OpenAI.
+    """
+    keepalive = keepalive or getattr(settings, 'CHAT_SSE_KEEPALIVE_SECONDS', 15)
+    yield sse_event({"session_id": session_id}, event="session")
+
+    pending = asyncio.ensure_future(openai.ChatCompletion.acreate(
+        model="gpt-5-nano",
+        messages=chat_history,
+        stream=True
+    ))
+    deltas = None
+    full_reply = ""
+    try:
+        while True:
+            done, _ = await asyncio.wait({pending}, timeout=keepalive)
+            if not done:
+                yield ": keep-alive\n\n"
+                continue
+            task, pending = pending, None
+            if deltas is None:
+                deltas = _completion_deltas(task.result())
+            else:
+                try:
+                    content = task.result()
+                except StopAsyncIteration:
+                    break
+                full_reply += content
+                yield sse_event({"delta": content})
+            pending = asyncio.ensure_future(deltas.__anext__())
+
+        await sync_to_async(save_reply)(full_reply)
+        logger.info(f"Completed response: {full_reply}, session_id: {session_id}")
+        yield sse_event({}, event="done")
+    except asyncio.CancelledError:
+        logger.info(f"Client disconnected, session_id: {session_id}")
+        raise
+    except Exception as e:
+        logger.error(f"Error in stream: {str(e)}, session_id: {session_id}")
+        yield sse_event({"detail": str(e)}, event="error")
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        if deltas is not None:
+            await deltas.aclose()
+
+
+
+
+async def sse_local_stream(answer, save_reply, session_id):
+    """SSE stream of a routed answer, with the same events as sse_chat_stream."""
+    yield sse_event({"session_id": session_id}, event="session")
+    for line in answer.splitlines(keepends=True):
+        yield sse_event({"delta": line})
+    await sync_to_async(save_reply)(answer)
+    yield sse_event({}, event="done")
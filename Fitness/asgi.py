@@ -3,6 +3,12 @@ ASGI config for Fitness project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The async chat stream (chat/Ai/stream/) only streams under ASGI; run the project with
+
+    uvicorn Fitness.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+
+(under WSGI that endpoint answers 501; every other endpoint works under both).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
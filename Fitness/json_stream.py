@@ -0,0 +1,99 @@
+"""
+Incremental parsing of a JSON completion while it is still being streamed.
+
+StreamingArrayParser is fed the text deltas of a streamed completion and returns every
+element of one top-level array (e.g. "days") as soon as its closing brace arrives, so
+callers can persist or forward it without waiting for the rest of the response.
+"""
+import json
+import openai
+
+
+def stream_completion(**kwargs):
+    """Yield the text deltas of a streamed openai.ChatCompletion."""
+    for chunk in openai.ChatCompletion.create(stream=True, **kwargs):
+        if not chunk.get("choices"):
+            continue
+        content = chunk["choices"][0].get("delta", {}).get("content")
+        if content:
+            yield content
+
+
+
+
+class StreamingArrayParser:
+    """
+    Emits the object elements of the top-level `key` array of a JSON object as they complete.
+
+    Only string/escape state and nesting depth are tracked, so each character is looked at
+    once. Elements that are not valid JSON on their own are skipped.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._expect_array = False
+        self._in_array = False
+        self._item_start = None
+
+    def feed(self, chunk):
+        """Add streamed text; return the array elements completed by it (list of dicts)."""
+        self.text += chunk
+        items = []
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and not self._in_array:
+                        self._last_key = text[self._string_start + 1:i]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                self._expect_array = False
+            elif ch == ':':
+                self._expect_array = self._depth == 1 and self._last_key == self.key
+            elif ch in '{[':
+                self._depth += 1
+                if ch == '[' and self._expect_array and self._depth == 2:
+                    self._in_array = True
+                elif ch == '{' and self._in_array and self._depth == 3:
+                    self._item_start = i
+                self._expect_array = False
+            elif ch in '}]':
+                if ch == '}' and self._in_array and self._depth == 3 and self._item_start is not None:
+                    try:
+                        item = json.loads(text[self._item_start:i + 1])
+                    except json.JSONDecodeError:
+                        item = None
+                    if isinstance(item, dict):
+                        items.append(item)
+                    self._item_start = None
+                self._depth -= 1
+                if self._in_array and self._depth == 1:
+                    self._in_array = False
+            elif not ch.isspace():
+                self._expect_array = False
+        self._pos = len(text)
+        return items
+
+    def result(self):
+        """The whole document once the stream has ended ({} if it is not valid JSON)."""
+        try:
+            data = json.loads(self.text)
+        except json.JSONDecodeError:
+            return {}
+        return data if isinstance(data, dict) else {}
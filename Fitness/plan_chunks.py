@@ -0,0 +1,85 @@
+"""
+Helpers to generate a multi-day plan as several smaller LLM requests that run concurrently.
+
+The date range is split into chunks (PLAN_CHUNK_DAYS), every chunk is requested on a bounded
+thread pool (PLAN_CHUNK_WORKERS) and the per-chunk "days" lists are merged back into one plan.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+
+def chunk_dates(dates, chunk_days=None):
+    """Split a list of ISO dates into consecutive chunks of `chunk_days` (0/None = one chunk)."""
+    chunk_days = getattr(settings, 'PLAN_CHUNK_DAYS', 0) if chunk_days is None else chunk_days
+    if not chunk_days or chunk_days >= len(dates):
+        return [list(dates)]
+    return [list(dates[i:i + chunk_days]) for i in range(0, len(dates), chunk_days)]
+
+
+
+
+def rotation_hints(groups, chunk_count):
+    """
+    Items each chunk should favour when chunks are generated at the same time: every list in
+    `groups` (e.g. the candidates of one meal slot) is dealt round-robin over the chunks, so
+    the chunks lean on different items. Returns one list per chunk ([[]] for a single chunk).
+    """
+    if chunk_count <= 1:
+        return [[]]
+    shares = [[] for _ in range(chunk_count)]
+    for items in groups:
+        for index, item in enumerate(items):
+            shares[index % chunk_count].append(item)
+    return shares
+
+
+
+
+def run_chunks(request_chunk, chunks, hints, workers=None):
+    """
+    Call request_chunk(dates, hint) for every chunk, concurrently on at most `workers`
+    threads, and return the responses in chunk order. The first failure is raised.
+    """
+    workers = workers or getattr(settings, 'PLAN_CHUNK_WORKERS', 3)
+    if len(chunks) == 1:
+        return [request_chunk(chunks[0], hints[0])]
+    with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+        futures = [pool.submit(request_chunk, dates, hint) for dates, hint in zip(chunks, hints)]
+        return [future.result() for future in futures]
+
+
+
+
+def merge_chunk_days(responses, dates, list_key, unique_key):
+    """
+    Merge the "days" of every chunk response into one list ordered by `dates`. Days outside
+    `dates` and repeated dates are dropped (first wins); inside a day, entries repeating
+    `unique_key` (e.g. meal_type) are dropped.
+    """
+    by_date = {}
+    for response in responses:
+        for day in response.get("days") or []:
+            if not isinstance(day, dict):
+                continue
+            day_date = str(day.get("date"))
+            if day_date in by_date:
+                continue
+            seen, entries = set(), []
+            for entry in day.get(list_key) or []:
+                value = entry.get(unique_key) if isinstance(entry, dict) else None
+                if value is None or value in seen:
+                    continue
+                seen.add(value)
+                entries.append(entry)
+            by_date[day_date] = dict(day, **{list_key: entries})
+    return [by_date[d] for d in dates if d in by_date]
+
+
+
+
+def first_value(responses, key, default):
+    """First non-empty `key` across chunk responses (plan name, tags)."""
+    for response in responses:
+        if response.get(key):
+            return response[key]
+    return default
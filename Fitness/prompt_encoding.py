@@ -0,0 +1,102 @@
+"""
+Compact, token-efficient encoding of catalog rows (recipes, workouts) for LLM prompts.
+
+Catalogs are sent as a delimited table (one header row, one row per item) instead of
+indented JSON, long free text is truncated, and every item gets a short per-prompt alias
+("r1", "w7", ...) that is mapped back to its unique_id once the response arrives.
+"""
+import re
+from decimal import Decimal
+
+try:
+    import tiktoken
+except ImportError:  # optional, only used for exact token counts
+    tiktoken = None
+
+
+DELIMITER = '|'
+_WHITESPACE = re.compile(r'\s+')
+_TOKEN_PIECES = re.compile(r'\w+|[^\w\s]')
+_ENCODING = None
+
+
+
+
+def estimate_tokens(text):
+    """
+    Token count of `text`. Uses tiktoken when it is installed, otherwise a word-piece
+    approximation (one token per punctuation mark, ~4 characters per token for words).
+    """
+    global _ENCODING
+    if not text:
+        return 0
+    if tiktoken is not None:
+        if _ENCODING is None:
+            _ENCODING = tiktoken.get_encoding('o200k_base')
+        return len(_ENCODING.encode(text))
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _TOKEN_PIECES.findall(text))
+
+
+
+
+def truncate_text(text, limit):
+    """Collapse whitespace and cut `text` to `limit` characters on a word boundary."""
+    text = _WHITESPACE.sub(' ', str(text or '')).strip()
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(' ', 1)[0] or text[:limit]
+    return cut.rstrip(',;:.') + '…'
+
+
+
+
+def _format_cell(value):
+    if value is None:
+        return ''
+    if isinstance(value, (float, Decimal)):
+        return f"{float(value):g}"
+    if isinstance(value, (list, tuple)):
+        value = '/'.join(str(v) for v in value)
+    return _WHITESPACE.sub(' ', str(value)).replace(DELIMITER, '/').strip()
+
+
+
+
+def encode_table(items, columns, prefix, key='uid'):
+    """
+    Encode `items` (dicts) as a header row plus one delimited row per item.
+
+    `columns` is a list of (header, item_key) pairs. The first column is always the alias.
+    Returns (table_text, aliases) where aliases maps alias -> items[key].
+    """
+    aliases = {}
+    lines = [DELIMITER.join(['id'] + [header for header, _ in columns])]
+    for index, item in enumerate(items, start=1):
+        alias = f"{prefix}{index}"
+        aliases[alias] = item[key]
+        lines.append(DELIMITER.join([alias] + [_format_cell(item.get(field)) for _, field in columns]))
+    return '\n'.join(lines), aliases
+
+
+
+
+def encode_rows(headers, rows):
+    """Header row plus one delimited row per item (a list of cell values), without aliases."""
+    lines = [DELIMITER.join(headers)]
+    lines += [DELIMITER.join(_format_cell(value) for value in row) for row in rows]
+    return '\n'.join(lines)
+
+
+
+
+def resolve_aliases(days, list_key, uid_key, aliases):
+    """
+    Replace aliases in a generated plan with the real unique_ids, in place.
+    Values that are not aliases (e.g. a real unique_id) are left untouched.
+    """
+    for day in days or []:
+        for item in day.get(list_key) or []:
+            value = item.get(uid_key)
+            if isinstance(value, str) and value.strip() in aliases:
+                item[uid_key] = aliases[value.strip()]
+    return days
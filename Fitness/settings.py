@@ -66,6 +66,7 @@ INSTALLED_APPS = [
     'workoutplan',
     'recipe',
     'userapi',
+    'plan_templates',
     'home',
     'completeinfo'
 ]
@@ -218,6 +219,51 @@ SWAGGER_SETTINGS = {
 
 OPENAI_API_KEY=os.getenv('OPENAI_API_KEY')
 
+# AI plan generation
+MEAL_PLAN_CANDIDATES_PER_SLOT = 10   # recipes sent to the LLM per meal slot
+MEAL_PLAN_ENGINE = 'llm'             # default engine: 'llm' (OpenAI) or 'local' (meal.optimizer)
+MEAL_PLAN_LOCAL_FALLBACK = True      # use the local engine when the LLM call fails or returns an invalid plan
+WORKOUT_PLAN_ENGINE = 'llm'          # default engine: 'llm' (OpenAI) or 'local' (workoutplan.scheduler)
+WORKOUT_PLAN_LOCAL_FALLBACK = True   # use the local scheduler when the LLM call fails
+PLAN_WORKER_THREADS = 4              # jobs processed concurrently by `manage.py run_plan_worker`
+PLAN_CHUNK_DAYS = 5                  # LLM plans are requested in chunks of this many days (0 = one request)
+PLAN_CHUNK_WORKERS = 3               # chunk requests running at the same time
+PLAN_MEMO_ENABLED = True             # reuse LLM plans for users with the same plan inputs
+PLAN_MEMO_TTL_DAYS = 30
+PLAN_MEMO_MAX_ENTRIES = 2000         # per kind (meal/workout), least recently used are evicted
+CHAT_SESSION_STORE = 'db'            # chatbot history: 'db' (shared by all workers) or 'memory' (per-process LRU)
+CHAT_SESSION_MAX_SESSIONS = 10000    # least recently used sessions are evicted above this
+CHAT_SESSION_MAX_TURNS = 10          # user/assistant pairs kept per session
+CHAT_SESSION_TTL_SECONDS = 86400     # sessions idle longer than this are forgotten
+CHAT_SESSION_EVICT_INTERVAL_SECONDS = 300  # the db store deletes expired/excess sessions at most this often per process
+CHAT_CONTEXT_CACHE = 'default'       # cache alias for rendered chat contexts (use a shared cache with several workers)
+CHAT_CONTEXT_CACHE_SECONDS = 600    # how long a rendered context is reused with a shared cache
+CHAT_CONTEXT_LOCAL_CACHE_SECONDS = 5 # used instead when CHAT_CONTEXT_CACHE is process-local: other workers miss its invalidations
+CHAT_PROMPT_TOKEN_BUDGET = 6000      # chat prompt size; older turns beyond it are replaced by a rolling summary
+CHAT_SUMMARY_MAX_WORDS = 150
+CHAT_SUMMARY_WORKERS = 2             # background threads writing rolling summaries
+CHAT_SSE_KEEPALIVE_SECONDS = 15      # idle seconds before the async chat stream sends a keep-alive comment
+CHAT_INTENT_ROUTER = True            # answer plan lookups from the plan data without the LLM
+CHAT_INTENT_MIN_SCORE = 2            # lookup cues a question needs to be routed locally
+CHAT_RESPONSE_CACHE = True           # replay answers to general (stand-alone, non-personal) questions from a per-process cache
+CHAT_RESPONSE_CACHE_SIZE = 1000      # cached answers; least recently used evicted first
+CHAT_RESPONSE_CACHE_TTL_SECONDS = 86400
+CHAT_RESPONSE_CACHE_THRESHOLD = 0.85 # cosine similarity of the content words a question needs to reuse a cached answer (contrast words must match too)
+CHAT_STREAM_BUFFER_CACHE = 'default' # cache alias of resumable reply buffers; replies are buffered (and resumable) only if it is shared between processes
+CHAT_STREAM_BUFFER_TTL_SECONDS = 300 # a reply can be resumed this long after its last chunk
+CHAT_STREAM_CHUNK_CHARS = 64         # replies are buffered in chunks of about this size...
+CHAT_STREAM_FLUSH_SECONDS = 0.05     # ...or of what arrived within this time
+CHAT_STREAM_MAX_CHUNKS = 1000        # chunks per reply; the rest of a longer reply goes into the last one
+CHAT_STREAM_WORKERS = 8              # threads per process producing streamed replies; more replies wait in a queue
+CHAT_STREAM_STALL_SECONDS = 120      # a reader gives up after this long without a new chunk from a started reply
+TRANSLATION_CACHE_SIZE = 5000        # translated field values kept in memory per process (all are in TranslationCache)
+TRANSLATION_WORKER_THREADS = 2       # admin writes translated concurrently by `manage.py run_translation_worker`
+TRANSLATION_MAX_ATTEMPTS = 5         # a write is marked failed after this many attempts (retry it from the admin API)
+TRANSLATION_RETRY_DELAY_SECONDS = 60 # wait before a failed attempt is retried
+TRANSLATION_BATCH_TOKENS = 2000      # source tokens per request of `manage.py sync_catalog_translations`
+CATALOG_TWIN_CACHE_SECONDS = 60     # Spanish twins read by the Spanish endpoints are kept this long per process (0 = off)
+CATALOG_TWIN_CACHE_SIZE = 5000       # twins kept per process, least recently read are evicted
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_USE_TLS = True
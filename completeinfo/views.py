@@ -204,10 +204,8 @@ class UserAchievementDetailView(APIView):
 
         # Count total completed meal days for the latest meal plan
         total_completed_meal_days = DailyMeal.objects.filter(
-            meal_plan=latest_meal_plan
-        ).filter(
-            meals__completed=True
-        ).distinct().count() if latest_meal_plan else 0
+            meal_plan=latest_meal_plan, completed_count__gt=0
+        ).count() if latest_meal_plan else 0
 
         fitness_profiles = FitnessProfile.objects.filter(user=user)
         weights_list = [profile.current_weight for profile in fitness_profiles]
@@ -277,10 +275,8 @@ class Aifeedback(APIView):
 
         # Count total completed meal days for the latest meal plan
         total_completed_meal_days = DailyMeal.objects.filter(
-            meal_plan=latest_meal_plan
-        ).filter(
-            meals__completed=True
-        ).distinct().count() if latest_meal_plan else 0
+            meal_plan=latest_meal_plan, completed_count__gt=0
+        ).count() if latest_meal_plan else 0
 
         # Get fitness profile and weight data
         fitness_profiles = FitnessProfile.objects.filter(user=user)
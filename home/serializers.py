@@ -4,6 +4,7 @@ from workoutplan.models import WorkoutEntry, DailyWorkout
 from datetime import datetime, time
 from AiChat.models import HealthProfile
 from workout.models import WorkoutSpanish
+from recipe.twins import context_resolver
 
 
 MEAL_TYPE_TRANSLATIONS = {
@@ -112,7 +113,7 @@ class SpanishWorkoutEntrySimpleSerializer(serializers.ModelSerializer):
     def get_workout_name_spanish(self, obj):
         workout = obj.workout
         if workout:
-            spanish_workout = WorkoutSpanish.objects.filter(unique_id=workout.unique_id).first()
+            spanish_workout = context_resolver(self.context, WorkoutSpanish).get(workout.unique_id)
             if spanish_workout:
                 return spanish_workout.workout_name
         return None
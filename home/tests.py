@@ -1,3 +1,58 @@
-from django.test import TestCase
+import uuid
+from datetime import date, timedelta
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from AiChat.models import HealthProfile
+from meal.models import MealPlan, DailyMeal, MealEntry
+from workout.models import Workout, WorkoutSpanish
+from workoutplan.models import WorkoutPlan, DailyWorkout, WorkoutEntry
 
 # Create your tests here.
+
+
+
+
+@override_settings(CATALOG_TWIN_CACHE_SECONDS=0)
+class SpanishTodayDetailsQueryTests(TestCase):
+    """The Spanish home view costs the same number of queries for 1 entry a day as for many."""
+
+    def day_with_entries(self, count):
+        user = User.objects.create_user(username=f"u{count}", email=f"u{count}@example.com")
+        HealthProfile.objects.create(
+            user=user, perfect_weight_kg=70, abdominal=20, triceps=12, subscapular=14, suprailiac=16,
+            total_calories_per_day=2200, water_need_liters_per_day=2.5, sleep_need_hours_per_day=8,
+        )
+        meal_plan = MealPlan.objects.create(user=user, meal_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        daily_meal = DailyMeal.objects.create(meal_plan=meal_plan, date=date.today())
+        workout_plan = WorkoutPlan.objects.create(user=user, workout_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        daily_workout = DailyWorkout.objects.create(workout_plan=workout_plan, date=date.today())
+        for i in range(count):
+            MealEntry.objects.create(daily_meal=daily_meal, meal_type="Lunch")
+            workout = Workout.objects.create(
+                unique_id=str(uuid.uuid4()), workout_name=f"Workout {count}-{i}", for_body_part="Chest",
+                time_needed=timedelta(minutes=10), workout_type="Strength", calories_burn=50, equipment_needed="None",
+                benefits="",
+            )
+            WorkoutSpanish.objects.create(
+                unique_id=workout.unique_id, workout_name=f"ES Workout {count}-{i}", for_body_part="Pecho",
+                time_needed=workout.time_needed, workout_type="Fuerza", calories_burn=50, equipment_needed="Ninguno",
+                benefits="",
+            )
+            WorkoutEntry.objects.create(daily_workout=daily_workout, workout=workout)
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def queries(self, count):
+        client = self.day_with_entries(count)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/userapi/spanish/plans/today/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"ES Workout {count}-0", response.content.decode())
+        return len(queries)
+
+    def test_today_details(self):
+        self.assertEqual(self.queries(1), self.queries(5))
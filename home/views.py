@@ -11,6 +11,8 @@ from datetime import date, datetime
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import status
 from AiChat.models import HealthProfile
+from workout.models import WorkoutSpanish
+from recipe.twins import prefetch_twins
 
 
 class TodayDailyDetailsAPIView(APIView):
@@ -93,18 +95,21 @@ class SpanishTodayDailyDetailsAPIView(APIView):
         daily_workout = DailyWorkout.objects.filter(
             workout_plan__user=user,
             date=target_date
-        ).first()
+        ).prefetch_related('workouts__workout').first()
 
         try:
             profile = request.user.health_profile
         except HealthProfile.DoesNotExist:
             return Response({"detail": "Health profile not found."}, status=404)
         serializer = AIRecommendedDataSerializer(profile)
+        context = {}
+        if daily_workout:
+            prefetch_twins(context, WorkoutSpanish, [entry.workout.unique_id for entry in daily_workout.workouts.all() if entry.workout])
 
         return Response({
             "date": target_date,
             "daily_meal": SpanishDailyMealTodaySerializer(daily_meal).data if daily_meal else None,
-            "daily_workout": SpanishDailyWorkoutTodaySerializer(daily_workout).data if daily_workout else None,
+            "daily_workout": SpanishDailyWorkoutTodaySerializer(daily_workout, context=context).data if daily_workout else None,
             "AiRecomended":serializer.data,
 })
 
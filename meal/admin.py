@@ -12,7 +12,7 @@ class MealPlanAdmin(admin.ModelAdmin):
 
 @admin.register(DailyMeal)
 class DailyMealAdmin(admin.ModelAdmin):
-    list_display = ('meal_plan', 'date')
+    list_display = ('meal_plan', 'date', 'completed_count', 'total_count')
     list_filter = ('date',)
     search_fields = ('meal_plan__meal_plan_name', 'meal_plan__user__email')
 
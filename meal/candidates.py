@@ -0,0 +1,176 @@
+import heapq
+import re
+from collections import defaultdict
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from recipe.models import Recipe
+from .constants import (
+    ALLERGEN_KEYWORDS, DIET_EXCLUDED_KEYWORDS, KETO_MAX_CARBS,
+    MEDICAL_PENALTY_KEYWORDS, SLOT_FOR_TIME_KEYWORDS,
+)
+from .nutrition import get_meal_slots, daily_calorie_target, macro_split, slot_calorie_targets
+
+
+CANDIDATES_PER_SLOT = getattr(settings, 'MEAL_PLAN_CANDIDATES_PER_SLOT', 10)
+RANKING_POOL_FACTOR = 4          # ranked pool size = per_slot * factor, diversified down to per_slot
+MEDICAL_PENALTY_WEIGHT = 0.5     # per matched medical condition
+CATEGORY_REPEAT_PENALTY = 0.15   # per already picked recipe of the same category in the slot
+CROSS_SLOT_PENALTY = 0.30        # recipe already picked for another slot
+
+
+
+
+def _word_regex(keyword):
+    """Case-insensitive pattern of `keyword` as a whole word or its plural: "egg" finds "Eggs" but not "eggplant"."""
+    # PostgreSQL spells a word boundary \y; SQLite (Python re) and MySQL use \b
+    boundary = r"\y" if connection.vendor == 'postgresql' else r"\b"
+    if re.search(r"[^aeiou]y$", keyword):
+        word = f"{re.escape(keyword[:-1])}(y|ies)"
+    else:
+        word = f"{re.escape(keyword)}(s|es)?"
+    return f"{boundary}{word}{boundary}"
+
+
+
+
+def _keywords_q(keywords):
+    query = Q()
+    for keyword in keywords:
+        pattern = _word_regex(keyword)
+        query |= Q(ingredients__iregex=pattern) | Q(recipe_name__iregex=pattern)
+    return query
+
+
+
+
+def filter_recipes(profile, queryset=None):
+    """
+    Drop recipes that can never be served to this profile: allergens and foods excluded by
+    the dietary preference. Runs entirely in the database.
+    """
+    queryset = Recipe.objects.all() if queryset is None else queryset
+    queryset = queryset.exclude(unique_id__isnull=True).exclude(unique_id__exact='')
+
+    diet = profile.dietary_preferences
+    keywords = set(DIET_EXCLUDED_KEYWORDS.get(diet, []))
+    for allergy in profile.allergies or []:
+        keywords.update(ALLERGEN_KEYWORDS.get(allergy, []))
+    if keywords:
+        queryset = queryset.exclude(_keywords_q(sorted(keywords)))
+
+    if diet in ('Vegetarian', 'Vegan'):
+        queryset = queryset.exclude(recipe_type__icontains='non')
+    if diet == 'Keto':
+        queryset = queryset.filter(carbs__lte=KETO_MAX_CARBS)
+    return queryset
+
+
+
+
+def annotate_medical_penalty(queryset, profile):
+    penalty = None
+    for condition in profile.medical_conditions or []:
+        keywords = MEDICAL_PENALTY_KEYWORDS.get(condition)
+        if not keywords:
+            continue
+        term = Case(When(_keywords_q(keywords), then=Value(1)), default=Value(0), output_field=IntegerField())
+        penalty = term if penalty is None else penalty + term
+    return queryset.annotate(medical_penalty=penalty if penalty is not None else Value(0, output_field=IntegerField()))
+
+
+
+
+def _macro_gap(protein, carbs, fat, split):
+    p, c, f = protein * 4, carbs * 4, fat * 9
+    total = p + c + f
+    if not total:
+        return 3.0
+    return abs(p / total - split[0]) + abs(c / total - split[1]) + abs(f / total - split[2])
+
+
+
+
+def matches_slot(for_time, slot):
+    return any(keyword in for_time for keyword in SLOT_FOR_TIME_KEYWORDS.get(slot, [slot.lower()]))
+
+
+
+
+def _diverse_pick(pool, per_slot, taken):
+    """Greedy pick from a ranked [(score, row)] pool, penalizing repeated categories and recipes used by other slots."""
+    picked = []
+    category_counts = defaultdict(int)
+    remaining = list(pool)
+    while remaining and len(picked) < per_slot:
+        best = min(
+            remaining,
+            key=lambda item: item[0]
+            + CATEGORY_REPEAT_PENALTY * category_counts[item[1]['category']]
+            + (CROSS_SLOT_PENALTY if item[1]['uid'] in taken else 0),
+        )
+        remaining.remove(best)
+        picked.append(best[1]['uid'])
+        category_counts[best[1]['category']] += 1
+    return picked
+
+
+
+
+def select_recipe_candidates(profile, queryset=None, per_slot=None):
+    """
+    Return {meal_slot: [Recipe, ...]} with a small, diverse set of recipes for every meal
+    slot of the profile. Recipes are pre-filtered in the database (allergies, diet), then
+    ranked against the slot's calorie target and the profile's macro split.
+    """
+    per_slot = per_slot or CANDIDATES_PER_SLOT
+    slots = get_meal_slots(profile)
+    targets = slot_calorie_targets(slots, daily_calorie_target(profile))
+    split = macro_split(profile)
+
+    queryset = annotate_medical_penalty(filter_recipes(profile, queryset), profile)
+    rows = []
+    for uid, for_time, category, calories, protein, carbs, fat, penalty in queryset.values_list(
+        'unique_id', 'for_time', 'category', 'calories', 'protein', 'carbs', 'fat', 'medical_penalty'
+    ).iterator():
+        rows.append({
+            'uid': uid,
+            'for_time': (for_time or '').lower(),
+            'category': category,
+            'calories': float(calories or 0),
+            'base': _macro_gap(float(protein or 0), float(carbs or 0), float(fat or 0), split)
+                    + MEDICAL_PENALTY_WEIGHT * penalty,
+        })
+
+    pool_size = per_slot * RANKING_POOL_FACTOR
+    selected = {}
+    taken = set()
+    for slot in slots:
+        target = targets[slot]
+
+        def ranked(candidate_rows):
+            scored = ((row['base'] + abs(row['calories'] - target) / target, row) for row in candidate_rows)
+            return heapq.nsmallest(pool_size, scored, key=lambda item: item[0])
+
+        pool = ranked(row for row in rows if matches_slot(row['for_time'], slot))
+        if len(pool) < per_slot:
+            # Not enough recipes tagged for this slot: top up with the best of the rest
+            pool_uids = {row['uid'] for _, row in pool}
+            pool += ranked(row for row in rows if row['uid'] not in pool_uids)[:pool_size - len(pool)]
+
+        selected[slot] = _diverse_pick(pool, per_slot, taken)
+        taken.update(selected[slot])
+
+    recipes = Recipe.objects.in_bulk(list(taken), field_name='unique_id')
+    return {slot: [recipes[uid] for uid in uids if uid in recipes] for slot, uids in selected.items()}
+
+
+
+
+def flatten_candidates(candidates):
+    """Unique recipes of a {slot: [Recipe]} mapping, in first-seen order."""
+    seen = {}
+    for recipes in candidates.values():
+        for recipe in recipes:
+            seen.setdefault(recipe.unique_id, recipe)
+    return list(seen.values())
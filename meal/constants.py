@@ -0,0 +1,124 @@
+MEAL_COUNT_BY_LIFESTYLE = {
+    '3 Meals': 3,
+    '4 Meals': 4,
+    '5 Meals': 5,
+    '6 Meals': 6,
+    '7 Meals': 7,
+    '8 Meals': 8,
+}
+
+
+
+
+# Meal slots (meal_type values) for each number of meals per day
+MEAL_SLOTS_BY_COUNT = {
+    3: ["Breakfast", "Lunch", "Dinner"],
+    4: ["Breakfast", "Lunch", "Snack", "Dinner"],
+    5: ["Breakfast", "Snack 1", "Lunch", "Snack 2", "Dinner"],
+    6: ["Breakfast", "Snack 1", "Lunch", "Snack 2", "Dinner", "Snack 3"],
+    7: ["Breakfast", "Snack 1", "Lunch", "Snack 2", "Dinner", "Snack 3", "Post-Dinner"],
+    8: ["Breakfast", "Snack 1", "Lunch", "Snack 2", "Dinner", "Snack 3", "Post-Dinner", "Late Snack"],
+}
+
+
+
+
+# Keywords matched against Recipe.for_time for every slot (first match wins the slot)
+SLOT_FOR_TIME_KEYWORDS = {
+    "Breakfast": ["breakfast"],
+    "Lunch": ["lunch"],
+    "Dinner": ["dinner"],
+    "Snack": ["snack"],
+    "Snack 1": ["snack"],
+    "Snack 2": ["snack"],
+    "Snack 3": ["snack"],
+    "Post-Dinner": ["snack", "dinner"],
+    "Late Snack": ["snack"],
+}
+
+
+
+
+# Relative share of the daily calories for every slot (normalized over the selected slots)
+SLOT_CALORIE_WEIGHTS = {
+    "Breakfast": 0.25,
+    "Lunch": 0.35,
+    "Dinner": 0.30,
+    "Snack": 0.10,
+    "Snack 1": 0.10,
+    "Snack 2": 0.10,
+    "Snack 3": 0.08,
+    "Post-Dinner": 0.08,
+    "Late Snack": 0.06,
+}
+
+
+
+
+# Default eating time (HH:MM) for every slot, used by the local meal-plan engine
+DEFAULT_EATING_TIMES = {
+    "Breakfast": "08:00",
+    "Snack": "16:00",
+    "Snack 1": "10:30",
+    "Lunch": "13:00",
+    "Snack 2": "16:30",
+    "Dinner": "19:30",
+    "Snack 3": "21:00",
+    "Post-Dinner": "21:30",
+    "Late Snack": "22:30",
+}
+
+# Recipe calories/macros are taken to be per serving of this many grams
+DEFAULT_SERVING_GRAMS = 300
+
+
+
+
+# Macro split as share of calories (protein, carbs, fat)
+MACRO_SPLIT_BY_GOAL = {
+    'Weight loss': (0.30, 0.40, 0.30),
+    'Weight gain': (0.25, 0.50, 0.25),
+    'Maintenance': (0.20, 0.50, 0.30),
+}
+KETO_MACRO_SPLIT = (0.25, 0.05, 0.70)
+KETO_MAX_CARBS = 25
+
+
+
+
+# Hard exclusions: a recipe is dropped when its ingredients/name contain any keyword
+# Keywords match whole words and their plurals ("nut" finds "nuts", not "coconut"), so
+# compound words that contain the food ("walnut", "buttermilk") are listed as well
+ALLERGEN_KEYWORDS = {
+    'Nuts': ['nut', 'almond', 'cashew', 'pecan', 'pistachio', 'macadamia', 'walnut', 'hazelnut', 'peanut'],
+    'Dairy': ['milk', 'cheese', 'butter', 'yogurt', 'yoghurt', 'cream', 'whey', 'ghee', 'paneer',
+              'buttermilk', 'cheesecake'],
+    'Shellfish': ['shellfish', 'shrimp', 'prawn', 'crab', 'lobster', 'clam', 'mussel', 'oyster', 'scallop'],
+    'Eggs': ['egg'],
+}
+
+MEAT_KEYWORDS = [
+    'chicken', 'beef', 'pork', 'lamb', 'mutton', 'turkey', 'bacon', 'ham', 'sausage', 'meat',
+    'duck', 'fish', 'salmon', 'tuna', 'cod', 'anchovy', 'shrimp', 'prawn', 'crab', 'lobster',
+    'meatball', 'hamburger', 'burger', 'pepperoni', 'catfish', 'swordfish',
+]
+
+DIET_EXCLUDED_KEYWORDS = {
+    'Vegetarian': MEAT_KEYWORDS,
+    'Vegan': MEAT_KEYWORDS + ALLERGEN_KEYWORDS['Dairy'] + ['egg', 'honey', 'gelatin'],
+    'Paleo': ['rice', 'bread', 'pasta', 'oat', 'wheat', 'flour', 'bean', 'lentil', 'chickpea',
+              'milk', 'cheese', 'yogurt', 'sugar', 'corn', 'oatmeal', 'cornmeal', 'popcorn', 'breadcrumb'],
+    'Gluten-Free': ['wheat', 'bread', 'pasta', 'flour', 'barley', 'rye', 'couscous', 'noodle', 'cracker', 'seitan',
+                    'breadcrumb', 'spaghetti'],
+    'Keto': ['sugar', 'rice', 'bread', 'pasta', 'potato'],
+}
+
+
+
+
+# Soft penalties used when ranking: keywords per medical condition
+MEDICAL_PENALTY_KEYWORDS = {
+    'Diabetes': ['sugar', 'honey', 'syrup', 'candy', 'soda', 'white bread'],
+    'High blood pressure': ['salt', 'soy sauce', 'bacon', 'ham', 'pickle', 'sausage'],
+    'Heart disease': ['bacon', 'butter', 'fried', 'sausage', 'lard', 'cream'],
+}
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from meal.models import DailyMeal, MealEntry
+
+
+def _count_subquery(completed_only=False):
+    entries = MealEntry.objects.filter(daily_meal=OuterRef('pk'))
+    if completed_only:
+        entries = entries.filter(completed=True)
+    counted = entries.order_by().values('daily_meal').annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill DailyMeal completed_count and total_count from their entries. "
+        "Run once after migrating, or after entries were changed with queryset updates/deletes."
+    )
+
+    def handle(self, *args, **options):
+        days = DailyMeal.objects.update(
+            total_count=_count_subquery(),
+            completed_count=_count_subquery(completed_only=True),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Backfilled counters for {days} daily meals."))
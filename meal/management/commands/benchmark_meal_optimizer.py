@@ -0,0 +1,81 @@
+import time
+from datetime import timedelta
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from accounts.models import User
+from recipe.models import Recipe
+from meal.constants import DEFAULT_SERVING_GRAMS
+from meal.optimizer import build_local_meal_plan
+
+
+FOR_TIMES = ["Breakfast", "Lunch", "Dinner", "Snack", "Lunch, Dinner", "Breakfast, Snack"]
+CATEGORIES = ["Main", "Salad", "Soup", "Snack", "Dessert"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the local meal-plan engine end to end (catalog query, scoring, assignment and the lookups of "
+        "the recipes used) for a user's profile, on synthetic recipe catalogs inserted in a transaction "
+        "that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="User whose profile the plans are built for.")
+        parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+        parser.add_argument("--days", type=int, default=15)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(email=options["email"]).select_related("profile").first()
+        profile = getattr(user, "profile", None)
+        if profile is None:
+            raise CommandError(f"No user with a profile and email {options['email']}.")
+
+        rng = np.random.default_rng(options["seed"])
+        self.stdout.write(f"{'recipes':>8} {'total ms':>9} {'queries':>8} {'kcal/day':>9}")
+        for size in options["sizes"]:
+            with transaction.atomic():
+                self._insert_catalog(rng, size)
+                catalog = Recipe.objects.filter(unique_id__startswith="bench-")
+
+                total_ms = 0.0
+                for _ in range(options["repeat"]):
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        result, _ = build_local_meal_plan(profile, catalog, days=options["days"])
+                        total_ms += (time.perf_counter() - started) * 1000
+
+                calories = dict(catalog.values_list("unique_id", "calories"))
+                kcal = np.mean([
+                    sum(float(calories[meal["recipe_uid"]]) * meal["grams"] / DEFAULT_SERVING_GRAMS
+                        for meal in day["meals"])
+                    for day in result["days"]
+                ])
+                transaction.set_rollback(True)
+
+            self.stdout.write(
+                f"{size:>8} {total_ms / options['repeat']:>9.2f} {len(queries):>8} {kcal:>9.0f}"
+            )
+
+    def _insert_catalog(self, rng, size):
+        Recipe.objects.bulk_create([
+            Recipe(
+                unique_id=f"bench-{number}",
+                recipe_name=f"Benchmark recipe {number}",
+                recipe_type="Vegetarian" if number % 3 else "Non-Vegetarian",
+                for_time=FOR_TIMES[number % len(FOR_TIMES)],
+                category=CATEGORIES[number % len(CATEGORIES)],
+                calories=round(rng.uniform(100, 900), 2),
+                protein=round(rng.uniform(2, 60), 2),
+                carbs=round(rng.uniform(2, 120), 2),
+                fat=round(rng.uniform(1, 45), 2),
+                making_time=timedelta(minutes=15),
+                time=timedelta(minutes=30),
+                ingredients="rice, beans, tomato, onion",
+                instructions="Cook everything.",
+            )
+            for number in range(size)
+        ], batch_size=1000)
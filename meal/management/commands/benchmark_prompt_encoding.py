@@ -0,0 +1,57 @@
+import json
+import random
+import time
+from django.core.management.base import BaseCommand
+from Fitness.prompt_encoding import encode_table, estimate_tokens, truncate_text
+from meal.services import RECIPE_COLUMNS, RECIPE_INGREDIENTS_LIMIT
+
+
+INGREDIENTS = [
+    "chicken breast", "brown rice", "broccoli", "olive oil", "garlic", "spinach", "oats",
+    "banana", "greek yogurt", "salmon", "sweet potato", "black beans", "avocado", "tomato",
+]
+
+
+def _synthetic_recipe(index, rng):
+    return {
+        "uid": f"{rng.getrandbits(64):016x}",
+        "name": f"Recipe {index} with {rng.choice(INGREDIENTS)}",
+        "cal": float(rng.randint(150, 900)),
+        "prot": round(rng.uniform(5, 60), 2),
+        "carb": round(rng.uniform(5, 120), 2),
+        "fat": round(rng.uniform(2, 45), 2),
+        "type": rng.choice(["Veg", "Non-Veg"]),
+        "slots": [rng.choice(["Breakfast", "Lunch", "Dinner", "Snack 1"])],
+        "ingredients": ", ".join(f"{rng.choice(INGREDIENTS)} ({rng.randint(10, 250)}g)" for _ in range(8)),
+    }
+
+
+class Command(BaseCommand):
+    help = "Compare prompt size and build time of the JSON and compact table catalog encodings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000])
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        self.stdout.write(f"{'items':>6} {'json tok':>10} {'table tok':>10} {'saved':>7} {'json ms':>8} {'table ms':>9}")
+
+        for size in options["sizes"]:
+            recipes = [_synthetic_recipe(i, rng) for i in range(size)]
+
+            started = time.perf_counter()
+            json_text = json.dumps(recipes, indent=2)
+            json_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            compact = [dict(r, ingredients=truncate_text(r["ingredients"], RECIPE_INGREDIENTS_LIMIT)) for r in recipes]
+            table_text, _ = encode_table(compact, RECIPE_COLUMNS, prefix="r")
+            table_ms = (time.perf_counter() - started) * 1000
+
+            json_tokens = estimate_tokens(json_text)
+            table_tokens = estimate_tokens(table_text)
+            saved = 1 - table_tokens / json_tokens if json_tokens else 0
+            self.stdout.write(
+                f"{size:>6} {json_tokens:>10} {table_tokens:>10} {saved:>6.0%} {json_ms:>8.1f} {table_ms:>9.1f}"
+            )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meal', '0008_mealentry_ingredients_en_mealentry_ingredients_es'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailymeal',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of completed meal entries'),
+        ),
+        migrations.AddField(
+            model_name='dailymeal',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of meal entries'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from datetime import date
 from accounts.models import User
 from recipe.models import Recipe
@@ -30,6 +31,8 @@ class MealPlan(models.Model):
 class DailyMeal(models.Model):
     meal_plan = models.ForeignKey(MealPlan, on_delete=models.CASCADE, related_name='daily_meals')
     date = models.DateField()
+    completed_count = models.PositiveIntegerField(default=0, help_text="Number of completed meal entries")
+    total_count = models.PositiveIntegerField(default=0, help_text="Number of meal entries")
 
     def __str__(self):
         return f"Meals on {self.date} for {self.meal_plan.user.email}"
@@ -57,4 +60,36 @@ class MealEntry(models.Model):
     def __str__(self):
         return f"{self.meal_type} on {self.daily_meal.date} - Completed: {self.completed}"
 
-
+    def _update_daily_counters(self, total_delta, completed_delta):
+        if not total_delta and not completed_delta:
+            return
+        DailyMeal.objects.filter(pk=self.daily_meal_id).update(
+            total_count=F('total_count') + total_delta,
+            completed_count=F('completed_count') + completed_delta,
+        )
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        tracks_completed = update_fields is None or 'completed' in update_fields
+
+        with transaction.atomic():
+            flipped = 0
+            if not adding and tracks_completed:
+                # Only the request whose UPDATE actually flips `completed` moves the counter
+                flipped = MealEntry.objects.filter(pk=self.pk, completed=not self.completed).update(completed=self.completed)
+
+            super().save(*args, **kwargs)
+
+            if adding:
+                self._update_daily_counters(1, int(self.completed))
+            elif flipped:
+                self._update_daily_counters(0, 1 if self.completed else -1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            completed = MealEntry.objects.select_for_update().filter(pk=self.pk).values_list('completed', flat=True).first()
+            result = super().delete(*args, **kwargs)
+            if result[1].get(self._meta.label):
+                self._update_daily_counters(-1, -int(bool(completed)))
+        return result
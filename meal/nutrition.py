@@ -0,0 +1,86 @@
+from datetime import date
+from accounts.constants import LIFESTYLE_HABITS
+from .constants import (
+    MEAL_COUNT_BY_LIFESTYLE, MEAL_SLOTS_BY_COUNT, SLOT_CALORIE_WEIGHTS,
+    MACRO_SPLIT_BY_GOAL, KETO_MACRO_SPLIT,
+)
+from .utils import get_display_label
+
+
+DEFAULT_DAILY_CALORIES = 2000
+MIN_DAILY_CALORIES = 1200
+
+
+
+
+def get_meal_slots(profile):
+    """Meal types for one day, derived from the profile's lifestyle habit (defaults to 3 meals)."""
+    readable_lifestyle = get_display_label(profile.lifestyle_habits, LIFESTYLE_HABITS)
+    meal_count = MEAL_COUNT_BY_LIFESTYLE.get(readable_lifestyle, 3)
+    return list(MEAL_SLOTS_BY_COUNT[meal_count])
+
+
+
+
+def _age(profile):
+    if not profile.date_of_birth:
+        return 30
+    today = date.today()
+    dob = profile.date_of_birth
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+
+
+def daily_calorie_target(profile):
+    """
+    Daily calorie target. Uses HealthProfile.total_calories_per_day when the user has one,
+    otherwise Mifflin-St Jeor with a light activity factor adjusted for the fitness goal.
+    """
+    health_profile = getattr(profile.user, 'health_profile', None)
+    if health_profile and health_profile.total_calories_per_day:
+        return float(health_profile.total_calories_per_day)
+
+    if not profile.weight or not profile.height:
+        return float(DEFAULT_DAILY_CALORIES)
+
+    bmr = 10 * profile.weight + 6.25 * profile.height - 5 * _age(profile)
+    bmr += -161 if profile.gender == 'female' else 5
+    calories = bmr * 1.4
+
+    goals = profile.fitness_goals or []
+    if 'Weight loss' in goals:
+        calories -= 500
+    elif 'Weight gain' in goals:
+        calories += 400
+    return float(max(MIN_DAILY_CALORIES, round(calories)))
+
+
+
+
+def macro_split(profile):
+    """(protein, carbs, fat) as share of calories for the profile's goal and diet."""
+    if profile.dietary_preferences == 'Keto':
+        return KETO_MACRO_SPLIT
+
+    goals = profile.fitness_goals or []
+    split = MACRO_SPLIT_BY_GOAL['Maintenance']
+    for goal in ('Weight loss', 'Weight gain'):
+        if goal in goals:
+            split = MACRO_SPLIT_BY_GOAL[goal]
+            break
+
+    # Diabetes: cap carbs at 40% and move the rest to protein
+    protein, carbs, fat = split
+    if 'Diabetes' in (profile.medical_conditions or []) and carbs > 0.40:
+        protein, carbs = protein + (carbs - 0.40), 0.40
+    return (protein, carbs, fat)
+
+
+
+
+def slot_calorie_targets(slots, daily_calories):
+    """Split the daily calorie target over the given meal slots."""
+    weights = [SLOT_CALORIE_WEIGHTS.get(slot, 0.10) for slot in slots]
+    total = sum(weights)
+    return {slot: daily_calories * w / total for slot, w in zip(slots, weights)}
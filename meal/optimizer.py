@@ -0,0 +1,148 @@
+from datetime import date, timedelta
+import numpy as np
+from accounts.constants import FITNESS_GOALS
+from recipe.models import Recipe, RecipeSpanish
+from .candidates import filter_recipes, annotate_medical_penalty, matches_slot
+from .constants import DEFAULT_EATING_TIMES, DEFAULT_SERVING_GRAMS
+from .nutrition import get_meal_slots, daily_calorie_target, macro_split, slot_calorie_targets
+from .utils import get_display_list
+
+
+MIN_PORTION_SCALE = 0.5       # never serve less than half a serving...
+MAX_PORTION_SCALE = 2.0       # ...or more than two servings
+OFF_SLOT_PENALTY = 1.0        # recipe not tagged for the slot (for_time), used only when the slot has too few
+MEDICAL_PENALTY_WEIGHT = 0.5  # per matched medical condition
+REPEAT_PENALTY = 0.25         # per earlier use of the same recipe in the plan
+RECENT_SLOT_DAYS = 2          # the same recipe is not repeated in a slot within this many days
+
+
+
+
+def score_recipes(calories, protein, carbs, fat, penalty, slot_match, target, split):
+    """
+    Vectorized score of every recipe for one slot (lower is better), and the portion scale
+    that brings each recipe closest to the slot's calorie target.
+
+    All arguments are 1-D arrays over the catalog except `target` (kcal) and `split`
+    ((protein, carbs, fat) share of calories).
+    """
+    energy = protein * 4 + carbs * 4 + fat * 9
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = np.stack([protein * 4, carbs * 4, fat * 9], axis=1) / energy[:, None]
+        scale = np.clip(target / calories, MIN_PORTION_SCALE, MAX_PORTION_SCALE)
+    macro_gap = np.where(energy > 0, np.abs(shares - np.asarray(split)).sum(axis=1), 3.0)
+    scale = np.where(calories > 0, scale, 1.0)
+    calorie_gap = np.abs(calories * scale - target) / target
+
+    score = macro_gap + calorie_gap + MEDICAL_PENALTY_WEIGHT * penalty + np.where(slot_match, 0.0, OFF_SLOT_PENALTY)
+    return score, scale
+
+
+
+
+def assign_meals(slot_scores, days):
+    """
+    Greedy day-by-day assignment over precomputed slot scores ({slot: score array}).
+
+    Variety constraints: a recipe is used at most once per day and not again in the same slot
+    within RECENT_SLOT_DAYS days; every earlier use adds REPEAT_PENALTY. Constraints are relaxed
+    only when the catalog is too small to satisfy them. Returns [[(slot, recipe_index), ...], ...].
+    """
+    size = len(next(iter(slot_scores.values()))) if slot_scores else 0
+    uses = np.zeros(size)
+    last_day_in_slot = {slot: np.full(size, -RECENT_SLOT_DAYS - 1) for slot in slot_scores}
+
+    plan = []
+    for day in range(days):
+        used_today = np.zeros(size, dtype=bool)
+        meals = []
+        for slot, score in slot_scores.items():
+            blocked = used_today | (day - last_day_in_slot[slot] <= RECENT_SLOT_DAYS)
+            total = score + REPEAT_PENALTY * uses
+            candidates = np.where(blocked, np.inf, total)
+            if not np.isfinite(candidates).any():
+                candidates = np.where(used_today, np.inf, total)
+                if not np.isfinite(candidates).any():
+                    candidates = total
+            index = int(np.argmin(candidates))
+
+            uses[index] += 1
+            used_today[index] = True
+            last_day_in_slot[slot][index] = day
+            meals.append((slot, index))
+        plan.append(meals)
+    return plan
+
+
+
+
+def plan_title(profile, days):
+    """Name and tags of a plan for `profile`, from its goals and diet only."""
+    goals = get_display_list(profile.fitness_goals, FITNESS_GOALS)
+    tags = [g.lower() for g in goals]
+    if profile.dietary_preferences and profile.dietary_preferences != 'No preferences':
+        tags.append(profile.dietary_preferences.lower())
+    name = f"{days}-Day {goals[0]} Plan" if goals else f"{days}-Day Balanced Plan"
+    return name, ",".join(tags or ["balanced"])
+
+
+
+
+def build_local_meal_plan(profile, queryset=None, days=15):
+    """
+    Build a meal plan without the LLM. Returns (result, recipes) where `result` has the same
+    shape as build_meal_plan's output and `recipes` are the Recipe rows it references, ready
+    for save_meal_plan. The catalog is read as plain value rows; one more query loads the
+    recipes the plan uses and one their Spanish ingredients.
+    """
+    slots = get_meal_slots(profile)
+    targets = slot_calorie_targets(slots, daily_calorie_target(profile))
+    split = macro_split(profile)
+
+    queryset = annotate_medical_penalty(filter_recipes(profile, queryset), profile)
+    rows = list(queryset.values_list(
+        'id', 'unique_id', 'for_time', 'calories', 'protein', 'carbs', 'fat', 'ingredients', 'medical_penalty'
+    ))
+    if not rows:
+        raise ValueError("No recipes match this profile.")
+    ids, unique_ids, for_times, calories, protein, carbs, fat, ingredients, penalty = zip(*rows)
+
+    calories = np.array([float(value or 0) for value in calories])
+    protein = np.array([float(value or 0) for value in protein])
+    carbs = np.array([float(value or 0) for value in carbs])
+    fat = np.array([float(value or 0) for value in fat])
+    penalty = np.array(penalty, dtype=float)
+    for_times = [(for_time or '').lower() for for_time in for_times]
+
+    slot_scores, slot_scales = {}, {}
+    for slot in slots:
+        slot_match = np.array([matches_slot(for_time, slot) for for_time in for_times], dtype=bool)
+        slot_scores[slot], slot_scales[slot] = score_recipes(
+            calories, protein, carbs, fat, penalty, slot_match, targets[slot], split
+        )
+
+    plan = assign_meals(slot_scores, days)
+
+    used = sorted({index for meals in plan for _, index in meals})
+    used_recipes = list(Recipe.objects.filter(id__in=[ids[index] for index in used]).order_by('id'))
+    spanish = dict(RecipeSpanish.objects.filter(
+        unique_id__in=[unique_ids[index] for index in used]
+    ).values_list('unique_id', 'ingredients'))
+
+    start_date = date.today()
+    result_days = []
+    for offset, meals in enumerate(plan):
+        result_days.append({
+            "date": (start_date + timedelta(days=offset)).isoformat(),
+            "meals": [{
+                "meal_type": slot,
+                "recipe_uid": unique_ids[index],
+                "eating_time": DEFAULT_EATING_TIMES.get(slot, "12:00"),
+                "grams": round(DEFAULT_SERVING_GRAMS * float(slot_scales[slot][index])),
+                "ingredients_en": ingredients[index],
+                "ingredients_es": spanish.get(unique_ids[index]),
+            } for slot, index in meals],
+        })
+
+    meal_plan_name, tags = plan_title(profile, days)
+    return {"meal_plan_name": meal_plan_name, "tags": tags, "days": result_days}, used_recipes
@@ -1,12 +1,21 @@
 from rest_framework import serializers
 from .models import MealPlan, DailyMeal, MealEntry
 from recipe.models import Recipe ,RecipeSpanish
+from recipe.twins import context_resolver
+
+
+# Twin translation bookkeeping (recipe.twins, recipe.translation_jobs), left out of the full recipe payloads
+TWIN_SYNC_FIELDS = ['translation_status', 'translation_error', 'translation_attempts', 'translation_started_at']
 
 
 
 class MealEntryWriteSerializer(serializers.Serializer):
-    meal_type     = serializers.CharField()
-    recipe_uid    = serializers.CharField(source='recipe.unique_id')
+    meal_type      = serializers.CharField(max_length=50)
+    recipe_uid     = serializers.CharField(allow_blank=True, allow_null=True, required=False)
+    eating_time    = serializers.TimeField(input_formats=['%H:%M', '%H:%M:%S'], allow_null=True, required=False)
+    grams          = serializers.DecimalField(max_digits=6, decimal_places=2, allow_null=True, required=False)
+    ingredients_en = serializers.CharField(allow_blank=True, allow_null=True, required=False)
+    ingredients_es = serializers.CharField(allow_blank=True, allow_null=True, required=False)
 
 
 
@@ -19,9 +28,13 @@ class DailyMealWriteSerializer(serializers.Serializer):
 
 
 class MealPlanWriteSerializer(serializers.Serializer):
-    meal_plan_name = serializers.CharField(required=False, default='15‑Day AI Plan')
-    tags           = serializers.CharField(required=False, allow_blank=True)
-    daily_meals    = DailyMealWriteSerializer(many=True)
+    """
+    Validates a generated meal plan payload ({meal_plan_name, tags, days}) before
+    anything is written to the database.
+    """
+    meal_plan_name = serializers.CharField(max_length=255, required=False, default='15‑Day AI Plan')
+    tags           = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+    days           = DailyMealWriteSerializer(many=True)
 
 
 
@@ -57,7 +70,7 @@ class DaywiseDailyMealSerializer(serializers.ModelSerializer):
 class FullRecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
-        fields = '__all__'
+        exclude = TWIN_SYNC_FIELDS
 
 
 
@@ -76,7 +89,7 @@ class RecipeSpanishSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     class Meta:
         model = RecipeSpanish
-        fields = '__all__'
+        exclude = TWIN_SYNC_FIELDS + ['source_hash']
         read_only_fields = ['image_url']
 
     def get_image_url(self, obj):
@@ -111,13 +124,11 @@ class MealEntryWithFullRecipeSpanishSerializer(serializers.ModelSerializer):
         fields = ['ingredients_es','grams','eating_time','meal_type', 'recipe','completed','id']
     
     def get_recipe(self, obj):
-        from recipe.models import RecipeSpanish
         if obj.recipe and obj.recipe.unique_id:
-            try:
-                recipe_sp = RecipeSpanish.objects.get(unique_id=obj.recipe.unique_id)
+            # Twins prefetched by the view (recipe.twins.prefetch_twins), else one query per entry
+            recipe_sp = context_resolver(self.context, RecipeSpanish).get(obj.recipe.unique_id)
+            if recipe_sp:
                 return RecipeSpanishSerializer(recipe_sp,context=self.context).data
-            except RecipeSpanish.DoesNotExist:
-                return None
         return None
 
 
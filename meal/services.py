@@ -1,25 +1,59 @@
 import json, datetime, openai
 from django.conf import settings
-from recipe.models import Recipe
+from django.db import transaction
+from rest_framework import serializers
+from recipe.models import Recipe, RecipeSpanish
+from .models import MealPlan, DailyMeal, MealEntry
+from .serializers import MealPlanWriteSerializer, DailyMealWriteSerializer
 from accounts.constants import FITNESS_GOALS, LIFESTYLE_HABITS
 from .utils import get_display_label, get_display_list
+from .nutrition import daily_calorie_target
+from .candidates import select_recipe_candidates, flatten_candidates
+from .optimizer import build_local_meal_plan, plan_title
+from Fitness.prompt_encoding import DELIMITER, encode_table, resolve_aliases, truncate_text
+from Fitness.plan_chunks import chunk_dates, rotation_hints, run_chunks, merge_chunk_days, first_value
+from Fitness.json_stream import StreamingArrayParser, stream_completion
+from userapi import plan_memo
+from AiChat.context import invalidate_chat_context
 openai.api_key = settings.OPENAI_API_KEY
 from datetime import date, timedelta
 
 
+RECIPE_INGREDIENTS_LIMIT = 80
+RECIPE_COLUMNS = [
+    ("name", "name"), ("kcal", "cal"), ("p", "prot"), ("c", "carb"), ("f", "fat"),
+    ("type", "type"), ("slots", "slots"), ("ingredients", "ingredients"),
+]
+MEAL_PLAN_SYSTEM_PROMPT = "You are a helpful meal-plan assistant."
 
-def build_meal_plan(profile, recipes_qs, days=15):
-    recipes = [{
-        "uid": r.unique_id,
-        "name": r.recipe_name,
-        "cal": float(r.calories),
-        "prot": float(r.protein),
-        "carb": float(r.carbs),
-        "fat": float(r.fat),
-        "type": r.recipe_type,
-        "for":  r.for_time,
-        "ingredients": r.ingredients,
-    } for r in recipes_qs]
+
+
+def meal_plan_prompt(profile, candidates):
+    """
+    Prompt builder for a meal plan. `candidates` is the {meal_slot: [Recipe]} mapping returned
+    by meal.candidates.select_recipe_candidates; every recipe is listed once with its slots,
+    as a compact table with short aliases that are mapped back to unique_ids afterwards.
+
+    Returns (prompt_for, aliases) where prompt_for(dates, favoured=()) renders the prompt
+    for a list of ISO dates and aliases maps alias -> recipe unique_id.
+    """
+    recipes = {}
+    for slot, slot_recipes in candidates.items():
+        for r in slot_recipes:
+            if r.unique_id not in recipes:
+                recipes[r.unique_id] = {
+                    "uid": r.unique_id,
+                    "name": r.recipe_name,
+                    "cal": float(r.calories),
+                    "prot": float(r.protein),
+                    "carb": float(r.carbs),
+                    "fat": float(r.fat),
+                    "type": r.recipe_type,
+                    "slots": [],
+                    "ingredients": truncate_text(r.ingredients, RECIPE_INGREDIENTS_LIMIT),
+                }
+            recipes[r.unique_id]["slots"].append(slot)
+    recipe_table, aliases = encode_table(recipes.values(), RECIPE_COLUMNS, prefix='r')
 
     fitness_goals = get_display_list(profile.fitness_goals, FITNESS_GOALS)
     readable_lifestyle = get_display_label(profile.lifestyle_habits, LIFESTYLE_HABITS)
@@ -38,36 +72,12 @@ def build_meal_plan(profile, recipes_qs, days=15):
      
     }
 
-    # Map lifestyle habit to number of meals per day
-    MEAL_COUNT_BY_LIFESTYLE = {
-        '3 Meals': 3,
-        '4 Meals': 4,
-        '5 Meals': 5,
-        '6 Meals': 6,
-        '7 Meals': 7,
-        '8 Meals': 8,
-    }
-    meal_count = MEAL_COUNT_BY_LIFESTYLE.get(readable_lifestyle, 3)
-
-    # Define meal types up to 8 meals/day
-    meal_types = [
-        "Breakfast",
-        "Snack"
-        "Snack 1",
-        "Lunch",
-        "Snack 2",
-        "Dinner",
-        "Snack 3",
-        "Post-Dinner",
-        "Late Snack"
-    ]
-    
-    meal_count = MEAL_COUNT_BY_LIFESTYLE.get(readable_lifestyle, 3)
-    selected_meals = meal_types[:meal_count]
+    selected_meals = list(candidates)
+    calorie_target = round(daily_calorie_target(profile))
 
     # Build the JSON example for prompt (with placeholders)
     meal_json = ",\n        ".join([
-    f'{{"meal_type": "{meal}", "recipe_uid": "abc123", "eating_time": "08:00"}}' for meal in selected_meals
+    f'{{"meal_type": "{meal}", "recipe_uid": "r1", "eating_time": "08:00"}}' for meal in selected_meals
 ])
     # meal_json = ",\n        ".join([  # Include grams as "grams" for each meal
     #     f'{{"meal_type": "{meal}", "recipe_uid": "abc123", "eating_time": "08:00", "grams": "300", '
@@ -75,28 +85,31 @@ def build_meal_plan(profile, recipes_qs, days=15):
     #     for meal in selected_meals
     # ])
 
-    start_date = date.today()
-    date_list = [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
-
-    prompt = f"""
+    def prompt_for(chunk, favoured=()):
+        chunk_days = len(chunk)
+        rotation = (
+            f"\nFavour these recipes where they fit (other parts of the plan favour the rest): {', '.join(favoured)}\n"
+            if favoured else ""
+        )
+        return f"""
 You are a certified nutritionist.
 
 The user has the following fitness goals: {", ".join(fitness_goals)}.
 They prefer a routine of {readable_lifestyle.lower()} per day.
+Their daily calorie target is about {calorie_target} kcal; choose grams so each day lands close to it.
 
-Use these exact {days} dates for the meal plan:
-{json.dumps(date_list, indent=2)}
+Use these exact {chunk_days} dates for the meal plan:
+{json.dumps(chunk, separators=(",", ":"))}
 
-Generate a {days}-day meal plan using the provided recipes and user profile.
+Generate a {chunk_days}-day meal plan using the provided recipes and user profile.
 
 ⚠️ IMPORTANT:
 - Each day MUST include **Breakfast**, **Lunch**, and **Dinner**.
-- You may add optional meals like snacks based on the user's lifestyle.
+- Each day MUST contain exactly these meal types, in this order: {", ".join(selected_meals)}.
+- Only use a recipe for a meal type listed in its "slots"; `recipe_uid` is the recipe's "id" (e.g. "r1").
 - Do NOT return any day that skips any of those three meals.
 - ✅ Each meal entry MUST also include an `eating_time` in 24-hour format (HH:MM), appropriate to the meal type.
 - ✅ Each meal entry MUST also include the grams of food the user should eat (e.g., "grams": "300").
-- ✅ Each meal entry MUST include the ingredients in both English and Spanish in the format:
-  "ingredients_en": "ingredient_name (quantity)", "ingredients_es": "ingredient_name (quantity)" separated by commas.
 
 ✅ Output format (MUST be valid JSON):
 {{
@@ -114,29 +127,296 @@ Generate a {days}-day meal plan using the provided recipes and user profile.
 }}
 
 User profile (for reference):
-{json.dumps(profile_dict, indent=2)}
+{json.dumps(profile_dict, separators=(",", ":"))}
+
+Available recipes ("{DELIMITER}"-separated, kcal/p/c/f per serving, p/c/f in grams, ingredients shortened):
+{recipe_table}
+{rotation}"""
+
+    return prompt_for, aliases
 
-Available recipes:
-{json.dumps(recipes[:200], indent=2)}
-"""
 
+
+
+def _complete_json(prompt):
     chat = openai.ChatCompletion.create(
         model="gpt-5-nano",
         response_format={"type": "json_object"},
         messages=[
-            {"role": "system", "content": "You are a helpful meal-plan assistant."},
+            {"role": "system", "content": MEAL_PLAN_SYSTEM_PROMPT},
             {"role": "user", "content": prompt}
         ],
         # temperature=0.5
     )
+    return json.loads(chat.choices[0].message.content)
+
+
+
+
+def plan_dates(days, start_date=None):
+    start_date = start_date or date.today()
+    return [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+
+
+
+
+def build_meal_plan(profile, candidates, days=15):
+    """
+    Ask the LLM for a plan (see meal_plan_prompt). With settings.PLAN_CHUNK_DAYS the date range
+    is requested in chunks that run concurrently; all chunks share the candidate table and
+    each is asked to favour a different share of it (rotation_hints).
+    """
+    prompt_for, aliases = meal_plan_prompt(profile, candidates)
+    date_list = plan_dates(days)
+    chunks = chunk_dates(date_list)
+    uid_alias = {uid: alias for alias, uid in aliases.items()}
+    hints = rotation_hints(
+        [[uid_alias[r.unique_id] for r in slot_recipes] for slot_recipes in candidates.values()], len(chunks)
+    )
 
-    response_json = json.loads(chat.choices[0].message.content)
+    responses = run_chunks(lambda chunk, favoured: _complete_json(prompt_for(chunk, favoured)), chunks, hints)
+    plan_days = merge_chunk_days(responses, date_list, "meals", "meal_type")
+    if len(plan_days) < days:
+        raise serializers.ValidationError({"days": f"OpenAI returned {len(plan_days)} of {days} days."})
     return {
-        "meal_plan_name": response_json.get("meal_plan_name", f"{days}-Day AI Plan"),
-        "tags": response_json.get("tags", ""),
-        "days": response_json["days"]
+        "meal_plan_name": first_value(responses, "meal_plan_name", f"{days}-Day AI Plan"),
+        "tags": first_value(responses, "tags", ""),
+        "days": resolve_aliases(plan_days, "meals", "recipe_uid", aliases)
     }
 
 
 
 
+def recipe_ingredients(recipes):
+    """Full English and Spanish ingredients of `recipes`, as {unique_id: (en, es)}. One query."""
+    recipes = list(recipes)
+    spanish = dict(RecipeSpanish.objects.filter(
+        unique_id__in=[r.unique_id for r in recipes]
+    ).values_list('unique_id', 'ingredients'))
+    return {r.unique_id: (r.ingredients, spanish.get(r.unique_id)) for r in recipes}
+
+
+
+
+def fill_ingredients(days_data, ingredients):
+    """
+    Set the ingredients of every meal in `days_data` from its recipe in `ingredients` (see
+    recipe_ingredients), in place. The LLM only sees shortened ingredients, so it is not asked
+    for them; meals that already carry ingredients (local engine) keep them.
+    """
+    for day in days_data or []:
+        for meal in day.get("meals") or []:
+            en, es = ingredients.get(meal.get("recipe_uid"), (None, None))
+            meal["ingredients_en"] = meal.get("ingredients_en") or en
+            meal["ingredients_es"] = meal.get("ingredients_es") or es
+    return days_data
+
+
+
+
+def save_meal_plan(user, result, recipes, days=15):
+    """
+    Validate a generated plan and write MealPlan, DailyMeal and MealEntry rows in one
+    transaction. The number of queries does not depend on how many days/meals the plan has.
+    Raises serializers.ValidationError before touching the database if the payload is invalid.
+    """
+    recipes = list(recipes)
+    if any(not m.get("ingredients_en") for day in result.get("days") or [] for m in day.get("meals") or []):
+        fill_ingredients(result["days"], recipe_ingredients(recipes))
+    serializer = MealPlanWriteSerializer(data=result)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    uid_cache = {r.unique_id: r for r in recipes}
+    today = date.today()
+
+    with transaction.atomic():
+        meal_plan = MealPlan.objects.create(
+            user=user,
+            meal_plan_name=data["meal_plan_name"],
+            tags=data["tags"],
+            start_date=today,
+            end_date=today + timedelta(days=days - 1),
+        )
+        create_daily_meals(meal_plan, data["days"], uid_cache)
+
+    return meal_plan
+
+
+
+
+def create_daily_meals(meal_plan, days_data, uid_cache):
+    """Bulk insert validated days (DailyMealWriteSerializer data) and their entries for `meal_plan`."""
+    daily_meals = DailyMeal.objects.bulk_create([
+        DailyMeal(meal_plan=meal_plan, date=day["date"], total_count=len(day["meals"]), completed_count=0)
+        for day in days_data
+    ])
+
+    entries = []
+    for daily, day in zip(daily_meals, days_data):
+        for m in day["meals"]:
+            entries.append(MealEntry(
+                daily_meal=daily,
+                meal_type=m["meal_type"],
+                recipe=uid_cache.get(m.get("recipe_uid")),  # can be None if not found
+                eating_time=m.get("eating_time"),
+                grams=m.get("grams"),
+                ingredients_en=m.get("ingredients_en"),
+                ingredients_es=m.get("ingredients_es"),
+            ))
+    MealEntry.objects.bulk_create(entries, batch_size=500)
+    return daily_meals
+
+
+
+
+def generate_meal_plan(user, profile, engine=None, days=15):
+    """
+    Generate and save a meal plan with the requested engine ("llm" or "local", default
+    settings.MEAL_PLAN_ENGINE). Returns (meal_plan, engine_used).
+
+    LLM plans are memoized by profile fingerprint (userapi.plan_memo), so a matching earlier
+    plan is reused ("memo") without calling the LLM.
+
+    With MEAL_PLAN_LOCAL_FALLBACK the local engine takes over when the LLM call fails or
+    returns an invalid plan; otherwise the error is raised (serializers.ValidationError for
+    an invalid plan, the OpenAI exception otherwise). Raises ValueError when no recipe fits.
+    """
+    engine = engine or settings.MEAL_PLAN_ENGINE
+    llm_error = None
+    if engine == "llm":
+        # Reuse a plan generated for the same inputs (re-based to today) when there is one
+        fingerprint = None
+        if plan_memo.memo_enabled():
+            fingerprint = plan_memo.meal_fingerprint(profile, daily_calorie_target(profile))
+            memo = plan_memo.lookup_plan("meal", fingerprint)
+            if memo is not None and len(memo[0]["days"]) == days:
+                result, uids = memo
+                result["meal_plan_name"], result["tags"] = plan_title(profile, days)
+                recipes = Recipe.objects.filter(unique_id__in=uids)
+                return save_meal_plan(user, result, recipes, days=days), "memo"
+
+        # Pick a small, relevant set of recipes per meal slot (reused for the prompt and the uid lookup)
+        candidates = select_recipe_candidates(profile, Recipe.objects.all())
+        recipes = flatten_candidates(candidates)
+        try:
+            result = build_meal_plan(profile, candidates, days=days)
+            meal_plan = save_meal_plan(user, result, recipes, days=days)
+            if fingerprint:
+                plan_memo.store_plan("meal", fingerprint, result)
+            return meal_plan, engine
+        except Exception as e:
+            if not settings.MEAL_PLAN_LOCAL_FALLBACK:
+                raise
+            llm_error = e
+
+    try:
+        result, recipes = build_local_meal_plan(profile, Recipe.objects.all(), days=days)
+    except ValueError:
+        if llm_error is not None:
+            raise llm_error
+        raise
+    return save_meal_plan(user, result, recipes, days=days), "local"
+
+
+
+
+def stream_meal_plan(user, profile, days=15):
+    """
+    Generate a meal plan with a streamed LLM completion and persist every day as soon as its
+    JSON object is complete. Yields progress events (dicts) for the client:
+
+      {"event": "plan", "meal_plan_id"}                    plan row created
+      {"event": "day", "date", "daily_meal_id", "meals"}  one day saved
+      {"event": "done", "meal_plan_id", "days", "filled_locally", "engine"}
+      {"event": "error", "detail"}                         nothing usable was generated
+
+    Days the LLM skipped or got wrong are filled by the local engine when
+    MEAL_PLAN_LOCAL_FALLBACK is on. The plan is deleted unless "done" is sent, also when
+    the client goes away mid-stream.
+    """
+    candidates = select_recipe_candidates(profile, Recipe.objects.all())
+    uid_cache = {r.unique_id: r for r in flatten_candidates(candidates)}
+    ingredients = recipe_ingredients(uid_cache.values())
+    prompt_for, aliases = meal_plan_prompt(profile, candidates)
+    date_list = plan_dates(days)
+    today = date.today()
+
+    meal_plan = MealPlan.objects.create(
+        user=user,
+        meal_plan_name=f"{days}-Day AI Plan",
+        tags="",
+        start_date=today,
+        end_date=today + timedelta(days=days - 1),
+    )
+    finished = False
+    try:
+        yield {"event": "plan", "meal_plan_id": meal_plan.id}
+
+        saved = set()
+        parser = StreamingArrayParser("days")
+        error = None
+        try:
+            for text in stream_completion(
+                model="gpt-5-nano",
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": MEAL_PLAN_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt_for(date_list)}
+                ],
+            ):
+                for day in parser.feed(text):
+                    resolve_aliases([day], "meals", "recipe_uid", aliases)
+                    fill_ingredients([day], ingredients)
+                    serializer = DailyMealWriteSerializer(data=day)
+                    if not serializer.is_valid() or str(serializer.validated_data["date"]) not in date_list:
+                        continue
+                    data = serializer.validated_data
+                    if str(data["date"]) in saved:
+                        continue
+                    daily = create_daily_meals(meal_plan, [data], uid_cache)[0]
+                    saved.add(str(data["date"]))
+                    yield {"event": "day", "date": str(data["date"]), "daily_meal_id": daily.id, "meals": len(data["meals"])}
+        except Exception as e:
+            error = e
+
+        header = parser.result()
+        MealPlan.objects.filter(pk=meal_plan.pk).update(
+            meal_plan_name=str(header.get("meal_plan_name") or meal_plan.meal_plan_name)[:255],
+            tags=str(header.get("tags") or "")[:255],
+        )
+
+        missing = [d for d in date_list if d not in saved]
+        if missing and settings.MEAL_PLAN_LOCAL_FALLBACK:
+            try:
+                result, recipes = build_local_meal_plan(profile, Recipe.objects.all(), days=days)
+            except ValueError as e:
+                error = error or e
+            else:
+                local_days = [day for day in result["days"] if day["date"] in missing]
+                serializer = DailyMealWriteSerializer(data=local_days, many=True)
+                if not serializer.is_valid():
+                    yield {"event": "error", "detail": f"Local meal plan is invalid: {serializer.errors}"}
+                    return
+                for daily, day in zip(create_daily_meals(meal_plan, serializer.validated_data, {r.unique_id: r for r in recipes}), local_days):
+                    yield {"event": "day", "date": day["date"], "daily_meal_id": daily.id, "meals": len(day["meals"])}
+                missing = []
+
+        if missing:
+            yield {"event": "error", "detail": f"OpenAI error: {error}" if error else f"OpenAI returned {len(saved)} of {days} days."}
+            return
+
+        # Days were bulk inserted, which sends no signals for the chat context cache
+        invalidate_chat_context(user.pk)
+        finished = True
+        yield {
+            "event": "done",
+            "meal_plan_id": meal_plan.id,
+            "days": days,
+            "filled_locally": days - len(saved),
+            "engine": "llm" if len(saved) == days else "llm+local",
+        }
+    finally:
+        # Client gone, exception or error event: never leave a half-built plan behind
+        if not finished:
+            meal_plan.delete()
@@ -1,3 +1,161 @@
-from django.test import TestCase
+import uuid
+from datetime import date, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User
+from recipe.models import Recipe, RecipeSpanish
+from .candidates import filter_recipes
+from .models import MealPlan, DailyMeal, MealEntry
+from .services import save_meal_plan
 
 # Create your tests here.
+
+
+
+
+class CompletionCounterTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="u", email="u@example.com")
+        plan = MealPlan.objects.create(user=user, meal_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        self.day = DailyMeal.objects.create(meal_plan=plan, date=date.today())
+        self.entries = [MealEntry.objects.create(daily_meal=self.day, meal_type=meal_type) for meal_type in ("breakfast", "lunch")]
+
+    def counters(self):
+        self.day.refresh_from_db()
+        return self.day.completed_count, self.day.total_count
+
+    def test_create_toggle_and_delete(self):
+        self.assertEqual(self.counters(), (0, 2))
+        entry = self.entries[0]
+        entry.completed = True
+        entry.save()
+        self.assertEqual(self.counters(), (1, 2))
+        entry.delete()
+        self.assertEqual(self.counters(), (0, 1))
+
+    def test_concurrent_toggles_count_once(self):
+        first, second = MealEntry.objects.get(pk=self.entries[0].pk), MealEntry.objects.get(pk=self.entries[0].pk)
+        first.completed = second.completed = True
+        first.save()
+        second.save()
+        self.assertEqual(self.counters(), (1, 2))
+
+        # A stale instance that still holds completed=True unmarks the entry once
+        first.completed = False
+        first.save(update_fields=['completed'])
+        second.completed = False
+        second.save()
+        self.assertEqual(self.counters(), (0, 2))
+
+    def test_backfill(self):
+        MealEntry.objects.filter(pk=self.entries[0].pk).update(completed=True)
+        DailyMeal.objects.filter(pk=self.day.pk).update(completed_count=0, total_count=0)
+        call_command("backfill_meal_counters", stdout=StringIO())
+        self.assertEqual(self.counters(), (1, 2))
+
+
+
+
+def _recipe(name, ingredients):
+    return Recipe.objects.create(
+        unique_id=str(uuid.uuid4()), recipe_name=name, recipe_type="Veg", for_time="Lunch", category="Main",
+        calories=300, carbs=1, protein=10, fat=5, making_time=timedelta(minutes=10), time=timedelta(minutes=10),
+        ingredients=ingredients, instructions="Cook.",
+    )
+
+
+
+
+
+def _twin(recipe, ingredients="arroz"):
+    return RecipeSpanish.objects.create(
+        unique_id=recipe.unique_id, recipe_name=f"ES {recipe.recipe_name}", recipe_type="Veg", for_time="Almuerzo",
+        category="Principal", calories=300, carbs=1, protein=10, fat=5, making_time=timedelta(minutes=10),
+        time=timedelta(minutes=10), ingredients=ingredients, instructions="Cocinar.",
+    )
+
+
+
+
+class KeywordFilterTests(TestCase):
+    def kept(self, diet=None, allergies=()):
+        profile = SimpleNamespace(dietary_preferences=diet, allergies=list(allergies))
+        return set(filter_recipes(profile).values_list('recipe_name', flat=True))
+
+    def test_keywords_match_whole_words_only(self):
+        for diet, allergies, excluded, kept in [
+            (None, ["Eggs"], ("Scrambled eggs", "2 eggs, salt"), ("Eggplant parmesan", "eggplant, tomato")),
+            ("Paleo", [], ("Overnight oats", "oats, water"), ("Goat curry", "goat, onion")),
+            (None, ["Nuts"], ("Trail mix", "mixed nuts, raisins"), ("Coconut curry", "coconut, nutmeg, onion")),
+            ("Vegetarian", [], ("Ham sandwich", "ham, lettuce"), ("Graham crackers", "graham flour, honey")),
+            ("Keto", [], ("Fried rice", "rice, soy sauce"), ("Licorice tea", "licorice root, water")),
+        ]:
+            with self.subTest(excluded=excluded[0], kept=kept[0]):
+                Recipe.objects.all().delete()
+                _recipe(*excluded)
+                _recipe(*kept)
+                self.assertEqual(self.kept(diet, allergies), {kept[0]})
+
+    def test_plurals_and_compound_words_are_excluded(self):
+        _recipe("Berry bowl", "blueberries, walnuts")
+        _recipe("Anchovy toast", "anchovies, bread")
+        _recipe("Plain toast", "bread")
+        self.assertEqual(self.kept("Vegetarian", ["Nuts"]), {"Plain toast"})
+
+
+
+
+class SaveMealPlanTests(TestCase):
+    def test_llm_meals_get_the_full_catalog_ingredients(self):
+        user = User.objects.create_user(username="u", email="u@example.com")
+        ingredients = "rolled oats (80g), milk (200ml), " + ", ".join(f"topping {i} (5g)" for i in range(20))
+        recipe = _recipe("Porridge", ingredients)
+        _twin(recipe, ingredients="avena (80g), leche (200ml)")
+        result = {"meal_plan_name": "Plan", "tags": "", "days": [{
+            "date": date.today().isoformat(),
+            "meals": [{"meal_type": "Lunch", "recipe_uid": recipe.unique_id, "eating_time": "13:00", "grams": "300"}],
+        }]}
+
+        plan = save_meal_plan(user, result, [recipe], days=1)
+        entry = MealEntry.objects.get(daily_meal__meal_plan=plan)
+        self.assertEqual((entry.ingredients_en, entry.ingredients_es), (ingredients, "avena (80g), leche (200ml)"))
+
+
+
+
+
+@override_settings(CATALOG_TWIN_CACHE_SECONDS=0)
+class SpanishMealViewQueryTests(TestCase):
+    """The Spanish meal views cost the same number of queries for 1 entry as for many."""
+
+    def day_with_entries(self, count):
+        user = User.objects.create_user(username=f"u{count}", email=f"u{count}@example.com")
+        plan = MealPlan.objects.create(user=user, meal_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        daily_meal = DailyMeal.objects.create(meal_plan=plan, date=date.today())
+        for i in range(count):
+            recipe = _recipe(f"Recipe {count}-{i}", "rice")
+            _twin(recipe)
+            MealEntry.objects.create(daily_meal=daily_meal, meal_type="Lunch", recipe=recipe)
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, daily_meal
+
+    def queries(self, count, url_name, by_day=False):
+        client, daily_meal = self.day_with_entries(count)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse(url_name, args=[daily_meal.pk] if by_day else []))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_daily_meal_detail(self):
+        self.assertEqual(self.queries(1, "spanish-daily-meal-detail", by_day=True),
+                         self.queries(5, "spanish-daily-meal-detail", by_day=True))
+
+    def test_todays_meals(self):
+        self.assertEqual(self.queries(1, "spanish-todays-meals"), self.queries(5, "spanish-todays-meals"))
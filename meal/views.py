@@ -1,14 +1,19 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework import status, serializers
 from datetime import date, timedelta
 from .serializers import DaywiseDailyMealSerializer,MealEntryWithFullRecipeSerializer,MealEntryWithFullRecipeSpanishSerializer
 from .models import MealPlan, DailyMeal, MealEntry
 from recipe.models import Recipe,RecipeSpanish
+from recipe.twins import prefetch_twins
 from accounts.models import Profile
 from accounts.permissions import IsUserRole
-from .services import build_meal_plan
+from .services import generate_meal_plan, stream_meal_plan
+from userapi.jobs import plan_conflict
+from userapi.models import PlanGenerationJob
+from django.http import StreamingHttpResponse
+import json
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from datetime import time,date
@@ -42,7 +47,16 @@ class GenerateMealPlanView(APIView):
         This uses OpenAI to intelligently create meal suggestions (breakfast, lunch, dinner) for each day.
 
         ✅ No request body is required. Only the logged-in user's profile is used.
+        Optionally pass `engine`: `llm` (OpenAI) or `local` (fast, deterministic, no OpenAI call).
+        When the OpenAI call fails, the local engine is used as a fallback.
         """,
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=[],
+            properties={
+                "engine": openapi.Schema(type=openapi.TYPE_STRING, enum=["llm", "local"], description="Generation engine (optional)")
+            },
+        ),
         tags=["AI Meal Plan"],
         responses={
             201: openapi.Response(
@@ -52,10 +66,12 @@ class GenerateMealPlanView(APIView):
                         "detail": "Meal plan created successfully",
                         "meal_plan_id": 42,
                         "meal_plan_name": "High Protein Muscle Gain Plan",
-                        "tags": "protein,balanced,fitness"
+                        "tags": "protein,balanced,fitness",
+                        "engine": "llm"
                     }
                 }
             ),
+            400: openapi.Response(description="Unknown engine"),
             404: openapi.Response(description="User profile not found"),
             500: openapi.Response(description="OpenAI error or internal failure")
         }
@@ -64,14 +80,9 @@ class GenerateMealPlanView(APIView):
     def post(self, request):
         user = request.user
         
-        active_meal_plan = MealPlan.objects.filter(
-            user=user,
-            is_completed=False,
-            is_cancelled=False,
-        ).first()
-
-        if active_meal_plan:
-            return Response({"detail": "User already has an active meal plan."}, status=409)
+        conflict = plan_conflict(user, PlanGenerationJob.KIND_MEAL)
+        if conflict:
+            return Response({"detail": conflict}, status=409)
 
         # 1. Ensure user has profile
         try:
@@ -79,61 +90,75 @@ class GenerateMealPlanView(APIView):
         except Profile.DoesNotExist:
             return Response({"detail": "Profile not found."}, status=404)
 
-        # 2. Get recipes
-        recipes_qs = Recipe.objects.exclude(unique_id__isnull=True).exclude(unique_id__exact='')
+        engine = request.data.get("engine")
+        if engine not in (None, "", "llm", "local"):
+            return Response({"detail": "engine must be 'llm' or 'local'."}, status=400)
 
-        # 3. Generate AI meal plan
+        # 2. Generate the plan and save MealPlan, DailyMeal and MealEntry rows in one transaction
+        #    (the local engine is used as fallback when the LLM fails)
         try:
-            result = build_meal_plan(profile, recipes_qs, days=15)
-            meal_plan_name = result.get("meal_plan_name", "15-Day AI Plan")
-            tags = result.get("tags", "")
-            plan_days = result.get("days", [])
+            meal_plan, engine = generate_meal_plan(user, profile, engine or None, days=15)
+        except serializers.ValidationError as e:
+            return Response({"detail": "OpenAI returned an invalid meal plan.", "errors": e.detail}, status=500)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=404)
         except Exception as e:
             return Response({"detail": f"OpenAI error: {str(e)}"}, status=500)
 
-        # 4. Create MealPlan instance
-        today = date.today()
-        meal_plan = MealPlan.objects.create(
-            user=user,
-            meal_plan_name=meal_plan_name,
-            tags=tags,
-            start_date=today,
-            end_date=today + timedelta(days=14),
-        )
-
-        # 5. Cache recipes by unique_id for fast lookup
-        uid_cache = {r.unique_id: r for r in recipes_qs}
-
-        # 6. Loop through days and meals
-        for day in plan_days:
-            daily = DailyMeal.objects.create(
-                meal_plan=meal_plan,
-                date=day["date"]
-            )
-            for m in day["meals"]:
-                print(m)
-                recipe = uid_cache.get(m["recipe_uid"])
-                MealEntry.objects.create(
-                    daily_meal=daily,
-                    meal_type=m["meal_type"],
-                    recipe=recipe,  # can be None if not found
-                    eating_time=datetime.datetime.strptime(m["eating_time"], "%H:%M").time() if "eating_time" in m else None,
-                    grams=m["grams"],
-                    ingredients_en=m["ingredients_en"],
-                    ingredients_es=m["ingredients_es"],
-                )
-
-        # 7. Return response
+        # 3. Return response
         return Response({
             "detail": "Meal plan created successfully",
             "meal_plan_id": meal_plan.id,
-            "meal_plan_name": meal_plan_name,
-            "tags": tags
+            "meal_plan_name": meal_plan.meal_plan_name,
+            "tags": meal_plan.tags,
+            "engine": engine
         }, status=status.HTTP_201_CREATED)
 
 
 
 
+class GenerateMealPlanStreamView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Generate a 15-Day AI Meal Plan (streamed)",
+        operation_description="""
+        Same as the generate endpoint, but every day is saved as soon as OpenAI has produced it and
+        progress is streamed back as newline-delimited JSON (`application/x-ndjson`), one event per line:
+
+        - `{"event": "plan", "meal_plan_id": 42}`
+        - `{"event": "day", "date": "2025-08-05", "daily_meal_id": 7, "meals": 5}`
+        - `{"event": "done", "meal_plan_id": 42, "days": 15, "filled_locally": 0, "engine": "llm"}`
+        - `{"event": "error", "detail": "..."}`
+        """,
+        tags=["AI Meal Plan"],
+        responses={
+            200: openapi.Response(description="NDJSON progress stream"),
+            404: openapi.Response(description="User profile not found"),
+            409: openapi.Response(description="User already has an active meal plan or one being generated"),
+        }
+    )
+    def post(self, request):
+        user = request.user
+
+        conflict = plan_conflict(user, PlanGenerationJob.KIND_MEAL)
+        if conflict:
+            return Response({"detail": conflict}, status=409)
+
+        try:
+            profile = user.profile
+        except Profile.DoesNotExist:
+            return Response({"detail": "Profile not found."}, status=404)
+
+        events = (json.dumps(event) + "\n" for event in stream_meal_plan(user, profile, days=15))
+        response = StreamingHttpResponse(events, content_type="application/x-ndjson")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+
+
 class DaywiseMealInfoAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -365,8 +390,10 @@ class SpanishDailyMealDetailAPIView(APIView):
         if daily_meal.meal_plan.user != request.user:
             return Response({"detail": "Not authorized for this meal."}, status=status.HTTP_403_FORBIDDEN)
 
-        meal_entries = MealEntry.objects.filter(daily_meal=daily_meal).select_related('recipe')
-        serializer = MealEntryWithFullRecipeSpanishSerializer(meal_entries, many=True,context={'request':request})
+        meal_entries = list(MealEntry.objects.filter(daily_meal=daily_meal).select_related('recipe'))
+        context = {'request': request}
+        twins = prefetch_twins(context, RecipeSpanish, [entry.recipe.unique_id for entry in meal_entries if entry.recipe])
+        serializer = MealEntryWithFullRecipeSpanishSerializer(meal_entries, many=True,context=context)
         data = serializer.data
 
         # ✅ Translate meal_type to Spanish
@@ -384,13 +411,11 @@ class SpanishDailyMealDetailAPIView(APIView):
         for entry in meal_entries:
             recipe = entry.recipe
             if recipe and not entry.cancelled:
-                try:
-                    spanish_recipe = RecipeSpanish.objects.get(unique_id=recipe.unique_id)
+                spanish_recipe = twins.get(recipe.unique_id)
+                if spanish_recipe:
                     stats["total_protein"] += float(spanish_recipe.protein or 0)
                     stats["total_carbs"] += float(spanish_recipe.carbs or 0)
                     stats["total_fat"] += float(spanish_recipe.fat or 0)
-                except RecipeSpanish.DoesNotExist:
-                    pass
 
         return Response({
             "status": {
@@ -516,9 +541,9 @@ class SpanishTodaysMealAPIView(APIView):
             return Response({"detail": "No meals found for today."}, status=status.HTTP_404_NOT_FOUND)
 
         # Get today's meal entries
-        today_meal_entries = MealEntry.objects.filter(
+        today_meal_entries = list(MealEntry.objects.filter(
             daily_meal__in=daily_meals_today
-        ).order_by('-created_at')
+        ).select_related('recipe').order_by('-created_at'))
 
         # Get 15-day range
         start_date = today - timedelta(days=14)
@@ -552,7 +577,9 @@ class SpanishTodaysMealAPIView(APIView):
         def safe(val): return float(val) if val is not None else 0.0
 
         # Serialize today's entries
-        serializer = MealEntryWithFullRecipeSpanishSerializer(today_meal_entries, many=True,context={'request': request})
+        context = {'request': request}
+        prefetch_twins(context, RecipeSpanish, [entry.recipe.unique_id for entry in today_meal_entries if entry.recipe])
+        serializer = MealEntryWithFullRecipeSpanishSerializer(today_meal_entries, many=True,context=context)
         data = serializer.data
 
         # Predefined meal_type translation
@@ -0,0 +1,19 @@
+from django.contrib import admin
+from .models import MealPlanTemplate, WorkoutPlanTemplate
+
+# Register your models here.
+
+@admin.register(MealPlanTemplate)
+class MealPlanTemplateAdmin(admin.ModelAdmin):
+    list_display = ('id', 'fitness_goal', 'lifestyle_habits', 'dietary_preference', 'engine', 'calorie_target', 'times_used', 'updated_at')
+    list_filter = ('fitness_goal', 'lifestyle_habits', 'dietary_preference', 'engine')
+    search_fields = ('meal_plan_name', 'tags')
+
+
+
+
+@admin.register(WorkoutPlanTemplate)
+class WorkoutPlanTemplateAdmin(admin.ModelAdmin):
+    list_display = ('id', 'fitness_goal', 'fitness_level', 'equipment', 'engine', 'daily_duration_minutes', 'times_used', 'updated_at')
+    list_filter = ('fitness_goal', 'fitness_level', 'equipment', 'engine')
+    search_fields = ('workout_plan_name', 'tags')
@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand
+from plan_templates.models import MealPlanTemplate, WorkoutPlanTemplate
+from plan_templates.services import meal_archetypes, workout_archetypes, build_meal_template, build_workout_template
+
+
+class Command(BaseCommand):
+    help = "Generate the meal and workout plan templates, one per archetype, used for onboarding."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=["meal", "workout", "all"], default="all")
+        parser.add_argument("--engine", choices=["llm", "local"], default="local",
+                            help="Generate templates with OpenAI or the local engines.")
+        parser.add_argument("--missing-only", action="store_true",
+                            help="Only build archetypes that have no template yet (resume an interrupted run).")
+        parser.add_argument("--fallback", action="store_true",
+                            help="With --engine llm, build an archetype locally when the OpenAI call fails.")
+
+    def _build(self, build, key, options):
+        try:
+            return build(*key, engine=options["engine"])
+        except Exception as e:
+            if not (options["fallback"] and options["engine"] == "llm"):
+                raise
+            self.stderr.write(f"{' / '.join(key)}: OpenAI failed ({e}), building locally.")
+            return build(*key, engine="local")
+
+    def handle(self, *args, **options):
+        jobs = []
+        if options["kind"] in ("meal", "all"):
+            existing = set(MealPlanTemplate.objects.values_list('fitness_goal', 'lifestyle_habits', 'dietary_preference'))
+            jobs += [("meal", key, build_meal_template) for key in meal_archetypes()
+                     if not (options["missing_only"] and key in existing)]
+        if options["kind"] in ("workout", "all"):
+            existing = set(WorkoutPlanTemplate.objects.values_list('fitness_goal', 'fitness_level', 'equipment'))
+            jobs += [("workout", key, build_workout_template) for key in workout_archetypes()
+                     if not (options["missing_only"] and key in existing)]
+
+        built = failed = 0
+        started = time.perf_counter()
+        for kind, key, build in jobs:
+            label = f"{kind}: {' / '.join(key)}"
+            try:
+                template = self._build(build, key, options)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{label} failed: {e}")
+                continue
+            built += 1
+            self.stdout.write(f"{label} -> #{template.pk} ({template.engine}, {len(template.days)} days)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {built} template(s), {failed} failed, in {time.perf_counter() - started:.1f}s."
+        ))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealPlanTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fitness_goal', models.CharField(choices=[('Weight loss', 'Weight Loss'), ('Weight gain', 'Weight Gain'), ('Maintenance', 'Maintenance')], max_length=50)),
+                ('lifestyle_habits', models.CharField(choices=[('3 Meals', '3 Meals'), ('4 Meals', '4 Meals'), ('5 Meals', '5 Meals'), ('6 Meals', '6 Meals'), ('7 Meals', '7 Meals'), ('8 Meals', '8 Meals')], max_length=50)),
+                ('dietary_preference', models.CharField(choices=[('Keto', 'Keto'), ('Paleo', 'Paleo'), ('Vegetarian', 'Vegetarian'), ('Vegan', 'Vegan'), ('Gluten-Free', 'Gluten-Free'), ('No preferences', 'No Preferences')], max_length=30)),
+                ('meal_plan_name', models.CharField(max_length=255)),
+                ('tags', models.CharField(blank=True, max_length=255)),
+                ('calorie_target', models.PositiveIntegerField()),
+                ('engine', models.CharField(max_length=20)),
+                ('days', models.JSONField(default=list)),
+                ('uids', models.JSONField(default=list)),
+                ('times_used', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('fitness_goal', 'lifestyle_habits', 'dietary_preference')},
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkoutPlanTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fitness_goal', models.CharField(choices=[('Weight loss', 'Weight Loss'), ('Weight gain', 'Weight Gain'), ('Maintenance', 'Maintenance')], max_length=50)),
+                ('fitness_level', models.CharField(choices=[('Beginners', 'Beginners'), ('Basic', 'Basic'), ('Intermediate', 'Intermediate'), ('High', 'High')], max_length=20)),
+                ('equipment', models.CharField(choices=[('bodyweight', 'Bodyweight'), ('home', 'Home Equipment'), ('gym', 'Gym')], max_length=20)),
+                ('workout_plan_name', models.CharField(max_length=255)),
+                ('tags', models.CharField(blank=True, max_length=255)),
+                ('daily_duration_minutes', models.PositiveIntegerField()),
+                ('engine', models.CharField(max_length=20)),
+                ('days', models.JSONField(default=list)),
+                ('uids', models.JSONField(default=list)),
+                ('times_used', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('fitness_goal', 'fitness_level', 'equipment')},
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+from django.db import models
+from accounts.constants import FITNESS_GOALS, LIFESTYLE_HABITS, DIETARY_PREFERENCES, FITNESS_LEVEL
+
+# Create your models here.
+
+
+
+
+EQUIPMENT_CLASSES = (
+    ('bodyweight', 'Bodyweight'),
+    ('home', 'Home Equipment'),
+    ('gym', 'Gym'),
+)
+
+
+
+
+class MealPlanTemplate(models.Model):
+    """
+    A pre-generated meal plan for one archetype (goal × meals per day × dietary preference),
+    stored in date-relative form (day offsets) and copied into MealPlan rows on demand.
+    """
+    fitness_goal = models.CharField(max_length=50, choices=FITNESS_GOALS)
+    lifestyle_habits = models.CharField(max_length=50, choices=LIFESTYLE_HABITS)
+    dietary_preference = models.CharField(max_length=30, choices=DIETARY_PREFERENCES)
+
+    meal_plan_name = models.CharField(max_length=255)
+    tags = models.CharField(max_length=255, blank=True)
+    calorie_target = models.PositiveIntegerField()  # daily kcal the grams were chosen for
+    engine = models.CharField(max_length=20)
+    days = models.JSONField(default=list)  # [{offset, meals: [...]}]
+    uids = models.JSONField(default=list)  # referenced Recipe unique_ids
+    times_used = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('fitness_goal', 'lifestyle_habits', 'dietary_preference')
+
+    def __str__(self):
+        return f"{self.fitness_goal} / {self.lifestyle_habits} / {self.dietary_preference}"
+
+
+
+
+class WorkoutPlanTemplate(models.Model):
+    """A pre-generated workout plan for one archetype (goal × fitness level × equipment)."""
+    fitness_goal = models.CharField(max_length=50, choices=FITNESS_GOALS)
+    fitness_level = models.CharField(max_length=20, choices=FITNESS_LEVEL)
+    equipment = models.CharField(max_length=20, choices=EQUIPMENT_CLASSES)
+
+    workout_plan_name = models.CharField(max_length=255)
+    tags = models.CharField(max_length=255, blank=True)
+    daily_duration_minutes = models.PositiveIntegerField()
+    engine = models.CharField(max_length=20)
+    days = models.JSONField(default=list)  # [{offset, title, ..., workouts: [...]}]
+    uids = models.JSONField(default=list)  # referenced Workout unique_ids
+    times_used = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('fitness_goal', 'fitness_level', 'equipment')
+
+    def __str__(self):
+        return f"{self.fitness_goal} / {self.fitness_level} / {self.equipment}"
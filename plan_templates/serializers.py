@@ -0,0 +1,10 @@
+from rest_framework import serializers
+from workoutplan.serializers import TrainingDataSerializer
+
+
+
+
+class OnboardingPlanSerializer(serializers.Serializer):
+    personalize = serializers.BooleanField(required=False, default=True)
+    engine = serializers.ChoiceField(choices=["llm", "local"], required=False)  # personalized meal plan
+    training = TrainingDataSerializer(required=False)  # personalized workout plan
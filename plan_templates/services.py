@@ -0,0 +1,374 @@
+"""
+Library of reusable plan templates, one per archetype, and their instantiation.
+
+Templates are built ahead of time (manage.py build_plan_templates) with the LLM or the local
+engines for a reference profile of every archetype, and stored with day offsets instead of
+dates. At onboarding the best-matching template is copied into MealPlan/WorkoutPlan rows
+with bulk inserts, so a new user has a plan right away; a personalized plan can then be
+generated in the background (userapi.jobs) and replaces it.
+"""
+import itertools
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from accounts.constants import (
+    FITNESS_GOALS, LIFESTYLE_HABITS, DIETARY_PREFERENCES, FITNESS_LEVEL, AT_HOME_EQUIPMENT, AT_GYM_EQUIPMENT,
+)
+from recipe.models import Recipe
+from workout.models import Workout
+from meal.models import MealPlan
+from meal.serializers import MealPlanWriteSerializer, DailyMealWriteSerializer
+from meal.candidates import filter_recipes, select_recipe_candidates
+from meal.nutrition import daily_calorie_target
+from meal.optimizer import build_local_meal_plan
+from meal.services import build_meal_plan, create_daily_meals, generate_meal_plan
+from workoutplan.models import WorkoutPlan
+from workoutplan.serializers import WorkoutPlanWriteSerializer, DailyWorkoutWriteSerializer
+from workoutplan.scheduler import available_equipment, has_equipment, build_local_workout_plan, repair_workout_plan
+from workoutplan.services import build_workout_plan, create_daily_workouts, generate_workout_plan
+from userapi.models import PlanGenerationJob
+from userapi.jobs import ActivePlanExists, enqueue_plan_job, plan_conflict
+from userapi.plan_memo import relative_days, rebase_days
+from .models import EQUIPMENT_CLASSES, MealPlanTemplate, WorkoutPlanTemplate
+
+
+TEMPLATE_DAYS = 15
+TEMPLATE_WORKOUT_MINUTES = 45
+TEMPLATE_TRAINING_STYLE = "general fitness"
+REFERENCE_WEIGHT_KG = 70.0
+REFERENCE_HEIGHT_CM = 170.0
+DEFAULT_LIFESTYLE = '3 Meals'
+DEFAULT_DIET = 'No preferences'
+DEFAULT_LEVEL = 'Beginners'
+GRAMS_SCALE_RANGE = (0.5, 2.0)   # portions are rescaled to the user's calories within this range
+
+HOME_EQUIPMENT = [value for value, _ in AT_HOME_EQUIPMENT if value != 'No equipment']
+EQUIPMENT_ARCHETYPES = {
+    # equipment class: (Profile.at_home, Profile.at_gym) of the reference profile
+    "bodyweight": (['No equipment'], []),
+    "home": (HOME_EQUIPMENT, []),
+    "gym": (HOME_EQUIPMENT, [value for value, _ in AT_GYM_EQUIPMENT]),
+}
+# Classes a profile can fall back to, closest first
+EQUIPMENT_FALLBACK = {
+    "gym": ["gym", "home", "bodyweight"],
+    "home": ["home", "bodyweight"],
+    "bodyweight": ["bodyweight"],
+}
+
+
+
+
+class ArchetypeProfile:
+    """
+    Stand-in for accounts.Profile with the fields of one archetype, a reference body and no
+    allergies or medical conditions. Works with the meal/workout prompt builders and engines.
+    """
+
+    def __init__(self, **fields):
+        self.user = None
+        self.fullname = None
+        self.gender = None
+        self.date_of_birth = None
+        self.weight = REFERENCE_WEIGHT_KG
+        self.height = REFERENCE_HEIGHT_CM
+        self.fitness_goals = []
+        self.lifestyle_habits = None
+        self.dietary_preferences = None
+        self.allergies = []
+        self.medical_conditions = []
+        self.fitness_level = None
+        self.at_home = []
+        self.at_gym = []
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+
+
+def meal_archetypes():
+    """(fitness_goal, lifestyle_habits, dietary_preference) for every meal template."""
+    return list(itertools.product(
+        [value for value, _ in FITNESS_GOALS],
+        [value for value, _ in LIFESTYLE_HABITS],
+        [value for value, _ in DIETARY_PREFERENCES],
+    ))
+
+
+
+
+def workout_archetypes():
+    """(fitness_goal, fitness_level, equipment class) for every workout template."""
+    return list(itertools.product(
+        [value for value, _ in FITNESS_GOALS],
+        [value for value, _ in FITNESS_LEVEL],
+        [value for value, _ in EQUIPMENT_CLASSES],
+    ))
+
+
+
+
+def _template_training_data(level):
+    return {
+        "fitness_level": level,
+        "train": TEMPLATE_TRAINING_STYLE,
+        "daily_duration_minutes": TEMPLATE_WORKOUT_MINUTES,
+    }
+
+
+
+
+def build_meal_template(fitness_goal, lifestyle_habits, dietary_preference, engine="local"):
+    """Generate (or regenerate) the meal template of one archetype with the "llm" or "local" engine."""
+    profile = ArchetypeProfile(
+        fitness_goals=[fitness_goal], lifestyle_habits=lifestyle_habits, dietary_preferences=dietary_preference,
+    )
+    if engine == "llm":
+        candidates = select_recipe_candidates(profile, Recipe.objects.all())
+        result = build_meal_plan(profile, candidates, days=TEMPLATE_DAYS)
+    else:
+        result, _ = build_local_meal_plan(profile, Recipe.objects.all(), days=TEMPLATE_DAYS)
+
+    # Same validation as a user's plan, so instantiating the template cannot fail on the payload
+    serializer = MealPlanWriteSerializer(data=result)
+    serializer.is_valid(raise_exception=True)
+
+    days = relative_days(result["days"])
+    uids = {meal["recipe_uid"] for day in days for meal in day["meals"] if meal.get("recipe_uid")}
+    template, _ = MealPlanTemplate.objects.update_or_create(
+        fitness_goal=fitness_goal,
+        lifestyle_habits=lifestyle_habits,
+        dietary_preference=dietary_preference,
+        defaults={
+            "meal_plan_name": serializer.validated_data["meal_plan_name"],
+            "tags": serializer.validated_data["tags"],
+            "calorie_target": round(daily_calorie_target(profile)),
+            "engine": engine,
+            "days": days,
+            "uids": sorted(uids),
+            "times_used": 0,
+        },
+    )
+    return template
+
+
+
+
+def build_workout_template(fitness_goal, fitness_level, equipment, engine="local"):
+    """Generate (or regenerate) the workout template of one archetype with the "llm" or "local" engine."""
+    at_home, at_gym = EQUIPMENT_ARCHETYPES[equipment]
+    profile = ArchetypeProfile(fitness_goals=[fitness_goal], fitness_level=fitness_level, at_home=at_home, at_gym=at_gym)
+    training_data = _template_training_data(fitness_level)
+    workouts = list(Workout.objects.exclude(unique_id__isnull=True).exclude(unique_id__exact=""))
+
+    if engine == "llm":
+        result = build_workout_plan(profile, training_data, workouts, days=TEMPLATE_DAYS)
+        result = repair_workout_plan(result, profile, training_data, workouts, days=TEMPLATE_DAYS)
+    else:
+        result = build_local_workout_plan(profile, training_data, workouts, days=TEMPLATE_DAYS)
+
+    serializer = WorkoutPlanWriteSerializer(data=result)
+    serializer.is_valid(raise_exception=True)
+
+    days = relative_days(result["days"])
+    uids = {w["workout_uid"] for day in days for w in day.get("workouts") or [] if w.get("workout_uid")}
+    template, _ = WorkoutPlanTemplate.objects.update_or_create(
+        fitness_goal=fitness_goal,
+        fitness_level=fitness_level,
+        equipment=equipment,
+        defaults={
+            "workout_plan_name": serializer.validated_data["workout_plan_name"],
+            "tags": serializer.validated_data["tags"],
+            "daily_duration_minutes": TEMPLATE_WORKOUT_MINUTES,
+            "engine": engine,
+            "days": days,
+            "uids": sorted(uids),
+            "times_used": 0,
+        },
+    )
+    return template
+
+
+
+
+def _goal_rank(profile):
+    """Sort key for templates: the profile's goals in order, then Maintenance, then the rest."""
+    order = list(profile.fitness_goals or [])
+    if 'Maintenance' not in order:
+        order.append('Maintenance')
+    return lambda template: order.index(template.fitness_goal) if template.fitness_goal in order else len(order)
+
+
+
+
+def best_meal_template(profile):
+    """
+    The meal template to start `profile` on, or None. Meals per day and dietary preference
+    must match; goals are preferred in the profile's order. Templates are built without
+    allergies, so one that uses a recipe the profile's filters exclude (or a recipe that no
+    longer exists) is skipped.
+    """
+    templates = MealPlanTemplate.objects.filter(
+        lifestyle_habits=profile.lifestyle_habits or DEFAULT_LIFESTYLE,
+        dietary_preference=profile.dietary_preferences or DEFAULT_DIET,
+    )
+    for template in sorted(templates, key=_goal_rank(profile)):
+        allowed = filter_recipes(profile, Recipe.objects.filter(unique_id__in=template.uids)).count()
+        if allowed == len(template.uids):
+            return template
+    return None
+
+
+
+
+def equipment_class(profile):
+    """Template equipment class of a profile: "gym", "home" or "bodyweight"."""
+    if profile.at_gym:
+        return "gym"
+    if any(item != 'No equipment' for item in profile.at_home or []):
+        return "home"
+    return "bodyweight"
+
+
+
+
+def best_workout_template(profile):
+    """
+    The workout template to start `profile` on, or None. The fitness level must match; the
+    closest equipment class comes first (falling back to classes that need less), then the
+    profile's goals. A template with a workout needing equipment the profile does not list
+    is skipped.
+    """
+    classes = EQUIPMENT_FALLBACK[equipment_class(profile)]
+    templates = WorkoutPlanTemplate.objects.filter(
+        fitness_level=profile.fitness_level or DEFAULT_LEVEL, equipment__in=classes,
+    )
+    goal_rank = _goal_rank(profile)
+    equipment = available_equipment(profile)
+    for template in sorted(templates, key=lambda t: (classes.index(t.equipment), goal_rank(t))):
+        needed = Workout.objects.filter(unique_id__in=template.uids).values_list('equipment_needed', flat=True)
+        if len(needed) == len(template.uids) and all(has_equipment(item, equipment) for item in needed):
+            return template
+    return None
+
+
+
+
+def instantiate_meal_template(user, template, profile=None):
+    """
+    Copy `template` into a new MealPlan for `user` starting today, in one transaction with
+    bulk inserts. With `profile`, portions (grams) are scaled to its daily calorie target.
+    """
+    serializer = DailyMealWriteSerializer(data=rebase_days(template.days), many=True)
+    serializer.is_valid(raise_exception=True)
+    days_data = serializer.validated_data
+
+    if profile is not None and template.calorie_target:
+        low, high = GRAMS_SCALE_RANGE
+        scale = Decimal(str(round(min(high, max(low, daily_calorie_target(profile) / template.calorie_target)), 3)))
+        for day in days_data:
+            for meal in day["meals"]:
+                if meal.get("grams") is not None:
+                    meal["grams"] = (meal["grams"] * scale).quantize(Decimal("0.01"))
+
+    uid_cache = Recipe.objects.in_bulk(template.uids, field_name='unique_id')
+    today = date.today()
+
+    with transaction.atomic():
+        meal_plan = MealPlan.objects.create(
+            user=user,
+            meal_plan_name=template.meal_plan_name,
+            tags=template.tags,
+            start_date=today,
+            end_date=today + timedelta(days=len(days_data) - 1),
+        )
+        create_daily_meals(meal_plan, days_data, uid_cache)
+        MealPlanTemplate.objects.filter(pk=template.pk).update(times_used=F('times_used') + 1)
+
+    return meal_plan
+
+
+
+
+def instantiate_workout_template(user, template):
+    """Copy `template` into a new WorkoutPlan for `user` starting today (one transaction, bulk inserts)."""
+    serializer = DailyWorkoutWriteSerializer(data=rebase_days(template.days), many=True)
+    serializer.is_valid(raise_exception=True)
+    days_data = serializer.validated_data
+
+    uid_cache = Workout.objects.in_bulk(template.uids, field_name='unique_id')
+    today = date.today()
+
+    with transaction.atomic():
+        workout_plan = WorkoutPlan.objects.create(
+            user=user,
+            workout_plan_name=template.workout_plan_name,
+            tags=template.tags,
+            start_date=today,
+            end_date=today + timedelta(days=len(days_data) - 1),
+        )
+        create_daily_workouts(workout_plan, days_data, uid_cache, template.tags)
+        WorkoutPlanTemplate.objects.filter(pk=template.pk).update(times_used=F('times_used') + 1)
+
+    return workout_plan
+
+
+
+
+def _personalize(user, kind, payload):
+    try:
+        return enqueue_plan_job(user, kind, payload).id
+    except ActivePlanExists:
+        return None
+
+
+
+
+def onboard_user(user, profile, training_data=None, personalize=True, engine=None):
+    """
+    Give `user` a meal and a workout plan right away: the best-matching templates, or the
+    local engines when no template fits. With `personalize`, background jobs are queued that
+    generate personalized plans and replace these ones (the workout job only when
+    `training_data`, TrainingDataSerializer's validated data, is given). Kinds the user
+    already has an active plan or a queued/running generation job for (plan_conflict) are
+    left alone: their source is "existing".
+
+    Returns {"meal": {...}, "workout": {...}} with plan_id, source ("template", "local",
+    "existing" or None when no plan could be made), template_id and job_id.
+    """
+    # 1. Meal plan
+    meal = {"plan_id": None, "source": "existing", "template_id": None, "job_id": None}
+    if plan_conflict(user, PlanGenerationJob.KIND_MEAL) is None:
+        template = best_meal_template(profile)
+        if template is not None:
+            plan = instantiate_meal_template(user, template, profile)
+            meal.update(plan_id=plan.id, source="template", template_id=template.id)
+        else:
+            try:
+                plan, _ = generate_meal_plan(user, profile, engine="local", days=TEMPLATE_DAYS)
+                meal.update(plan_id=plan.id, source="local")
+            except ValueError:
+                meal.update(source=None)
+        if personalize:
+            meal["job_id"] = _personalize(user, PlanGenerationJob.KIND_MEAL, {
+                "engine": engine, "replaces_plan_id": meal["plan_id"],
+            })
+
+    # 2. Workout plan
+    workout = {"plan_id": None, "source": "existing", "template_id": None, "job_id": None}
+    if plan_conflict(user, PlanGenerationJob.KIND_WORKOUT) is None:
+        template = best_workout_template(profile)
+        if template is not None:
+            plan = instantiate_workout_template(user, template)
+            workout.update(plan_id=plan.id, source="template", template_id=template.id)
+        else:
+            local_data = dict(_template_training_data(profile.fitness_level or DEFAULT_LEVEL), engine="local")
+            plan, _ = generate_workout_plan(user, profile, local_data, days=TEMPLATE_DAYS)
+            workout.update(plan_id=plan.id, source="local")
+        if personalize and training_data:
+            workout["job_id"] = _personalize(user, PlanGenerationJob.KIND_WORKOUT, dict(
+                training_data, replaces_plan_id=workout["plan_id"],
+            ))
+
+    return {"meal": meal, "workout": workout}
@@ -0,0 +1,70 @@
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+from accounts.models import Profile
+from .serializers import OnboardingPlanSerializer
+from .services import onboard_user
+
+# Create your views here.
+
+
+
+
+class OnboardingPlanView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=OnboardingPlanSerializer,
+        operation_summary="Start a new user on meal & workout plans",
+        operation_description="""
+        Creates a 15-day meal plan and workout plan immediately from the pre-generated template that best
+        matches the user's profile (or the local engines when no template fits). Kinds the user already
+        has an active plan for are skipped.
+
+        With `personalize` (default true) a personalized meal plan is generated in the background, and a
+        personalized workout plan too when `training` is given. Poll `/userapi/plan-jobs/{job_id}/`; when
+        the job succeeds its plan replaces the template plan.
+        """,
+        tags=["Onboarding"],
+        responses={
+            201: openapi.Response(
+                description="Plans created",
+                examples={
+                    "application/json": {
+                        "detail": "Plans ready.",
+                        "meal": {"plan_id": 42, "source": "template", "template_id": 7, "job_id": 15},
+                        "workout": {"plan_id": 43, "source": "template", "template_id": 3, "job_id": None}
+                    }
+                }
+            ),
+            400: openapi.Response(description="Invalid request body"),
+            404: openapi.Response(description="User profile not found"),
+        }
+    )
+    def post(self, request):
+        user = request.user
+
+        # 1. Ensure user has profile
+        try:
+            profile = user.profile
+        except Profile.DoesNotExist:
+            return Response({"detail": "Profile not found."}, status=404)
+
+        # 2. Validate options
+        serializer = OnboardingPlanSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        # 3. Template plans now, personalized plans in the background
+        plans = onboard_user(
+            user,
+            profile,
+            training_data=dict(data["training"]) if data.get("training") else None,
+            personalize=data["personalize"],
+            engine=data.get("engine"),
+        )
+
+        return Response({"detail": "Plans ready.", **plans}, status=status.HTTP_201_CREATED)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Recipe, RecipeSpanish
+from .models import Recipe, RecipeSpanish, TranslationCache
 
 
 @admin.register(Recipe)
@@ -7,10 +7,10 @@ class RecipeAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'unique_id', 'recipe_name', 'recipe_type', 'for_time', 'tag',
         'calories', 'carbs', 'protein', 'fat', 'making_time', 'time',
-        'ratings', 'category', 'created_at', 'updated_at'
+        'ratings', 'category', 'translation_status', 'created_at', 'updated_at'
     )
     search_fields = ('recipe_name', 'tag', 'category')
-    list_filter = ('recipe_type', 'category', 'for_time')
+    list_filter = ('recipe_type', 'category', 'for_time', 'translation_status')
     readonly_fields = ('created_at', 'updated_at')
 
 
@@ -21,8 +21,18 @@ class RecipeSpanishAdmin(admin.ModelAdmin):
     list_display = (
         'id', 'unique_id', 'recipe_name', 'recipe_type', 'for_time', 'tag',
         'calories', 'carbs', 'protein', 'fat', 'making_time', 'time',
-        'ratings', 'category', 'created_at', 'updated_at'
+        'ratings', 'category', 'translation_status', 'created_at', 'updated_at'
     )
     search_fields = ('recipe_name', 'tag', 'category')
-    list_filter = ('recipe_type', 'category', 'for_time')
+    list_filter = ('recipe_type', 'category', 'for_time', 'translation_status')
     readonly_fields = ('created_at', 'updated_at')
+
+
+
+
+@admin.register(TranslationCache)
+class TranslationCacheAdmin(admin.ModelAdmin):
+    list_display = ('id', 'field_name', 'source_language', 'target_language', 'source_text', 'translated_text', 'exact_hits', 'normalized_hits', 'created_at')
+    search_fields = ('source_text', 'translated_text')
+    list_filter = ('source_language', 'target_language', 'field_name')
+    readonly_fields = ('key', 'created_at')
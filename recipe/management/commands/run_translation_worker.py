@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from recipe.translation_jobs import claim_translations, requeue_stale_translations, run_translation
+
+
+def _run_in_thread(kind, model, pk):
+    try:
+        return model, pk, run_translation(kind, model, pk)
+    finally:
+        # Every worker thread has its own DB connection
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Translate queued recipe/workout admin writes into their twin in the other language, on a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=getattr(settings, "TRANSLATION_WORKER_THREADS", 2),
+                            help="Rows translated concurrently.")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--stale-after", type=int, default=600,
+                            help="Requeue rows whose translation started more than this many seconds ago.")
+        parser.add_argument("--once", action="store_true", help="Exit once no queued row is due.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        requeued = requeue_stale_translations(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale translation(s).")
+        self.stdout.write(f"Translation worker started with {workers} thread(s).")
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    for kind, model, pk in claim_translations(workers - len(running)):
+                        running.add(pool.submit(_run_in_thread, kind, model, pk))
+
+                    if not running:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll"])
+                        continue
+
+                    done, running = wait(running, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                    running = set(running)
+                    for future in done:
+                        model, pk, obj = future.result()
+                        if obj is None:
+                            self.stdout.write(f"{model.__name__} #{pk}: deleted")
+                        else:
+                            self.stdout.write(f"{model.__name__} #{pk}: {obj.translation_status}"
+                                              + (f" error={obj.translation_error}" if obj.translation_error else ""))
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running translations to finish...")
@@ -0,0 +1,181 @@
+import json
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from Fitness.prompt_encoding import estimate_tokens
+from recipe.translate import translate_records
+from recipe.twins import TWIN_SPECS, apply_to_twin, invalidate_twins, is_stale, translatable_values
+
+
+def _record_tokens(record):
+    return sum(estimate_tokens(str(value or '')) for value in record.values())
+
+
+def _split_batches(rows, records, max_tokens, max_rows):
+    """Consecutive batches of `rows` whose `records` add up to at most `max_tokens` (and `max_rows` rows)."""
+    batches, batch, tokens = [], [], 0
+    for row, record in zip(rows, records):
+        cost = _record_tokens(record)
+        if batch and (tokens + cost > max_tokens or len(batch) == max_rows):
+            batches.append(batch)
+            batch, tokens = [], 0
+        batch.append((row, record))
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _translate_rows(records, retries, backoff):
+    """
+    Translations of `records` as a list with None for the rows still incomplete after `retries`
+    retries; a failing request is retried too, and raises once the retries are used up. An
+    answer that is not valid JSON (usually cut off) is retried as two half-size requests.
+    """
+    results, todo = [None] * len(records), list(range(len(records)))
+    for attempt in range(retries + 1):
+        try:
+            translated, untranslated = translate_records([records[i] for i in todo], "en", "es")
+        except json.JSONDecodeError:
+            if len(todo) > 1:
+                half = len(todo) // 2
+                for part in (todo[:half], todo[half:]):
+                    for i, result in zip(part, _translate_rows([records[i] for i in part], retries, backoff)):
+                        results[i] = result
+                return results
+            if attempt == retries:
+                raise
+        except Exception:
+            if attempt == retries:
+                raise
+        else:
+            for i, record, fields in zip(todo, translated, untranslated):
+                if not fields:
+                    results[i] = record
+            todo = [i for i in todo if results[i] is None]
+            if not todo or attempt == retries:
+                break
+        time.sleep(backoff * 2 ** attempt * random.uniform(1, 1.5))
+    return results
+
+
+def _translate_batch(records, retries, backoff):
+    try:
+        return _translate_rows(records, retries, backoff)
+    finally:
+        # Each pool thread has its own DB connection (cache and translation memory lookups)
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Create or refresh the Spanish twins (RecipeSpanish, WorkoutSpanish) of English catalog rows whose twin "
+        "is missing or stale. Rows are translated in batches, several requests at a time, and every batch is "
+        "saved as soon as it is done, so after a failure running the command again resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kind", choices=["recipe", "workout", "all"], default="all")
+        parser.add_argument("--batch-tokens", type=int, default=getattr(settings, "TRANSLATION_BATCH_TOKENS", 2000),
+                            help="Source tokens per translation request.")
+        parser.add_argument("--batch-size", type=int, help="At most this many rows per translation request.")
+        parser.add_argument("--workers", type=int, default=4, help="Concurrent translation requests.")
+        parser.add_argument("--retries", type=int, default=3, help="Retries of a failed request.")
+        parser.add_argument("--backoff", type=float, default=2.0, help="Seconds before the first retry; doubled on each retry.")
+        parser.add_argument("--limit", type=int, help="Sync at most this many rows per kind.")
+        parser.add_argument("--force", action="store_true", help="Rebuild every twin, stale or not.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be synced.")
+
+    def handle(self, *args, **options):
+        kinds = list(TWIN_SPECS) if options["kind"] == "all" else [options["kind"]]
+        failed = 0
+        for kind in kinds:
+            failed += self._sync(kind, TWIN_SPECS[kind], options)
+        if failed:
+            raise CommandError(f"{failed} rows could not be translated; run the command again to resume.")
+
+    def _sync(self, kind, spec, options):
+        # 1. English rows without a unique_id cannot have a twin yet
+        without_id = list(spec.source.objects.filter(unique_id__isnull=True))
+        if without_id and not options["dry_run"]:
+            for obj in without_id:
+                obj.unique_id = str(uuid.uuid4())
+            spec.source.objects.bulk_update(without_id, ['unique_id'])
+
+        # 2. Rows whose twin is missing or stale
+        twins = {twin.unique_id: twin for twin in spec.twin.objects.exclude(unique_id__isnull=True)}
+        missing, stale = [], []
+        for obj in spec.source.objects.exclude(unique_id__isnull=True).order_by('pk').iterator():
+            twin = twins.get(obj.unique_id)
+            if twin is None:
+                missing.append(obj)
+            elif options["force"] or is_stale(spec, obj, twin):
+                stale.append(obj)
+        todo = (missing + stale)[:options["limit"]]
+        records = [translatable_values(spec, obj) for obj in todo]
+        batches = _split_batches(todo, records, max(1, options["batch_tokens"]), options["batch_size"])
+
+        self.stdout.write(
+            f"{kind}: {len(missing)} missing, {len(stale)} stale, {len(without_id)} without unique_id; "
+            f"{len(todo)} to sync in {len(batches)} requests"
+        )
+        if options["dry_run"] or not todo:
+            if todo:
+                tokens = sum(_record_tokens(record) for record in records)
+                self.stdout.write(f"  ~{tokens} source tokens before translation cache and memory hits")
+            return 0
+
+        # 3. Translate on a bounded pool; save each batch in this thread as it completes
+        started, done, failed = time.perf_counter(), 0, 0
+        with ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix=f"sync-{kind}") as pool:
+            futures = {
+                pool.submit(_translate_batch, [record for _, record in batch], options["retries"], options["backoff"]):
+                    [obj for obj, _ in batch]
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    saved = self._save(spec, batch, future.result(), twins)
+                except Exception as e:
+                    failed += len(batch)
+                    self.stderr.write(f"  batch of {len(batch)} {kind}s failed: {e}")
+                else:
+                    done += saved
+                    if saved < len(batch):
+                        failed += len(batch) - saved
+                        self.stderr.write(f"  {len(batch) - saved} {kind}s of a batch were left untranslated")
+                self.stdout.write(f"  {done + failed}/{len(todo)}")
+
+        self.stdout.write(f"{kind}: {done} synced, {failed} failed in {time.perf_counter() - started:.1f}s")
+        return failed
+
+    def _save(self, spec, batch, translations, twins):
+        """Create or update the twins of the rows of `batch` that were translated; returns their number."""
+        now = timezone.now()
+        batch = [(obj, translated) for obj, translated in zip(batch, translations) if translated is not None]
+        created, updated = [], []
+        for obj, translated in batch:
+            twin = twins.get(obj.unique_id)
+            if twin is None:
+                created.append(apply_to_twin(spec, obj, spec.twin(), translated))
+            else:
+                twin.updated_at = now  # bulk_update does not touch auto_now fields
+                updated.append(apply_to_twin(spec, obj, twin, translated))
+
+        with transaction.atomic():
+            spec.twin.objects.bulk_create(created)
+            spec.twin.objects.bulk_update(updated, spec.translated + spec.copied + ['source_hash', 'updated_at'])
+            # An admin write whose background translation failed is covered by this sync
+            spec.source.objects.filter(
+                pk__in=[obj.pk for obj, _ in batch], translation_status=spec.source.STATUS_FAILED
+            ).update(translation_status=spec.source.STATUS_DONE, translation_error='')
+        for twin in created:
+            twins[twin.unique_id] = twin
+        invalidate_twins(spec.twin, [obj.unique_id for obj, _ in batch])
+        return len(batch)
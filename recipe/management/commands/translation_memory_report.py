@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q, Sum
+from Fitness.prompt_encoding import estimate_tokens
+from recipe.models import Recipe, RecipeSpanish, TranslationCache
+from recipe.translation_memory import SEGMENT_FIELD_NAME, normalize_segment, split_segments
+from workout.models import Workout, WorkoutSpanish
+
+
+# (model, field, source language, target language)
+CATALOG_TEXTS = [
+    (Recipe, "ingredients", "en", "es"),
+    (Recipe, "instructions", "en", "es"),
+    (Workout, "benefits", "en", "es"),
+    (RecipeSpanish, "ingredients", "es", "en"),
+    (RecipeSpanish, "instructions", "es", "en"),
+    (WorkoutSpanish, "benefits", "es", "en"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Report the translation memory: segment matches (hit rate, tokens saved), its size, and how much "
+        "of the catalog's long texts it covers and could save."
+    )
+
+    def handle(self, *args, **options):
+        segments = TranslationCache.objects.filter(field_name=SEGMENT_FIELD_NAME)
+        totals = segments.aggregate(exact=Sum('exact_hits'), normalized=Sum('normalized_hits'))
+        exact, normalized = totals["exact"] or 0, totals["normalized"] or 0
+        # Every stored segment was a miss once, when it was sent to the LLM
+        misses = segments.count()
+        tokens_saved = sum(
+            estimate_tokens(text) * (exact_hits + normalized_hits)
+            for text, exact_hits, normalized_hits in segments.filter(
+                Q(exact_hits__gt=0) | Q(normalized_hits__gt=0)
+            ).values_list('source_text', 'exact_hits', 'normalized_hits').iterator()
+        )
+        looked_up = exact + normalized + misses
+        self.stdout.write("Segment lookups")
+        self.stdout.write(f"  exact matches        {exact}")
+        self.stdout.write(f"  normalized matches   {normalized}")
+        self.stdout.write(f"  misses (translated)  {misses}")
+        self.stdout.write(f"  hit rate             {(exact + normalized) / looked_up:.1%}" if looked_up else "  hit rate             -")
+        self.stdout.write(f"  tokens saved         {tokens_saved}")
+        self.stdout.write(
+            f"Memory: {misses} segments, "
+            f"{TranslationCache.objects.exclude(field_name=SEGMENT_FIELD_NAME).count()} cached field values"
+        )
+
+        self.stdout.write(
+            f"{'catalog text':<34} {'segments':>9} {'distinct':>9} {'in TM':>7} {'tokens':>8} {'distinct tok':>13} {'saved':>6}"
+        )
+        for model, field, source, target in CATALOG_TEXTS:
+            self._report_catalog(model, field, source, target)
+
+    def _report_catalog(self, model, field, source, target):
+        total, tokens, distinct = 0, 0, {}
+        for text in model.objects.values_list(field, flat=True).iterator():
+            for segment in split_segments(text or "")[::2]:
+                normalized = normalize_segment(segment)
+                if not normalized:
+                    continue
+                total += 1
+                cost = estimate_tokens(segment)
+                tokens += cost
+                distinct.setdefault(normalized, cost)
+
+        keys = {TranslationCache.make_key(source, target, SEGMENT_FIELD_NAME, normalized) for normalized in distinct}
+        in_tm = TranslationCache.objects.filter(key__in=keys).count() if keys else 0
+        distinct_tokens = sum(distinct.values())
+        saved = 1 - distinct_tokens / tokens if tokens else 0
+        label = f"{model.__name__}.{field} {source}->{target}"
+        self.stdout.write(
+            f"{label:<34} {total:>9} {len(distinct):>9} {in_tm:>7} {tokens:>8} {distinct_tokens:>13} {saved:>6.0%}"
+        )
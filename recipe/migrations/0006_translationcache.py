@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0005_alter_recipe_for_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranslationCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='sha256 of source/target language, field name and source text', max_length=64, unique=True)),
+                ('source_language', models.CharField(max_length=5)),
+                ('target_language', models.CharField(max_length=5)),
+                ('field_name', models.CharField(max_length=100)),
+                ('source_text', models.TextField()),
+                ('translated_text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
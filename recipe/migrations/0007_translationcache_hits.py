@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0006_translationcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translationcache',
+            name='exact_hits',
+            field=models.PositiveIntegerField(default=0, help_text='Translation memory lookups that matched source_text exactly'),
+        ),
+        migrations.AddField(
+            model_name='translationcache',
+            name='normalized_hits',
+            field=models.PositiveIntegerField(default=0, help_text='Lookups that matched after normalization (case, spacing, final period)'),
+        ),
+    ]
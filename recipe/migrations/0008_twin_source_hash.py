@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_translationcache_hits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipespanish',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', help_text='Hash of the English row this twin was last synced from (see recipe.twins)', max_length=64),
+        ),
+    ]
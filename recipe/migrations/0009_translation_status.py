@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0008_twin_source_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='translation_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='translation_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='translation_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='translation_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='done', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='recipespanish',
+            name='translation_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipespanish',
+            name='translation_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='recipespanish',
+            name='translation_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recipespanish',
+            name='translation_status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='done', max_length=20),
+        ),
+    ]
@@ -1,7 +1,34 @@
+import hashlib
 from django.db import models
 
+
+
+
+class TwinTranslationStatus(models.Model):
+    """Background translation of a catalog row into its twin in the other language (see recipe.translation_jobs)."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    translation_status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_DONE, db_index=True)
+    translation_error = models.TextField(blank=True)
+    translation_attempts = models.PositiveIntegerField(default=0)
+    translation_started_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+
  
-class Recipe(models.Model):
+class Recipe(TwinTranslationStatus):
     unique_id = models.CharField(max_length=100, unique=True,null=True, blank=True,help_text="same RecipeSpanish data")
     image = models.ImageField(upload_to='media/recipes/', null=True, blank=True)
     recipe_name = models.CharField(max_length=255)
@@ -46,7 +73,7 @@ class Recipe(models.Model):
 
 
 
-class RecipeSpanish(models.Model):
+class RecipeSpanish(TwinTranslationStatus):
     unique_id = models.CharField(max_length=100 ,unique=True,null=True, blank=True, help_text="same Recipe data")
     image = models.ImageField(upload_to='media/recipes/', null=True, blank=True)
     recipe_name = models.CharField(max_length=255)
@@ -63,6 +90,7 @@ class RecipeSpanish(models.Model):
     category = models.CharField(max_length=50)
     ingredients = models.TextField(help_text="Lista de ingredientes separados por comas o líneas.")
     instructions = models.TextField(help_text="Instrucciones paso a paso para cocinar.")
+    source_hash = models.CharField(max_length=64, blank=True, default='', help_text="Hash of the English row this twin was last synced from (see recipe.twins)")
 
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -87,3 +115,28 @@ class RecipeSpanish(models.Model):
             f"Ingredients: {self.ingredients[:30]}..., "
             f"Instructions: {self.instructions[:30]}..."
         )
+
+
+
+
+class TranslationCache(models.Model):
+    """One translated field value, shared by every recipe/workout with the same text (see recipe.translate)."""
+    key = models.CharField(max_length=64, unique=True, help_text="sha256 of source/target language, field name and source text")
+    source_language = models.CharField(max_length=5)
+    target_language = models.CharField(max_length=5)
+    field_name = models.CharField(max_length=100)
+    source_text = models.TextField()
+    translated_text = models.TextField()
+    exact_hits = models.PositiveIntegerField(default=0, help_text="Translation memory lookups that matched source_text exactly")
+    normalized_hits = models.PositiveIntegerField(default=0, help_text="Lookups that matched after normalization (case, spacing, final period)")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+    @staticmethod
+    def make_key(source_language, target_language, field_name, source_text):
+        return hashlib.sha256(f"{source_language}\0{target_language}\0{field_name}\0{source_text}".encode()).hexdigest()
+
+
+    def __str__(self):
+        return f"{self.field_name} {self.source_language}->{self.target_language}: {self.source_text[:30]}"
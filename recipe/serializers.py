@@ -35,3 +35,24 @@ class RecipeSpanishSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
         extra_kwargs = {'unique_id': {'required': False}}
 
+
+
+
+# Admin API: the same fields plus the status of the background translation into the twin
+TRANSLATION_STATUS_FIELDS = ['translation_status', 'translation_error', 'translation_attempts']
+
+
+
+
+class RecipeAdminSerializer(RecipeSerializer):
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + TRANSLATION_STATUS_FIELDS
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + TRANSLATION_STATUS_FIELDS
+
+
+
+
+class RecipeSpanishAdminSerializer(RecipeSpanishSerializer):
+    class Meta(RecipeSpanishSerializer.Meta):
+        fields = RecipeSpanishSerializer.Meta.fields + TRANSLATION_STATUS_FIELDS
+        read_only_fields = RecipeSpanishSerializer.Meta.read_only_fields + TRANSLATION_STATUS_FIELDS
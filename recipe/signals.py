@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from workout.models import WorkoutSpanish
+from .models import RecipeSpanish
+from .twins import invalidate_twins
+
+
+@receiver([post_save, post_delete], sender=RecipeSpanish)
+@receiver([post_save, post_delete], sender=WorkoutSpanish)
+def twin_changed(sender, instance, **kwargs):
+    # After commit, so a read running meanwhile cannot cache the old row again
+    if instance.unique_id:
+        transaction.on_commit(lambda: invalidate_twins(sender, [instance.unique_id]))
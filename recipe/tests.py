@@ -1,3 +1,304 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User
+from django.test.utils import CaptureQueriesContext
+from . import translate, twins
+from .models import Recipe, RecipeSpanish, TwinTranslationStatus
+from .translation_jobs import QUEUED_TRANSLATION, claim_translations, run_translation
+from .translation_memory import split_segments
 
 # Create your tests here.
+
+
+
+
+def _fake_llm(data, source, target):
+    return {key: f"ES {value}" for key, value in data.items()}
+
+
+
+
+class TranslationCacheTests(TestCase):
+    def setUp(self):
+        translate._lru.clear()
+
+    def translate(self, records):
+        with mock.patch.object(translate, "_translate_with_llm", side_effect=_fake_llm) as llm:
+            results, untranslated = translate.translate_records(records, "en", "es")
+        return llm, results
+
+    def test_identical_text_is_translated_once(self):
+        llm, results = self.translate([{"recipe_name": "Rice bowl", "calories": "300"}])
+        self.assertEqual(llm.call_count, 1)
+        self.assertEqual(results, [{"recipe_name": "ES Rice bowl", "calories": "300"}])
+
+        llm, results = self.translate([{"recipe_name": "Rice bowl", "calories": "300"}])
+        llm.assert_not_called()
+        translate._lru.clear()
+        llm, results = self.translate([{"recipe_name": "Rice bowl", "calories": "310"}])
+        llm.assert_not_called()   # from the database cache
+        self.assertEqual(results, [{"recipe_name": "ES Rice bowl", "calories": "310"}])
+
+    def test_records_sharing_a_value_send_it_once(self):
+        llm, results = self.translate([{"recipe_name": "Rice bowl"}, {"recipe_name": "Rice bowl", "category": "Main"}])
+        self.assertEqual(llm.call_count, 1)
+        payload = llm.call_args.args[0]
+        self.assertEqual(sorted(payload.values()), ["Main", "Rice bowl"])
+        self.assertEqual(results[1], {"recipe_name": "ES Rice bowl", "category": "ES Main"})
+
+    def test_values_without_text_translate_nothing(self):
+        llm, results = self.translate([{"calories": "300", "tag": "", "ratings": None}])
+        llm.assert_not_called()
+        self.assertEqual(results, [{"calories": "300", "tag": "", "ratings": None}])
+
+
+
+
+class TranslationMemoryTests(TestCase):
+    def setUp(self):
+        translate._lru.clear()
+
+    def test_texts_are_split_at_lines_and_list_markers_only(self):
+        parts = split_segments("1. 2 eggs, beaten\n2. Salt, to taste. Mix well.\n- Olive oil")
+        self.assertEqual(parts[::2], ["", "2 eggs, beaten", "Salt, to taste. Mix well.", "Olive oil"])
+        self.assertEqual("".join(parts), "1. 2 eggs, beaten\n2. Salt, to taste. Mix well.\n- Olive oil")
+
+    def test_segments_of_all_records_are_looked_up_in_one_query(self):
+        records = [{"ingredients": f"Rice {i}\nSalt to taste", "instructions": f"Boil {i} minutes"} for i in range(10)]
+        with mock.patch.object(translate, "_translate_with_llm", side_effect=_fake_llm):
+            translate.translate_records(records, "en", "es")
+        translate._lru.clear()
+
+        with mock.patch.object(translate, "_translate_with_llm", side_effect=_fake_llm) as llm, \
+                CaptureQueriesContext(connection) as queries:
+            results, untranslated = translate.translate_records(
+                [{"ingredients": f"Salt to taste\nRice {i}"} for i in range(10)], "en", "es"
+            )
+        llm.assert_not_called()
+        selects = [query for query in queries.captured_queries if query["sql"].startswith("SELECT")]
+        self.assertEqual(len(selects), 2)   # cached field values, then the TM segments of all records
+        self.assertEqual(results[3]["ingredients"], "ES Salt to taste\nES Rice 3")
+        self.assertEqual(untranslated, [[]] * 10)
+
+
+
+
+@override_settings(CATALOG_TWIN_CACHE_SECONDS=60)
+class TwinCacheInvalidationTests(TestCase):
+    """Saving or deleting a twin drops it from the per-process cache once the transaction commits."""
+
+    def setUp(self):
+        twins._cache.clear()
+
+    def resolve(self, queries):
+        with self.assertNumQueries(queries):
+            twin = twins.TwinResolver(RecipeSpanish).get("rice-1")
+        return twin and twin.recipe_name
+
+    def test_created_changed_and_deleted_twins_are_seen(self):
+        self.assertIsNone(self.resolve(1))
+        self.assertIsNone(self.resolve(0))   # a missing twin is cached too
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin = RecipeSpanish.objects.create(
+                unique_id="rice-1", recipe_name="Arroz", recipe_type="Veg", for_time="Almuerzo", category="Principal",
+                calories=300, carbs=1, protein=10, fat=5, making_time=timedelta(minutes=10),
+                time=timedelta(minutes=10), ingredients="arroz", instructions="Cocinar.",
+            )
+        self.assertEqual(self.resolve(1), "Arroz")
+        self.assertEqual(self.resolve(0), "Arroz")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.recipe_name = "Arroz blanco"
+            twin.save()
+        self.assertEqual(self.resolve(1), "Arroz blanco")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            twin.delete()
+        self.assertIsNone(self.resolve(1))
+
+
+
+
+def _queued_recipe(name, **fields):
+    return Recipe.objects.create(
+        unique_id="rice-1", recipe_name=name, recipe_type="Veg", for_time="Lunch", category="Main", calories=300,
+        carbs=1, protein=10, fat=5, making_time=timedelta(minutes=10), time=timedelta(minutes=10),
+        ingredients="rice", instructions="Cook.", **{**QUEUED_TRANSLATION, **fields},
+    )
+
+
+
+
+@override_settings(TRANSLATION_MAX_ATTEMPTS=2, TRANSLATION_RETRY_DELAY_SECONDS=60)
+class TranslationQueueTests(TestCase):
+    """Admin writes queued for the translation worker (recipe.translation_jobs)."""
+
+    def setUp(self):
+        translate._lru.clear()
+
+    def run_queue(self, side_effect=_fake_llm):
+        with mock.patch.object(translate, "_translate_with_llm", side_effect=side_effect):
+            return [run_translation(kind, model, pk) for kind, model, pk in claim_translations(10)]
+
+    def test_queued_row_gets_its_twin(self):
+        recipe = _queued_recipe("Rice")
+        [done] = self.run_queue()
+        self.assertEqual((done.translation_status, done.translation_attempts), (TwinTranslationStatus.STATUS_DONE, 1))
+        self.assertEqual(RecipeSpanish.objects.get(unique_id=recipe.unique_id).recipe_name, "ES Rice")
+        self.assertEqual(self.run_queue(), [])
+
+    def test_failed_attempts_are_retried_after_the_delay_then_fail(self):
+        recipe = _queued_recipe("Rice")
+        [row] = self.run_queue(side_effect=RuntimeError("LLM down"))
+        self.assertEqual((row.translation_status, row.translation_error), (TwinTranslationStatus.STATUS_QUEUED, "LLM down"))
+        self.assertEqual(self.run_queue(), [])   # not due yet
+
+        Recipe.objects.filter(pk=recipe.pk).update(translation_started_at=timezone.now() - timedelta(minutes=2))
+        [row] = self.run_queue(side_effect=RuntimeError("LLM down"))
+        self.assertEqual((row.translation_status, row.translation_attempts), (TwinTranslationStatus.STATUS_FAILED, 2))
+        Recipe.objects.filter(pk=recipe.pk).update(translation_started_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(self.run_queue(), [])
+        self.assertFalse(RecipeSpanish.objects.exists())
+
+    def test_row_edited_while_running_stays_queued(self):
+        recipe = _queued_recipe("Rice")
+        [(kind, model, pk)] = claim_translations(10)
+        Recipe.objects.filter(pk=pk).update(**QUEUED_TRANSLATION)   # admin edit meanwhile
+        with mock.patch.object(translate, "_translate_with_llm", side_effect=_fake_llm):
+            run_translation(kind, model, pk)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.translation_status, TwinTranslationStatus.STATUS_QUEUED)
+        self.assertFalse(RecipeSpanish.objects.exists())
+
+    def test_newer_twin_edit_wins_without_ping_pong(self):
+        recipe = _queued_recipe("Rice")
+        spanish = RecipeSpanish.objects.create(
+            unique_id="rice-1", recipe_name="Arroz", recipe_type="Veg", for_time="Almuerzo", category="Principal",
+            calories=300, carbs=1, protein=10, fat=5, making_time=timedelta(minutes=10), time=timedelta(minutes=10),
+            ingredients="arroz", instructions="Cocinar.", **QUEUED_TRANSLATION,
+        )
+        self.run_queue()
+        recipe.refresh_from_db()
+        spanish.refresh_from_db()
+        self.assertEqual((recipe.recipe_name, spanish.recipe_name), ("ES Arroz", "Arroz"))
+        self.assertEqual(recipe.translation_status, TwinTranslationStatus.STATUS_DONE)
+        self.assertEqual(spanish.translation_status, TwinTranslationStatus.STATUS_DONE)
+        self.assertEqual(self.run_queue(), [])
+
+    def test_older_twin_edit_is_not_translated_back(self):
+        spanish = RecipeSpanish.objects.create(
+            unique_id="rice-1", recipe_name="Arroz", recipe_type="Veg", for_time="Almuerzo", category="Principal",
+            calories=300, carbs=1, protein=10, fat=5, making_time=timedelta(minutes=10), time=timedelta(minutes=10),
+            ingredients="arroz", instructions="Cocinar.", **QUEUED_TRANSLATION,
+        )
+        recipe = _queued_recipe("Rice")
+        self.run_queue()
+        recipe.refresh_from_db()
+        spanish.refresh_from_db()
+        self.assertEqual((recipe.recipe_name, spanish.recipe_name), ("Rice", "ES Rice"))
+        self.assertEqual(spanish.translation_status, TwinTranslationStatus.STATUS_DONE)
+
+    def test_retry_translation_queues_a_failed_row(self):
+        recipe = _queued_recipe("Rice", translation_status=TwinTranslationStatus.STATUS_FAILED,
+                                translation_error="LLM down", translation_attempts=2)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="admin", email="admin@example.com", role="admin"))
+        response = client.post(reverse("recipe-retry-translation", args=[recipe.pk]))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["translation_status"], TwinTranslationStatus.STATUS_QUEUED)
+        [done] = self.run_queue()
+        self.assertEqual(done.translation_status, TwinTranslationStatus.STATUS_DONE)
+
+
+
+
+class SyncCatalogTranslationsTests(TransactionTestCase):
+    """The command translates on pool threads, which see only committed rows."""
+
+    def setUp(self):
+        translate._lru.clear()
+        for i in range(5):
+            Recipe.objects.create(
+                unique_id=f"recipe-{i}", recipe_name=f"Recipe {i}", recipe_type="Veg", for_time="Lunch",
+                category="Main", calories=300, carbs=1, protein=10, fat=5, making_time=timedelta(minutes=10),
+                time=timedelta(minutes=10), ingredients=f"Rice {i}", instructions=f"Cook {i} minutes.",
+            )
+        self.recipes = list(Recipe.objects.order_by("pk"))
+
+    def twin(self, recipe, name, **fields):
+        spec = twins.TWIN_SPECS["recipe"]
+        twin = twins.apply_to_twin(spec, recipe, RecipeSpanish(), {"recipe_name": name})
+        for field, value in fields.items():
+            setattr(twin, field, value)
+        twin.save()
+        return twin
+
+    def sync(self, side_effect=_fake_llm, **options):
+        out = StringIO()
+        with mock.patch.object(translate, "_translate_with_llm", side_effect=side_effect) as llm:
+            call_command("sync_catalog_translations", kind="recipe", workers=1, backoff=0, stdout=out,
+                         stderr=StringIO(), **options)
+        return llm, out.getvalue()
+
+    def names(self):
+        return dict(RecipeSpanish.objects.values_list("unique_id", "recipe_name"))
+
+    def test_missing_and_stale_twins_are_synced_in_batches_once(self):
+        self.twin(self.recipes[0], "Arroz 0")
+        self.twin(self.recipes[1], "Arroz 1", source_hash="an older English row")
+
+        with CaptureQueriesContext(connection) as queries:
+            llm, out = self.sync(batch_size=2)
+        self.assertIn("3 missing, 1 stale", out)
+        self.assertEqual(llm.call_count, 2)
+        inserts = [query for query in queries.captured_queries if query["sql"].startswith('INSERT INTO "recipe_recipespanish"')]
+        self.assertEqual(len(inserts), 2)   # one bulk insert per batch
+        self.assertEqual(self.names(), {
+            "recipe-0": "Arroz 0", "recipe-1": "ES Recipe 1", "recipe-2": "ES Recipe 2",
+            "recipe-3": "ES Recipe 3", "recipe-4": "ES Recipe 4",
+        })
+
+        llm, out = self.sync(batch_size=2)
+        self.assertIn("0 missing, 0 stale", out)
+        llm.assert_not_called()
+
+    def test_dry_run_writes_nothing(self):
+        llm, out = self.sync(dry_run=True)
+        self.assertIn("5 missing, 0 stale", out)
+        llm.assert_not_called()
+        self.assertEqual(self.names(), {})
+
+    def test_unparseable_answer_is_retried_in_halves(self):
+        def cut_off_unless_single(data, source, target):
+            if len({key.split(".")[0] for key in data if key.startswith("r")}) > 1:
+                raise json.JSONDecodeError("Unterminated string", "{", 1)
+            return _fake_llm(data, source, target)
+
+        llm, out = self.sync(side_effect=cut_off_unless_single, batch_size=4, retries=0)
+        self.assertEqual(llm.call_count, 8)   # 4 rows, then 2 + 2, then 1 + 1 + 1 + 1; and the 5th row alone
+        self.assertEqual(len(self.names()), 5)
+        self.assertEqual(self.names()["recipe-3"], "ES Recipe 3")
+
+    def test_a_failed_run_resumes_where_it_stopped(self):
+        def down_for_recipe_3(data, source, target):
+            if "Recipe 3" in data.values():
+                raise RuntimeError("LLM down")
+            return _fake_llm(data, source, target)
+
+        with self.assertRaisesMessage(CommandError, "1 rows could not be translated"):
+            self.sync(side_effect=down_for_recipe_3, batch_size=1, retries=0)
+        self.assertNotIn("recipe-3", self.names())
+
+        llm, out = self.sync(batch_size=1)
+        self.assertIn("1 missing, 0 stale", out)
+        self.assertEqual(llm.call_count, 1)
+        self.assertEqual(self.names()["recipe-3"], "ES Recipe 3")
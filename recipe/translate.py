@@ -1,42 +1,84 @@
+"""
+Field translation for the English/Spanish recipe and workout twins.
+
+Every translated field value is cached under a hash of (source language, target language, field
+name, source text): in an in-process LRU of TRANSLATION_CACHE_SIZE entries and in the
+TranslationCache table. Only the fields missing from both are sent to the LLM, in one request,
+so saving a recipe whose texts did not change translates nothing, and a text repeated across
+the catalog ("Lunch", "Dumbbells") is translated once. Long texts (ingredients, instructions,
+benefits) are translated line by line through the translation memory (recipe.translation_memory),
+so only their unseen lines are sent. Values the LLM leaves out are reported, never saved as
+if the source text were their translation.
+"""
 import json
+import threading
+from collections import OrderedDict
 import openai
+from django.conf import settings
+from .models import TranslationCache
+from .translation_memory import SEGMENTED_FIELDS, assemble, plan_segments, store_segments
 
 
-def translate_to_english(data):
-    """Translate only values of JSON fields to English using OpenAI, keeping keys unchanged."""
-    prompt = f"""
-    Translate the following JSON data from Spanish to English, but DO NOT translate the keys — only the values.
+LANGUAGES = {"en": "English", "es": "Spanish"}
+_lru = OrderedDict()   # key -> translated text
+_lru_lock = threading.Lock()
 
 
-    Keep the field names (keys) exactly the same. Return only the translated values in English using the same JSON structure.
 
 
-    JSON to translate:
-    {json.dumps(data, indent=2)}
+def _lru_get(keys):
+    with _lru_lock:
+        found = {}
+        for key in keys:
+            if key in _lru:
+                _lru.move_to_end(key)
+                found[key] = _lru[key]
+        return found
 
-    Return raw JSON with translated values and same keys.
-    """
+
+
+
+def _lru_put(values):
+    size = getattr(settings, 'TRANSLATION_CACHE_SIZE', 5000)
+    with _lru_lock:
+        for key, text in values.items():
+            _lru[key] = text
+            _lru.move_to_end(key)
+        while len(_lru) > size:
+            _lru.popitem(last=False)
+
+
+
+
+class TranslationIncomplete(Exception):
+    """The LLM answer left some fields untranslated."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        super().__init__(f"No translation returned for: {', '.join(fields)}")
+
+
+
+
+def _is_translatable(value):
+    # Empty values and numbers read the same in both languages
+    if not isinstance(value, str) or not value.strip():
+        return False
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            temperature=0,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        content = response.choices[0].message.content.strip()
-        return json.loads(content)
-    except Exception as e:
-        raise Exception(f"Translation to English failed: {str(e)}")
-   
+        float(value)
+        return False
+    except ValueError:
+        return True
 
 
 
-def translate_to_spanish(data):
-    """Translate only values of JSON fields to Spanish using OpenAI, keeping keys unchanged."""
+
+def _translate_with_llm(data, source, target):
     prompt = f"""
-    Translate the following JSON data from English to Spanish, but DO NOT translate the keys — only the values.
+    Translate the following JSON data from {LANGUAGES[source]} to {LANGUAGES[target]}, but DO NOT translate the keys — only the values.
 
 
-    Keep the field names (keys) exactly the same. Return only the translated values in Spanish using the same JSON structure.
+    Keep the field names (keys) exactly the same. Return only the translated values in {LANGUAGES[target]} using the same JSON structure.
 
 
     JSON to translate:
@@ -45,13 +87,122 @@ def translate_to_spanish(data):
 
     Return raw JSON with translated values and same keys.
     """
+    response = openai.ChatCompletion.create(
+        model="gpt-4",
+        temperature=0,
+        messages=[{"role": "user", "content": prompt}]
+    )
+    content = response.choices[0].message.content.strip()
+    return json.loads(content)
+
+
+
+
+def translate_records(records, source, target):
+    """
+    Translate the values of each record in `records` (dicts of field name -> text) from `source`
+    to `target` ("en"/"es"), keeping the keys; everything the caches and the translation memory
+    do not know goes into one LLM request. Values that need no translation are returned unchanged.
+
+    Returns (translated records, untranslated): untranslated[i] lists the fields of record i the
+    LLM did not (fully) translate; they keep their source text and must not be saved as done.
+    """
+    keys = [
+        {field: TranslationCache.make_key(source, target, field, value) for field, value in data.items() if _is_translatable(value)}
+        for data in records
+    ]
+    all_keys = {key for record_keys in keys for key in record_keys.values()}
+    translated = _lru_get(all_keys)
+
+    missing = [key for key in all_keys if key not in translated]
+    if missing:
+        stored = dict(TranslationCache.objects.filter(key__in=missing).values_list('key', 'translated_text'))
+        _lru_put(stored)
+        translated.update(stored)
+
+    # Long texts go segment by segment through the translation memory; what neither the TM
+    # nor the cache knows is translated in one request. The same text is sent once.
+    pending = {}
+    for index, record_keys in enumerate(keys):
+        for field, key in record_keys.items():
+            if key not in translated and key not in pending:
+                pending[key] = (index, field)
+    segmented = [(key, records[index][field]) for key, (index, field) in pending.items() if field in SEGMENTED_FIELDS]
+    plans = dict(zip([key for key, _ in segmented], plan_segments([text for _, text in segmented], source, target)))
+
+    unseen, payload = {}, {}
+    for key, (index, field) in pending.items():
+        if key in plans:
+            for normalized, segment in plans[key].unseen.items():
+                if normalized not in unseen:
+                    unseen[normalized] = segment
+                    payload[f"segment_{len(unseen)}"] = segment
+        else:
+            payload[f"r{index}.{field}"] = records[index][field]
+
+    if pending:
+        result = _translate_with_llm(payload, source, target) if payload else {}
+        if not isinstance(result, dict):
+            result = {}
+
+        segments = {}
+        for number, normalized in enumerate(unseen, start=1):
+            value = result.get(f"segment_{number}")
+            if isinstance(value, str) and value.strip():
+                segments[normalized] = value
+        store_segments(segments, unseen, source, target)
+
+        new_rows = []
+        for key, (index, field) in pending.items():
+            if key in plans:
+                value, complete = assemble(plans[key], segments)
+                if not complete:
+                    continue  # partly translated: reported, not used
+            else:
+                value = result.get(f"r{index}.{field}")
+            if not isinstance(value, str) or not value.strip():
+                continue  # reported as untranslated rather than guessed
+            translated[key] = value
+            new_rows.append(TranslationCache(
+                key=key, source_language=source, target_language=target,
+                field_name=field, source_text=records[index][field], translated_text=value,
+            ))
+        TranslationCache.objects.bulk_create(new_rows, ignore_conflicts=True)
+        _lru_put({row.key: row.translated_text for row in new_rows})
+
+    results = [
+        {field: translated.get(record_keys[field], value) if field in record_keys else value for field, value in data.items()}
+        for data, record_keys in zip(records, keys)
+    ]
+    untranslated = [[field for field, key in record_keys.items() if key not in translated] for record_keys in keys]
+    return results, untranslated
+
+
+
+
+def translate_fields(data, source, target):
+    """translate_records() for a single record; raises TranslationIncomplete if a field was left untranslated."""
+    (result,), (untranslated,) = translate_records([data], source, target)
+    if untranslated:
+        raise TranslationIncomplete(untranslated)
+    return result
+
+
+
+
+def translate_to_english(data):
+    """Translate only values of JSON fields to English using OpenAI, keeping keys unchanged."""
+    try:
+        return translate_fields(data, "es", "en")
+    except Exception as e:
+        raise Exception(f"Translation to English failed: {str(e)}")
+
+
+
+
+def translate_to_spanish(data):
+    """Translate only values of JSON fields to Spanish using OpenAI, keeping keys unchanged."""
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            temperature=0,
-            messages=[{"role": "user", "content": prompt}]
-        )
-        content = response.choices[0].message.content.strip()
-        return json.loads(content)
+        return translate_fields(data, "en", "es")
     except Exception as e:
         raise Exception(f"Translation to Spanish failed: {str(e)}")
@@ -0,0 +1,146 @@
+"""
+Background translation of catalog rows written through the admin API.
+
+An admin write is saved right away with translation_status "queued" (QUEUED_TRANSLATION);
+`manage.py run_translation_worker` claims queued rows, translates them (recipe.translate) and
+creates or updates their twin in the other language. A failed attempt is queued again after
+TRANSLATION_RETRY_DELAY_SECONDS, up to TRANSLATION_MAX_ATTEMPTS; the row is then "failed" (it
+is kept, with the error) until an admin retries it. When a row and its twin both have an edit
+queued, the newer edit is translated over the other one, never both ways.
+"""
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import TwinTranslationStatus
+from .translate import translate_fields
+from .twins import TWIN_SPECS, apply_to_twin, source_hash, translatable_values
+
+
+QUEUED_TRANSLATION = {
+    'translation_status': TwinTranslationStatus.STATUS_QUEUED,
+    'translation_error': '',
+    'translation_attempts': 0,
+    'translation_started_at': None,
+}
+
+PENDING_STATUSES = (TwinTranslationStatus.STATUS_QUEUED, TwinTranslationStatus.STATUS_RUNNING)
+
+
+
+
+def _queues():
+    """(kind, model) of every model whose rows can be queued: English sources and their Spanish twins."""
+    for kind, spec in TWIN_SPECS.items():
+        yield kind, spec.source
+        yield kind, spec.twin
+
+
+
+
+def claim_translations(limit):
+    """
+    Atomically move up to `limit` queued rows to running and return them as (kind, model, pk).
+    Rows that failed before wait TRANSLATION_RETRY_DELAY_SECONDS since their last attempt.
+    """
+    claimed = []
+    now = timezone.now()
+    retry_before = now - timedelta(seconds=getattr(settings, 'TRANSLATION_RETRY_DELAY_SECONDS', 60))
+    for kind, model in _queues():
+        if len(claimed) >= limit:
+            break
+        with transaction.atomic():
+            ids = list(
+                model.objects.select_for_update(skip_locked=True)
+                .filter(translation_status=TwinTranslationStatus.STATUS_QUEUED)
+                .filter(Q(translation_started_at__isnull=True) | Q(translation_started_at__lt=retry_before))
+                .order_by('updated_at')
+                .values_list('id', flat=True)[:limit - len(claimed)]
+            )
+            if ids:
+                model.objects.filter(id__in=ids).update(
+                    translation_status=TwinTranslationStatus.STATUS_RUNNING,
+                    translation_started_at=now,
+                    translation_attempts=F('translation_attempts') + 1,
+                )
+        claimed += [(kind, model, pk) for pk in ids]
+    return claimed
+
+
+
+
+def requeue_stale_translations(older_than):
+    """Put rows running for more than `older_than` seconds (e.g. worker crashed) back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return sum(
+        model.objects.filter(
+            translation_status=TwinTranslationStatus.STATUS_RUNNING, translation_started_at__lt=cutoff
+        ).update(translation_status=TwinTranslationStatus.STATUS_QUEUED, translation_started_at=None)
+        for kind, model in _queues()
+    )
+
+
+
+
+def build_twin(spec, obj):
+    """
+    Create or update the twin of `obj` (an English or a Spanish row) from its translated values.
+    Returns None, writing nothing, when the twin has a newer admin edit of its own queued or running
+    (that edit is translated over `obj` instead), or when such an edit already replaced `obj`'s.
+    """
+    english = isinstance(obj, spec.source)
+    twin_model = spec.twin if english else spec.source
+    if not obj.unique_id:
+        obj.unique_id = str(uuid.uuid4())
+        type(obj).objects.filter(pk=obj.pk).update(unique_id=obj.unique_id)
+
+    translated = translate_fields(translatable_values(spec, obj), *(("en", "es") if english else ("es", "en")))
+    with transaction.atomic():
+        twin = twin_model.objects.select_for_update().filter(unique_id=obj.unique_id).first() or twin_model()
+        if twin.pk and twin.translation_status in PENDING_STATUSES and twin.updated_at > obj.updated_at:
+            return None
+        if not type(obj).objects.filter(pk=obj.pk, translation_status=TwinTranslationStatus.STATUS_RUNNING).exists():
+            return None
+        apply_to_twin(spec, obj, twin, translated)
+        # An older pending edit of the twin is overwritten by this one: don't translate it back
+        twin.translation_status = TwinTranslationStatus.STATUS_DONE
+        twin.translation_error = ''
+        twin.save()
+        if not english:
+            # The Spanish row was the source: it is now in sync with its English twin
+            type(obj).objects.filter(pk=obj.pk).update(source_hash=source_hash(spec, twin))
+    return twin
+
+
+
+
+def run_translation(kind, model, pk):
+    """
+    Build the twin of one claimed row and record the outcome on the row ("done" also when a newer
+    edit of the twin superseded it). Returns the row (None if it was deleted meanwhile). Safe to
+    call from a worker thread.
+    """
+    obj = model.objects.filter(pk=pk).first()
+    if obj is None:
+        return None
+    try:
+        build_twin(TWIN_SPECS[kind], obj)
+    except Exception as e:
+        max_attempts = getattr(settings, 'TRANSLATION_MAX_ATTEMPTS', 5)
+        fields = {
+            'translation_status': (
+                TwinTranslationStatus.STATUS_FAILED if obj.translation_attempts >= max_attempts
+                else TwinTranslationStatus.STATUS_QUEUED
+            ),
+            'translation_error': str(e),
+        }
+    else:
+        fields = {'translation_status': TwinTranslationStatus.STATUS_DONE, 'translation_error': ''}
+
+    # A row edited while it was translated is queued again: leave it so
+    model.objects.filter(pk=pk, translation_status=TwinTranslationStatus.STATUS_RUNNING).update(**fields)
+    for name, value in fields.items():
+        setattr(obj, name, value)
+    return obj
@@ -0,0 +1,135 @@
+"""
+Segment-level translation memory (TM) for long catalog texts.
+
+Ingredient, instruction and benefit texts are split into segments at line breaks (list markers
+like "1." or "-" stay out of the segment), so a line like "Salt to taste" is translated once for
+the whole catalog. Lines are not split further: an ingredient such as "2 eggs, beaten" or a
+sentence needs its neighbours to be translated right. Segments are stored in TranslationCache (field_name "segment") under
+their normalized form (case, whitespace and trailing punctuation ignored): a stored segment
+with the same text is an exact match, one that only differs in normalization is a normalized
+match and gets the segment's capitalization and final period. plan_segments() looks up the
+segments of many texts in one query; recipe.translate sends only the unseen segments to the LLM,
+together with the other missing fields.
+
+Matches are counted on the stored segments (exact_hits/normalized_hits), so the
+translation_memory_report command can show the hit rate and the tokens saved.
+"""
+import re
+from collections import namedtuple
+from django.db.models import F
+from .models import TranslationCache
+
+
+SEGMENT_FIELD_NAME = "segment"
+SEGMENTED_FIELDS = {"ingredients", "instructions", "benefits"}
+# Separators are kept verbatim: line breaks with an optional list marker
+_SEPARATORS = re.compile(r"(^\s*(?:[-*•]|\d+[.)])\s+|\s*\n\s*(?:(?:[-*•]|\d+[.)])\s+)?)")
+_WHITESPACE = re.compile(r"\s+")
+
+# parts: the text split into [segment, separator, segment, ...]; known: normalized -> translation
+SegmentPlan = namedtuple('SegmentPlan', ['parts', 'known', 'unseen'])
+
+
+
+
+def split_segments(text):
+    """[segment, separator, segment, ...] of a SEGMENTED_FIELDS text; joining the parts gives the text back."""
+    return _SEPARATORS.split(text)
+
+
+
+
+def normalize_segment(segment):
+    return _WHITESPACE.sub(' ', segment).strip().rstrip('.;:').strip().casefold()
+
+
+
+
+def _adapt(translation, stored_source, segment):
+    """Carry the segment's capitalization and final period over to a normalized match."""
+    if stored_source == segment:
+        return translation
+    translation = translation.strip()
+    if segment[:1].isupper():
+        translation = translation[:1].upper() + translation[1:]
+    elif segment[:1].islower():
+        translation = translation[:1].lower() + translation[1:]
+    translation = translation.rstrip('.')
+    return translation + '.' if segment.rstrip().endswith('.') else translation
+
+
+
+
+def _segment_key(source, target, normalized):
+    return TranslationCache.make_key(source, target, SEGMENT_FIELD_NAME, normalized)
+
+
+
+
+def plan_segments(texts, source, target):
+    """
+    Split each of `texts` and look their segments up in the TM, all in one query. Returns a SegmentPlan per text whose
+    `unseen` maps the normalized form of each unknown segment to its first occurrence.
+    """
+    parts_list = [split_segments(text) for text in texts]
+    keys = {
+        _segment_key(source, target, normalized): normalized
+        for parts in parts_list for normalized in map(normalize_segment, parts[::2]) if normalized
+    }
+    rows = TranslationCache.objects.filter(key__in=list(keys)).values_list('key', 'source_text', 'translated_text')
+    stored = {keys[key]: (source_text, translated) for key, source_text, translated in rows}
+
+    plans, exact, normalized_only = [], [], []
+    for parts in parts_list:
+        known, unseen = {}, {}
+        for segment in parts[::2]:
+            normalized = normalize_segment(segment)
+            if not normalized:
+                continue
+            if normalized in stored:
+                source_text, translated = stored[normalized]
+                (exact if source_text == segment else normalized_only).append(_segment_key(source, target, normalized))
+                known[segment] = _adapt(translated, source_text, segment)
+            else:
+                unseen.setdefault(normalized, segment)
+        plans.append(SegmentPlan(parts, known, unseen))
+    if exact:
+        TranslationCache.objects.filter(key__in=exact).update(exact_hits=F('exact_hits') + 1)
+    if normalized_only:
+        TranslationCache.objects.filter(key__in=normalized_only).update(normalized_hits=F('normalized_hits') + 1)
+    return plans
+
+
+
+
+def assemble(plan, translations):
+    """
+    Text of the plan with each segment replaced by its translation (`translations`: normalized ->
+    translation of the unseen ones). Returns (text, complete); untranslated segments stay as they are.
+    """
+    result, complete = [], True
+    for index, part in enumerate(plan.parts):
+        if index % 2 or not normalize_segment(part):
+            result.append(part)
+        elif part in plan.known:
+            result.append(plan.known[part])
+        elif normalize_segment(part) in translations:
+            normalized = normalize_segment(part)
+            result.append(_adapt(translations[normalized], plan.unseen[normalized], part))
+        else:
+            result.append(part)
+            complete = False
+    return ''.join(result), complete
+
+
+
+
+def store_segments(translations, unseen, source, target):
+    """Add newly translated segments (normalized -> translation) to the TM."""
+    TranslationCache.objects.bulk_create([
+        TranslationCache(
+            key=_segment_key(source, target, normalized), source_language=source, target_language=target,
+            field_name=SEGMENT_FIELD_NAME, source_text=unseen[normalized], translated_text=translated,
+        )
+        for normalized, translated in translations.items()
+    ], ignore_conflicts=True)
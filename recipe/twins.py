@@ -0,0 +1,156 @@
+"""
+English catalog rows and their Spanish twins (same unique_id): which fields are translated,
+which are copied, and a hash of the English values a twin was built from (source_hash), so a
+twin whose English row changed since can be found without comparing texts.
+
+Spanish read paths look twins up through a TwinResolver: the twins of a whole result set are
+fetched in one IN query, or from a short-lived in-process cache of recently read twins.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from workout.models import Workout, WorkoutSpanish
+from .models import Recipe, RecipeSpanish
+
+
+TwinSpec = namedtuple('TwinSpec', ['source', 'twin', 'translated', 'copied'])
+
+_cache = OrderedDict()   # (model, unique_id) -> (expires_at, twin or None)
+_cache_lock = threading.Lock()
+
+TWIN_SPECS = {
+    "recipe": TwinSpec(
+        Recipe, RecipeSpanish,
+        translated=['recipe_name', 'recipe_type', 'for_time', 'tag', 'category', 'ingredients', 'instructions'],
+        copied=['image', 'calories', 'carbs', 'protein', 'fat', 'making_time', 'time', 'ratings'],
+    ),
+    "workout": TwinSpec(
+        Workout, WorkoutSpanish,
+        translated=['workout_name', 'for_body_part', 'workout_type', 'equipment_needed', 'tag', 'benefits'],
+        copied=['image', 'calories_burn', 'time_needed'],
+    ),
+}
+
+
+
+
+def _value(obj, field):
+    value = getattr(obj, field)
+    if field == 'image':
+        return value.name if value else None
+    return value
+
+
+
+
+def source_hash(spec, obj):
+    """Hash of the values of `obj` (an English row) that its twin is built from."""
+    values = {field: _value(obj, field) for field in spec.translated + spec.copied}
+    return hashlib.sha256(json.dumps(values, sort_keys=True, default=str).encode()).hexdigest()
+
+
+
+
+def translatable_values(spec, obj):
+    return {field: getattr(obj, field) for field in spec.translated}
+
+
+
+
+def apply_to_twin(spec, obj, twin, translated):
+    """Set the twin's fields from `obj` and its `translated` values (missing ones keep the source text)."""
+    twin.unique_id = obj.unique_id
+    for field in spec.translated:
+        setattr(twin, field, translated.get(field, getattr(obj, field)))
+    for field in spec.copied:
+        setattr(twin, field, _value(obj, field))
+    if isinstance(twin, spec.twin):
+        twin.source_hash = source_hash(spec, obj)
+    return twin
+
+
+
+
+def is_stale(spec, obj, twin):
+    """A twin is stale when its English row changed since it was built."""
+    if twin.source_hash:
+        return twin.source_hash != source_hash(spec, obj)
+    # Twins saved before source_hash existed: fall back to the timestamps
+    return obj.updated_at > twin.updated_at
+
+
+
+
+def invalidate_twins(model, unique_ids):
+    """Drop twins of `model` from this process's cache (other processes wait out CATALOG_TWIN_CACHE_SECONDS)."""
+    with _cache_lock:
+        for unique_id in unique_ids:
+            _cache.pop((model, unique_id), None)
+
+
+
+
+class TwinResolver:
+    """
+    Twins (`model`: RecipeSpanish or WorkoutSpanish) of the rows in a result set, by unique_id.
+    prefetch() loads those not resolved yet; get() of an id that was not prefetched costs a query.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._twins = {}
+
+    def prefetch(self, unique_ids):
+        wanted = {unique_id for unique_id in unique_ids if unique_id and unique_id not in self._twins}
+        ttl = getattr(settings, 'CATALOG_TWIN_CACHE_SECONDS', 60)
+        now = time.monotonic()
+        if wanted and ttl > 0:
+            with _cache_lock:
+                for unique_id in wanted:
+                    cached = _cache.get((self.model, unique_id))
+                    if cached and cached[0] > now:
+                        _cache.move_to_end((self.model, unique_id))
+                        self._twins[unique_id] = cached[1]
+            wanted -= self._twins.keys()
+        if not wanted:
+            return self
+
+        found = {twin.unique_id: twin for twin in self.model.objects.filter(unique_id__in=wanted)}
+        fetched = {unique_id: found.get(unique_id) for unique_id in wanted}
+        self._twins.update(fetched)
+        if ttl > 0:
+            size = getattr(settings, 'CATALOG_TWIN_CACHE_SIZE', 5000)
+            with _cache_lock:
+                for unique_id, twin in fetched.items():
+                    _cache[(self.model, unique_id)] = (now + ttl, twin)
+                    _cache.move_to_end((self.model, unique_id))
+                while len(_cache) > size:
+                    _cache.popitem(last=False)
+        return self
+
+    def get(self, unique_id):
+        if not unique_id:
+            return None
+        if unique_id not in self._twins:
+            self.prefetch([unique_id])
+        return self._twins[unique_id]
+
+
+
+
+def context_resolver(context, model):
+    """The TwinResolver of `model` in a serializer context; views put a prefetched one there (see prefetch_twins)."""
+    key = f"{model._meta.model_name}_twins"
+    if key not in context:
+        context[key] = TwinResolver(model)
+    return context[key]
+
+
+
+
+def prefetch_twins(context, model, unique_ids):
+    """Resolve the twins of `unique_ids` for the serializers using `context`, and return the resolver."""
+    return context_resolver(context, model).prefetch(unique_ids)
@@ -4,7 +4,7 @@ from django.shortcuts import render
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
 from .models import Recipe,RecipeSpanish
-from .serializers import RecipeSerializer,RecipeSpanishSerializer
+from .serializers import RecipeSerializer,RecipeSpanishSerializer,RecipeAdminSerializer,RecipeSpanishAdminSerializer
 from accounts.permissions import IsAdminRole
 from rest_framework.filters import SearchFilter
 from django_filters.rest_framework import DjangoFilterBackend
@@ -15,7 +15,8 @@ from rest_framework import status,generics, filters
 from rest_framework.response import Response
 from rest_framework.views import APIView
 # Create your views here.
-from .translate import translate_to_english,translate_to_spanish
+from .translation_jobs import QUEUED_TRANSLATION
+from rest_framework.decorators import action
 from django.db.models import Q
 
 
@@ -46,9 +47,32 @@ def ensure_unique_id(data: dict) -> str:
 
 
 
-class RecipeAdminViewSet(ModelViewSet):
+class TwinTranslationMixin:
+    """
+    Admin writes are saved right away with translation_status "queued"; `manage.py run_translation_worker`
+    then builds the twin in the other language (see recipe.translation_jobs).
+    """
+
+    def perform_create(self, serializer):
+        serializer.save(**QUEUED_TRANSLATION)
+
+    def perform_update(self, serializer):
+        serializer.save(**QUEUED_TRANSLATION)
+
+    @swagger_auto_schema(operation_summary="Queue the translation into the twin again, e.g. after it failed (Admin only)")
+    @action(detail=True, methods=['post'], url_path='retry-translation')
+    def retry_translation(self, request, *args, **kwargs):
+        instance = self.get_object()
+        type(instance).objects.filter(pk=instance.pk).update(**QUEUED_TRANSLATION)
+        instance.refresh_from_db()
+        return Response(self.get_serializer(instance).data, status=status.HTTP_202_ACCEPTED)
+
+
+
+
+class RecipeAdminViewSet(TwinTranslationMixin, ModelViewSet):
     queryset = Recipe.objects.all()
-    serializer_class = RecipeSerializer
+    serializer_class = RecipeAdminSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
     filter_backends = [DjangoFilterBackend, SearchFilter]
     search_fields = ['recipe_name']
@@ -74,121 +98,15 @@ class RecipeAdminViewSet(ModelViewSet):
     def create(self, request, *args, **kwargs):
         data = request.data.copy()
         ensure_unique_id(data)
-        print(data)
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        recipe = serializer.save()
-
-
-        translatable_fields = {
-            'recipe_name': recipe.recipe_name,
-            'recipe_type': recipe.recipe_type,
-            'for_time': recipe.for_time,
-            'tag': recipe.tag,
-            'category': recipe.category,
-            'ingredients': recipe.ingredients,
-            'instructions': recipe.instructions,
-        }
-
-
-        try:
-            translated_data = translate_to_spanish(translatable_fields)
-            spanish_data = {
-                'unique_id': recipe.unique_id,
-                'image': recipe.image if recipe.image else None,
-                'recipe_name': translated_data.get('recipe_name', recipe.recipe_name),
-                'recipe_type': translated_data.get('recipe_type', recipe.recipe_type),
-                'for_time': translated_data.get('for_time', recipe.for_time),
-                'tag': translated_data.get('tag', recipe.tag),
-                'calories': recipe.calories,
-                'carbs': recipe.carbs,
-                'protein': recipe.protein,
-                'fat': recipe.fat,
-                'making_time': recipe.making_time,
-                'time': recipe.time,
-                'ratings': recipe.ratings,
-                'category': translated_data.get('category', recipe.category),
-                'ingredients': translated_data.get('ingredients', recipe.ingredients),
-                'instructions': translated_data.get('instructions', recipe.instructions),
-            }
-
-
-            spanish_serializer = RecipeSpanishSerializer(data=spanish_data)
-            spanish_serializer.is_valid(raise_exception=True)
-            spanish_recipe = spanish_serializer.save()
-            recipe.related_recipe = spanish_recipe
-            recipe.save()
-
-
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            recipe.delete()
-            return Response({"error": f"Failed to save translated recipe: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
     @swagger_auto_schema(operation_summary="Update an English recipe (Admin only)", tags=["Recipe"])
     def update(self, request, *args, **kwargs):
-        recipe = self.get_object()
-        serializer = self.get_serializer(recipe, data=request.data, partial=False)
-        serializer.is_valid(raise_exception=True)
-        updated_recipe = serializer.save()
-
-
-        translatable_fields = {
-            'recipe_name': updated_recipe.recipe_name,
-            'recipe_type': updated_recipe.recipe_type,
-            'for_time': updated_recipe.for_time,
-            'tag': updated_recipe.tag,
-            'category': updated_recipe.category,
-            'ingredients': updated_recipe.ingredients,
-            'instructions': updated_recipe.instructions,
-        }
-
-
-        try:
-            translated_data = translate_to_spanish(translatable_fields)
-            spanish_data = {
-                'unique_id': updated_recipe.unique_id,
-                'image': updated_recipe.image if updated_recipe.image else None,
-                'recipe_name': translated_data.get('recipe_name', updated_recipe.recipe_name),
-                'recipe_type': translated_data.get('recipe_type', updated_recipe.recipe_type),
-                'for_time': translated_data.get('for_time', updated_recipe.for_time),
-                'tag': translated_data.get('tag', updated_recipe.tag),
-                'calories': updated_recipe.calories,
-                'carbs': updated_recipe.carbs,
-                'protein': updated_recipe.protein,
-                'fat': updated_recipe.fat,
-                'making_time': updated_recipe.making_time,
-                'time': updated_recipe.time,
-                'ratings': updated_recipe.ratings,
-                'category': translated_data.get('category', updated_recipe.category),
-                'ingredients': translated_data.get('ingredients', updated_recipe.ingredients),
-                'instructions': translated_data.get('instructions', updated_recipe.instructions),
-            }
-
-
-            # spanish_recipe = recipe.related_recipe
-            # if spanish_recipe:
-            #     spanish_serializer = RecipeSpanishSerializer(spanish_recipe, data=spanish_data, partial=False)
-            #     spanish_serializer.is_valid(raise_exception=True)
-            #     spanish_serializer.save()
-            # else:
-            #     spanish_serializer = RecipeSpanishSerializer(data=spanish_data)
-            #     spanish_serializer.is_valid(raise_exception=True)
-            #     spanish_recipe = spanish_serializer.save()
-            #     updated_recipe.related_recipe = spanish_recipe
-            #     updated_recipe.save()
-            try:
-                spanish_recipe = RecipeSpanish.objects.get(unique_id=updated_recipe.unique_id)
-                spanish_serializer = RecipeSpanishSerializer(spanish_recipe, data=spanish_data, partial=False)
-            except RecipeSpanish.DoesNotExist:
-                spanish_serializer = RecipeSpanishSerializer(data=spanish_data)
-            
-            spanish_serializer.is_valid(raise_exception=True)
-            spanish_serializer.save()
-            return Response(serializer.data)
-        except Exception as e:
-            return Response({"error": f"Failed to update translated recipe: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return super().update(request, *args, **kwargs)
 
 
     @swagger_auto_schema(operation_summary="Partially update an English recipe (Admin only)", tags=["Recipe"])
@@ -205,9 +123,9 @@ class RecipeAdminViewSet(ModelViewSet):
 
 
 
-class RecipeSpanishAdminViewSet(ModelViewSet):
+class RecipeSpanishAdminViewSet(TwinTranslationMixin, ModelViewSet):
     queryset = RecipeSpanish.objects.all()
-    serializer_class = RecipeSpanishSerializer
+    serializer_class = RecipeSpanishAdminSerializer
     permission_classes = [IsAuthenticated, IsAdminRole]
     filter_backends = [DjangoFilterBackend, SearchFilter]
     search_fields = ['recipe_name']
@@ -232,112 +150,13 @@ class RecipeSpanishAdminViewSet(ModelViewSet):
         ensure_unique_id(data)
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        recipe_spanish = serializer.save()
-
-
-        translatable_fields = {
-            'recipe_name': recipe_spanish.recipe_name,
-            'recipe_type': recipe_spanish.recipe_type,
-            'for_time': recipe_spanish.for_time,
-            'tag': recipe_spanish.tag,
-            'category': recipe_spanish.category,
-            'ingredients': recipe_spanish.ingredients,
-            'instructions': recipe_spanish.instructions,
-        }
-
-
-        try:
-            translated_data = translate_to_english(translatable_fields)
-            english_data = {
-                'unique_id': recipe_spanish.unique_id,
-                'image': recipe_spanish.image if recipe_spanish.image else None,
-                'recipe_name': translated_data.get('recipe_name', recipe_spanish.recipe_name),
-                'recipe_type': translated_data.get('recipe_type', recipe_spanish.recipe_type),
-                'for_time': translated_data.get('for_time', recipe_spanish.for_time),
-                'tag': translated_data.get('tag', recipe_spanish.tag),
-                'calories': recipe_spanish.calories,
-                'carbs': recipe_spanish.carbs,
-                'protein': recipe_spanish.protein,
-                'fat': recipe_spanish.fat,
-                'making_time': recipe_spanish.making_time,
-                'time': recipe_spanish.time,
-                'ratings': recipe_spanish.ratings,
-                'category': translated_data.get('category', recipe_spanish.category),
-                'ingredients': translated_data.get('ingredients', recipe_spanish.ingredients),
-                'instructions': translated_data.get('instructions', recipe_spanish.instructions),
-            }
-
-
-            english_serializer = RecipeSerializer(data=english_data)
-            english_serializer.is_valid(raise_exception=True)
-            english_recipe = english_serializer.save()
-            english_recipe.related_recipe = recipe_spanish
-            english_recipe.save()
-
-
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        except Exception as e:
-            recipe_spanish.delete()
-            return Response({"error": f"Failed to save translated recipe: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        self.perform_create(serializer)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
     @swagger_auto_schema(operation_summary="Update a Spanish recipe (Admin only)", tags=["RecipeSpanish"])
     def update(self, request, *args, **kwargs):
-        recipe_spanish = self.get_object()
-        serializer = self.get_serializer(recipe_spanish, data=request.data, partial=False)
-        serializer.is_valid(raise_exception=True)
-        updated_recipe_spanish = serializer.save()
-
-
-        translatable_fields = {
-            'recipe_name': updated_recipe_spanish.recipe_name,
-            'recipe_type': updated_recipe_spanish.recipe_type,
-            'for_time': updated_recipe_spanish.for_time,
-            'tag': updated_recipe_spanish.tag,
-            'category': updated_recipe_spanish.category,
-            'ingredients': updated_recipe_spanish.ingredients,
-            'instructions': updated_recipe_spanish.instructions,
-        }
-
-
-        try:
-            translated_data = translate_to_english(translatable_fields)
-            english_data = {
-                'unique_id': updated_recipe_spanish.unique_id,
-                'image': updated_recipe_spanish.image if updated_recipe_spanish.image else None,
-                'recipe_name': translated_data.get('recipe_name', updated_recipe_spanish.recipe_name),
-                'recipe_type': translated_data.get('recipe_type', updated_recipe_spanish.recipe_type),
-                'for_time': translated_data.get('for_time', updated_recipe_spanish.for_time),
-                'tag': translated_data.get('tag', updated_recipe_spanish.tag),
-                'calories': updated_recipe_spanish.calories,
-                'carbs': updated_recipe_spanish.carbs,
-                'protein': updated_recipe_spanish.protein,
-                'fat': updated_recipe_spanish.fat,
-                'making_time': updated_recipe_spanish.making_time,
-                'time': updated_recipe_spanish.time,
-                'ratings': updated_recipe_spanish.ratings,
-                'category': translated_data.get('category', updated_recipe_spanish.category),
-                'ingredients': translated_data.get('ingredients', updated_recipe_spanish.ingredients),
-                'instructions': translated_data.get('instructions', updated_recipe_spanish.instructions),
-            }
-
-
-            english_recipe = getattr(recipe_spanish, 'recipe', None)
-            if english_recipe:
-                english_serializer = RecipeSerializer(english_recipe, data=english_data, partial=False)
-                english_serializer.is_valid(raise_exception=True)
-                english_serializer.save()
-            else:
-                english_serializer = RecipeSerializer(data=english_data)
-                english_serializer.is_valid(raise_exception=True)
-                english_recipe = english_serializer.save()
-                english_recipe.related_recipe = recipe_spanish
-                english_recipe.save()
-
-
-            return Response(serializer.data)
-        except Exception as e:
-            return Response({"error": f"Failed to update translated recipe: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST)
+        return super().update(request, *args, **kwargs)
 
 
     @swagger_auto_schema(operation_summary="Partially update a Spanish recipe (Admin only)", tags=["RecipeSpanish"])
@@ -1,3 +1,20 @@
 from django.contrib import admin
+from .models import PlanGenerationJob, PlanMemo
 
 # Register your models here.
+
+@admin.register(PlanGenerationJob)
+class PlanGenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'kind', 'status', 'engine', 'plan_id', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status', 'engine')
+    search_fields = ('user__email', 'error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+
+
+
+@admin.register(PlanMemo)
+class PlanMemoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'fingerprint', 'hits', 'created_at', 'last_used_at')
+    list_filter = ('kind',)
+    search_fields = ('fingerprint',)
@@ -0,0 +1,142 @@
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import Profile
+from meal.models import MealPlan
+from meal.services import generate_meal_plan
+from workoutplan.models import WorkoutPlan
+from workoutplan.services import generate_workout_plan
+from AiChat.context import invalidate_chat_context
+from .models import PlanGenerationJob
+
+
+ACTIVE_PLAN_MODELS = {
+    PlanGenerationJob.KIND_MEAL: MealPlan,
+    PlanGenerationJob.KIND_WORKOUT: WorkoutPlan,
+}
+
+
+
+
+class ActivePlanExists(Exception):
+    """The user already has an active plan, or a job of the same kind in progress."""
+
+
+
+
+def has_active_plan(user, kind, exclude_id=None):
+    plans = ACTIVE_PLAN_MODELS[kind].objects.filter(user=user, is_completed=False, is_cancelled=False)
+    if exclude_id:
+        plans = plans.exclude(pk=exclude_id)
+    return plans.exists()
+
+
+
+
+def plan_conflict(user, kind, exclude_id=None):
+    """
+    Why no plan of `kind` can be generated for the user right now (the 409 detail), or None:
+    the user has an active plan of this kind (other than `exclude_id`) or a queued/running job for it.
+    """
+    label = "meal" if kind == PlanGenerationJob.KIND_MEAL else "workout"
+    if has_active_plan(user, kind, exclude_id):
+        return f"User already has an active {label} plan."
+    if PlanGenerationJob.objects.filter(user=user, kind=kind, status__in=PlanGenerationJob.ACTIVE_STATUSES).exists():
+        return f"A {label} plan is already being generated."
+    return None
+
+
+
+
+def enqueue_plan_job(user, kind, payload):
+    """
+    Create a queued job. Raises ActivePlanExists when plan_conflict() finds an active plan of
+    this kind or a queued/running job for it (the same 409 rule as the synchronous endpoints).
+
+    A payload with "replaces_plan_id" (e.g. a template plan given at onboarding) ignores that
+    plan in the check; the worker cancels it once the new plan has been saved.
+    """
+    with transaction.atomic():
+        # Lock the user's row so two concurrent requests cannot both pass the check and enqueue
+        type(user).objects.select_for_update().filter(pk=user.pk).first()
+        conflict = plan_conflict(user, kind, payload.get("replaces_plan_id"))
+        if conflict:
+            raise ActivePlanExists(conflict)
+        return PlanGenerationJob.objects.create(user=user, kind=kind, payload=payload)
+
+
+
+
+def claim_jobs(limit):
+    """
+    Atomically move up to `limit` queued jobs to running and return them. Uses
+    SELECT ... FOR UPDATE SKIP LOCKED so several workers can poll the same table.
+    """
+    if limit <= 0:
+        return []
+    with transaction.atomic():
+        ids = list(
+            PlanGenerationJob.objects.select_for_update(skip_locked=True)
+            .filter(status=PlanGenerationJob.STATUS_QUEUED)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        PlanGenerationJob.objects.filter(id__in=ids).update(status=PlanGenerationJob.STATUS_RUNNING, started_at=timezone.now())
+    return list(PlanGenerationJob.objects.select_related('user').filter(id__in=ids).order_by('created_at'))
+
+
+
+
+def requeue_stale_jobs(older_than):
+    """Put running jobs that started more than `older_than` seconds ago (e.g. worker crashed) back in the queue."""
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return PlanGenerationJob.objects.filter(
+        status=PlanGenerationJob.STATUS_RUNNING, started_at__lt=cutoff
+    ).update(status=PlanGenerationJob.STATUS_QUEUED, started_at=None)
+
+
+
+
+def _finish(job, **fields):
+    fields["finished_at"] = timezone.now()
+    PlanGenerationJob.objects.filter(pk=job.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(job, name, value)
+
+
+
+
+def _error_message(e):
+    detail = getattr(e, "detail", None)
+    return str(detail if detail is not None else e)
+
+
+
+
+def run_plan_job(job):
+    """Generate the plan for one claimed job and record the outcome. Safe to call from a worker thread."""
+    try:
+        PlanGenerationJob.objects.filter(pk=job.pk).update(attempts=job.attempts + 1)
+        user = job.user
+        replaces = job.payload.get("replaces_plan_id")
+        if has_active_plan(user, job.kind, replaces):
+            label = "meal" if job.kind == PlanGenerationJob.KIND_MEAL else "workout"
+            raise ActivePlanExists(f"User already has an active {label} plan.")
+
+        profile = Profile.objects.get(user=user)
+        if job.kind == PlanGenerationJob.KIND_MEAL:
+            plan, engine = generate_meal_plan(user, profile, job.payload.get("engine"), days=15)
+        else:
+            plan, engine = generate_workout_plan(user, profile, job.payload, days=15)
+        if replaces:
+            ACTIVE_PLAN_MODELS[job.kind].objects.filter(pk=replaces, user=user).update(is_cancelled=True)
+            invalidate_chat_context(user.pk)
+    except Profile.DoesNotExist:
+        _finish(job, status=PlanGenerationJob.STATUS_FAILED, error="Profile not found.")
+    except Exception as e:
+        _finish(job, status=PlanGenerationJob.STATUS_FAILED, error=_error_message(e))
+    else:
+        _finish(job, status=PlanGenerationJob.STATUS_SUCCEEDED, plan_id=plan.id, engine=engine, error="")
+    return job
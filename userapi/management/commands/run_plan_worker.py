@@ -0,0 +1,55 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from userapi.jobs import claim_jobs, requeue_stale_jobs, run_plan_job
+
+
+def _run_in_thread(job):
+    try:
+        return run_plan_job(job)
+    finally:
+        # Every worker thread has its own DB connection
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = "Process queued PlanGenerationJob rows (meal/workout plan generation) on a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=getattr(settings, "PLAN_WORKER_THREADS", 4),
+                            help="Jobs processed concurrently.")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--stale-after", type=int, default=900,
+                            help="Requeue running jobs started more than this many seconds ago.")
+        parser.add_argument("--once", action="store_true", help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        requeued = requeue_stale_jobs(options["stale_after"])
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+        self.stdout.write(f"Plan worker started with {workers} thread(s).")
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while True:
+                    for job in claim_jobs(workers - len(running)):
+                        running.add(pool.submit(_run_in_thread, job))
+
+                    if not running:
+                        if options["once"]:
+                            break
+                        time.sleep(options["poll"])
+                        continue
+
+                    done, running = wait(running, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                    running = set(running)
+                    for future in done:
+                        job = future.result()
+                        self.stdout.write(f"Job #{job.pk} ({job.kind}): {job.status}"
+                                          + (f" plan_id={job.plan_id}" if job.plan_id else f" error={job.error}"))
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running jobs to finish...")
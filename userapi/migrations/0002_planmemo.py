@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userapi', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanMemo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('meal', 'Meal plan'), ('workout', 'Workout plan')], max_length=20)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('plan', models.JSONField(default=dict)),
+                ('uids', models.JSONField(default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'last_used_at'], name='userapi_pla_kind_ba5176_idx')],
+                'unique_together': {('kind', 'fingerprint')},
+            },
+        ),
+    ]
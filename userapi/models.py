@@ -1,3 +1,71 @@
 from django.db import models
+from accounts.models import User
 
 # Create your models here.
+
+
+
+
+class PlanGenerationJob(models.Model):
+    KIND_MEAL = 'meal'
+    KIND_WORKOUT = 'workout'
+    KIND_CHOICES = (
+        (KIND_MEAL, 'Meal plan'),
+        (KIND_WORKOUT, 'Workout plan'),
+    )
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_RUNNING)
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='plan_jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    payload = models.JSONField(default=dict, blank=True)  # engine / validated training data
+    plan_id = models.PositiveIntegerField(null=True, blank=True)  # MealPlan or WorkoutPlan id
+    engine = models.CharField(max_length=20, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
+
+    def __str__(self):
+        return f"{self.user.email} - {self.kind} job #{self.pk} ({self.status})"
+
+
+
+
+class PlanMemo(models.Model):
+    """
+    A generated plan stored in date-relative form (day offsets) under a fingerprint of the
+    inputs that shaped it, so users with the same inputs can reuse it (see userapi.plan_memo).
+    """
+    kind = models.CharField(max_length=20, choices=PlanGenerationJob.KIND_CHOICES)
+    fingerprint = models.CharField(max_length=64)
+    plan = models.JSONField(default=dict)  # {name, tags, days: [{offset, ...}]}
+    uids = models.JSONField(default=list)  # referenced Recipe/Workout unique_ids
+    hits = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('kind', 'fingerprint')
+        indexes = [models.Index(fields=['kind', 'last_used_at'])]
+
+    def __str__(self):
+        return f"{self.kind} memo {self.fingerprint[:12]} ({self.hits} hits)"
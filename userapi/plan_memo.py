@@ -0,0 +1,166 @@
+"""
+Reuse of generated plans across users with the same inputs.
+
+A plan is stored under a fingerprint of the profile/training fields that shape it plus a
+catalog version (number of rows and newest row of Recipe/Workout), with dates replaced by
+day offsets. A hit is re-based to today. The plan name and tags are not stored: the LLM may
+have built them from personal fields the fingerprint leaves out (name, age), so callers title a
+hit locally. Memos expire after PLAN_MEMO_TTL_DAYS, the least
+recently used ones are evicted above PLAN_MEMO_MAX_ENTRIES per kind, and a memo is dropped
+as soon as one of the recipes/workouts it references was changed or deleted.
+"""
+import hashlib
+import json
+from datetime import date, timedelta
+from django.conf import settings
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from recipe.models import Recipe
+from workout.models import Workout
+from .models import PlanGenerationJob, PlanMemo
+
+
+MEMO_DAYS_KEYS = {
+    PlanGenerationJob.KIND_MEAL: ("meals", "recipe_uid", Recipe),
+    PlanGenerationJob.KIND_WORKOUT: ("workouts", "workout_uid", Workout),
+}
+MUSCLE_FOCUS_FIELDS = [
+    "chest", "back", "shoulders", "biceps", "triceps", "quadriceps",
+    "hamstrings", "glutes", "calves", "adductors", "lower_back",
+]
+
+
+
+
+def memo_enabled():
+    return getattr(settings, 'PLAN_MEMO_ENABLED', True)
+
+
+
+
+def _normalized(values):
+    return sorted({str(v).strip().lower() for v in values or [] if str(v).strip()})
+
+
+
+
+def catalog_version(model):
+    stats = model.objects.exclude(unique_id__isnull=True).aggregate(rows=Count('id'), newest=Max('created_at'))
+    newest = stats['newest'].isoformat() if stats['newest'] else ''
+    return f"{stats['rows']}:{newest}"
+
+
+
+
+def _fingerprint(kind, fields):
+    fields = dict(fields, kind=kind, catalog=catalog_version(MEMO_DAYS_KEYS[kind][2]))
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+
+
+def meal_fingerprint(profile, calorie_target):
+    """Fingerprint of everything the meal-plan prompt depends on (calories rounded to 100 kcal)."""
+    return _fingerprint(PlanGenerationJob.KIND_MEAL, {
+        "goals": _normalized(profile.fitness_goals),
+        "lifestyle": profile.lifestyle_habits or '',
+        "diet": (profile.dietary_preferences or '').lower(),
+        "allergies": _normalized(profile.allergies),
+        "medical": _normalized(profile.medical_conditions),
+        "calories": int(round(calorie_target / 100.0)) * 100,
+    })
+
+
+
+
+def workout_fingerprint(profile, training_data):
+    """Fingerprint of everything the workout-plan prompt and repair pass depend on."""
+    return _fingerprint(PlanGenerationJob.KIND_WORKOUT, {
+        "goals": _normalized(profile.fitness_goals),
+        "level": str(training_data.get("fitness_level") or profile.fitness_level or '').lower(),
+        "train": str(training_data.get("train") or '').lower(),
+        "minutes": int(training_data.get("daily_duration_minutes") or 0),
+        "injuries": " ".join(str(training_data.get("injuries_discomfort") or '').lower().split()),
+        "focus": {field: _normalized(training_data.get(field)) for field in MUSCLE_FOCUS_FIELDS if training_data.get(field)},
+        "equipment": _normalized(list(profile.at_home or []) + list(profile.at_gym or [])),
+        "medical": _normalized(profile.medical_conditions),
+    })
+
+
+
+
+def relative_days(days, start_date=None):
+    """Replace the "date" of every plan day by its "offset" in days from `start_date` (default today)."""
+    start_date = start_date or date.today()
+    relative = []
+    for day in days:
+        day = dict(day)
+        day["offset"] = (date.fromisoformat(str(day.pop("date"))) - start_date).days
+        relative.append(day)
+    return relative
+
+
+
+
+def rebase_days(days, start_date=None):
+    """Inverse of relative_days: turn day offsets back into ISO dates counted from `start_date`."""
+    start_date = start_date or date.today()
+    dated = []
+    for day in days:
+        day = dict(day)
+        day["date"] = (start_date + timedelta(days=day.pop("offset"))).isoformat()
+        dated.append(day)
+    return dated
+
+
+
+
+def lookup_plan(kind, fingerprint, start_date=None):
+    """
+    Return (result, uids) for a valid memo re-based to `start_date` (default today), or None.
+    `result` only has "days"; the caller adds the plan name and tags. Expired memos and memos whose recipes/workouts changed since they were stored are deleted.
+    """
+    memo = PlanMemo.objects.filter(kind=kind, fingerprint=fingerprint).first()
+    if memo is None:
+        return None
+
+    list_key, uid_key, model = MEMO_DAYS_KEYS[kind]
+    ttl = timedelta(days=getattr(settings, 'PLAN_MEMO_TTL_DAYS', 30))
+    uids = set(memo.uids)
+    fresh = model.objects.filter(unique_id__in=uids, updated_at__lte=memo.created_at).count()
+    if memo.created_at < timezone.now() - ttl or fresh != len(uids):
+        memo.delete()
+        return None
+
+    PlanMemo.objects.filter(pk=memo.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+
+    return {"days": rebase_days(memo.plan["days"], start_date)}, list(uids)
+
+
+
+
+def store_plan(kind, fingerprint, result, start_date=None):
+    """Store the days of a generated plan (same shape as build_*_plan's result) in date-relative form."""
+    list_key, uid_key, model = MEMO_DAYS_KEYS[kind]
+    days = relative_days(result["days"], start_date)
+    uids = {entry[uid_key] for day in days for entry in day.get(list_key) or [] if entry.get(uid_key)}
+    # Only rows that exist can be checked for changes later
+    uids = set(model.objects.filter(unique_id__in=uids).values_list('unique_id', flat=True))
+
+    PlanMemo.objects.update_or_create(
+        kind=kind,
+        fingerprint=fingerprint,
+        defaults={
+            "plan": {"days": days},
+            "uids": sorted(uids),
+            "hits": 0,
+            "created_at": timezone.now(),
+            "last_used_at": timezone.now(),
+        },
+    )
+
+    # Size-based eviction: keep the most recently used memos of this kind
+    max_entries = getattr(settings, 'PLAN_MEMO_MAX_ENTRIES', 2000)
+    stale = list(PlanMemo.objects.filter(kind=kind).order_by('-last_used_at').values_list('pk', flat=True)[max_entries:])
+    if stale:
+        PlanMemo.objects.filter(pk__in=stale).delete()
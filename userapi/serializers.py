@@ -2,6 +2,7 @@ from rest_framework import serializers
 from accounts.models import Profile
 from meal.models import MealPlan
 from workoutplan.models import WorkoutPlan
+from .models import PlanGenerationJob
 
 
 class ProfileInfoSerializer(serializers.ModelSerializer):
@@ -32,3 +33,11 @@ class UserFullInfoSerializer(serializers.Serializer):
     profile = ProfileInfoSerializer()
     meal_plans = MealPlanInfoSerializer(many=True)
     workout_plans = WorkoutPlanInfoSerializer(many=True)
+
+
+
+
+class PlanGenerationJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlanGenerationJob
+        fields = ['id', 'kind', 'status', 'plan_id', 'engine', 'error', 'created_at', 'started_at', 'finished_at']
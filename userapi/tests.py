@@ -1,3 +1,86 @@
+import uuid
+from datetime import date, timedelta
+from unittest import mock
 from django.test import TestCase
+from rest_framework.test import APIClient
+from accounts.models import Profile, User
+from meal.models import MealPlan, MealEntry
+from meal.services import generate_meal_plan
+from recipe.models import Recipe
+from .jobs import ActivePlanExists, enqueue_plan_job
+from .models import PlanGenerationJob
 
 # Create your tests here.
+
+
+
+
+class PlanConflictTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="u", email="u@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_second_job_of_a_kind_is_refused(self):
+        enqueue_plan_job(self.user, PlanGenerationJob.KIND_MEAL, {})
+        with self.assertRaisesMessage(ActivePlanExists, "already being generated"):
+            enqueue_plan_job(self.user, PlanGenerationJob.KIND_MEAL, {})
+        enqueue_plan_job(self.user, PlanGenerationJob.KIND_WORKOUT, {})
+
+    def test_job_is_refused_with_an_active_plan(self):
+        MealPlan.objects.create(user=self.user, meal_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        with self.assertRaisesMessage(ActivePlanExists, "active meal plan"):
+            enqueue_plan_job(self.user, PlanGenerationJob.KIND_MEAL, {})
+
+    def test_sync_endpoints_refuse_while_a_job_is_queued(self):
+        enqueue_plan_job(self.user, PlanGenerationJob.KIND_MEAL, {})
+        enqueue_plan_job(self.user, PlanGenerationJob.KIND_WORKOUT, {})
+        for url in [
+            "/userapi/meal-plans/generate/",
+            "/userapi/meal-plans/generate/stream/",
+            "/userapi/workout-plans/generate/",
+            "/userapi/workout-plans/generate/stream/",
+        ]:
+            with self.subTest(url=url):
+                response = self.client.post(url, {}, format="json")
+                self.assertEqual(response.status_code, 409)
+                self.assertIn("already being generated", response.data["detail"])
+
+
+
+
+class PlanMemoTests(TestCase):
+    def profile(self, name, fullname, date_of_birth):
+        user = User.objects.create_user(username=name, email=f"{name}@example.com")
+        return Profile.objects.create(
+            user=user, fullname=fullname, date_of_birth=date_of_birth, fitness_goals=["Weight loss"],
+            dietary_preferences="Vegetarian",
+        )
+
+    def entries(self, meal_plan):
+        return list(MealEntry.objects.filter(daily_meal__meal_plan=meal_plan).values_list("recipe_id", "grams"))
+
+    def test_memo_shares_meals_but_not_the_plan_name(self):
+        recipe = Recipe.objects.create(
+            unique_id=str(uuid.uuid4()), recipe_name="Dal", recipe_type="Veg", for_time="Lunch", category="Main",
+            calories=400, carbs=40, protein=20, fat=10, making_time=timedelta(minutes=10), time=timedelta(minutes=10),
+            ingredients="lentils", instructions="Cook.",
+        )
+        alice = self.profile("alice", "Alice Smith", date(1990, 5, 1))
+        bob = self.profile("bob", "Bob Jones", date(1960, 1, 1))
+        generated = {"meal_plan_name": "Alice's 35th Birthday Plan", "tags": "alice", "days": [{
+            "date": date.today().isoformat(),
+            "meals": [{"meal_type": "Lunch", "recipe_uid": recipe.unique_id, "eating_time": "13:00", "grams": "300"}],
+        }]}
+
+        with mock.patch("meal.services.build_meal_plan", return_value=generated) as build:
+            alice_plan, engine = generate_meal_plan(alice.user, alice, engine="llm", days=1)
+            self.assertEqual(engine, "llm")
+            bob_plan, engine = generate_meal_plan(bob.user, bob, engine="llm", days=1)
+        self.assertEqual(engine, "memo")
+        self.assertEqual(build.call_count, 1)
+
+        self.assertEqual(alice_plan.meal_plan_name, "Alice's 35th Birthday Plan")
+        self.assertNotIn("Alice", bob_plan.meal_plan_name)
+        self.assertNotIn("alice", bob_plan.tags)
+        self.assertEqual(self.entries(bob_plan), self.entries(alice_plan))
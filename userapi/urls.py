@@ -1,15 +1,16 @@
 
 from django.urls import path,include
 from rest_framework.routers import DefaultRouter
-from meal.views import GenerateMealPlanView
-from workoutplan.views import GenerateWorkoutPlanView,ActiveWorkoutPlanView,CompleteTodayWorkoutView,DailyWorkoutDetailsView,SpanishDailyWorkoutDetailsView,TodayWorkoutView,SpanishWorkoutEntryListView,UpdateTodayWorkoutEntryAPIView
-from .views import UserFullInfoAPIView,UserSpanishFullInfoAPIView
+from meal.views import GenerateMealPlanView,GenerateMealPlanStreamView
+from workoutplan.views import GenerateWorkoutPlanView,GenerateWorkoutPlanStreamView,ActiveWorkoutPlanView,CompleteTodayWorkoutView,DailyWorkoutDetailsView,SpanishDailyWorkoutDetailsView,TodayWorkoutView,SpanishWorkoutEntryListView,UpdateTodayWorkoutEntryAPIView
+from .views import UserFullInfoAPIView,UserSpanishFullInfoAPIView,GenerateMealPlanJobView,GenerateWorkoutPlanJobView,PlanGenerationJobStatusView
 from meal.views import DaywiseMealInfoAPIView,SpanishDaywiseMealInfoAPIView,DailyMealDetailAPIView,SpanishDailyMealDetailAPIView,TodaysMealAPIView,SpanishTodaysMealAPIView,UpdateMealCompletionStatusAPIView
 from recipe.views import SingleRecipeDetailAPIView,SpanishSingleRecipeDetailAPIView,RecipeListView,SpanishRecipeListView
 from workout.views import GetEnglishWorkoutByUniqueIdView, GetSpanishWorkoutByUniqueIdView,WorkoutListAPIView,SpanishWorkoutListAPIView
 from home.views import TodayDailyDetailsAPIView,SpanishTodayDailyDetailsAPIView
 from accounts.views import DeleteUserView
 from completeinfo.views import FitnessProfileCreateView,UserAchievementDetailView,Aifeedback
+from plan_templates.views import OnboardingPlanView
 
 router = DefaultRouter()
 
@@ -17,6 +18,12 @@ router = DefaultRouter()
 urlpatterns = [
     path("meal-plans/generate/", GenerateMealPlanView.as_view(), name="generate-meal-plan"),
     path("workout-plans/generate/", GenerateWorkoutPlanView.as_view(), name="generate-meal-plan"),
+    path("meal-plans/generate/async/", GenerateMealPlanJobView.as_view(), name="generate-meal-plan-async"),
+    path("workout-plans/generate/async/", GenerateWorkoutPlanJobView.as_view(), name="generate-workout-plan-async"),
+    path("meal-plans/generate/stream/", GenerateMealPlanStreamView.as_view(), name="generate-meal-plan-stream"),
+    path("workout-plans/generate/stream/", GenerateWorkoutPlanStreamView.as_view(), name="generate-workout-plan-stream"),
+    path("onboarding/plans/", OnboardingPlanView.as_view(), name="onboarding-plans"),
+    path("plan-jobs/<int:job_id>/", PlanGenerationJobStatusView.as_view(), name="plan-job-status"),
     path('user/info/', UserFullInfoAPIView.as_view(), name='user-full-info'),
     path('user/info/spanish/', UserSpanishFullInfoAPIView.as_view(), name='user-full-info-spanish'),
     path('meal-plan/daywise/<int:plan_id>/', DaywiseMealInfoAPIView.as_view(), name='daywise-meal-info'),
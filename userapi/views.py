@@ -4,8 +4,12 @@ from rest_framework.permissions import IsAuthenticated
 from accounts.models import Profile
 from meal.models import MealPlan
 from workoutplan.models import WorkoutPlan
-from .serializers import ProfileInfoSerializer, MealPlanInfoSerializer, WorkoutPlanInfoSerializer
+from .serializers import ProfileInfoSerializer, MealPlanInfoSerializer, WorkoutPlanInfoSerializer, PlanGenerationJobSerializer
 from .services import translate_to_spanish
+from .models import PlanGenerationJob
+from .jobs import enqueue_plan_job, ActivePlanExists
+from workoutplan.serializers import TrainingDataSerializer
+from rest_framework import status
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from subscription.decorators import subscription_required
@@ -142,3 +146,129 @@ class UserSpanishFullInfoAPIView(APIView):
 
 
 
+JOB_ACCEPTED_EXAMPLE = {
+    "application/json": {
+        "detail": "Plan generation started.",
+        "job_id": 12,
+        "status": "queued"
+    }
+}
+
+
+
+
+def _accepted(job):
+    return Response({
+        "detail": "Plan generation started.",
+        "job_id": job.id,
+        "status": job.status
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+
+
+class GenerateMealPlanJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Start 15-day meal plan generation (async)",
+        operation_description="""
+        Queues meal plan generation and returns immediately with a job id.
+        Poll `/userapi/plan-jobs/{job_id}/` until `status` is `succeeded` (then use `plan_id`) or `failed`.
+
+        Optionally pass `engine`: `llm` (OpenAI) or `local`.
+        """,
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=[],
+            properties={
+                "engine": openapi.Schema(type=openapi.TYPE_STRING, enum=["llm", "local"], description="Generation engine (optional)")
+            },
+        ),
+        tags=["AI Meal Plan"],
+        responses={
+            202: openapi.Response(description="Job queued", examples=JOB_ACCEPTED_EXAMPLE),
+            400: openapi.Response(description="Unknown engine"),
+            404: openapi.Response(description="User profile not found"),
+            409: openapi.Response(description="Active meal plan or generation already in progress"),
+        }
+    )
+    def post(self, request):
+        user = request.user
+
+        # 1. Ensure user has profile
+        if not Profile.objects.filter(user=user).exists():
+            return Response({"detail": "Profile not found."}, status=404)
+
+        engine = request.data.get("engine")
+        if engine not in (None, "", "llm", "local"):
+            return Response({"detail": "engine must be 'llm' or 'local'."}, status=400)
+
+        # 2. Queue the job (409 if the user already has an active plan or a running job)
+        try:
+            job = enqueue_plan_job(user, PlanGenerationJob.KIND_MEAL, {"engine": engine or None})
+        except ActivePlanExists as e:
+            return Response({"detail": str(e)}, status=409)
+
+        return _accepted(job)
+
+
+
+
+class GenerateWorkoutPlanJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=TrainingDataSerializer,
+        operation_summary="Start 15-day workout plan generation (async)",
+        operation_description="""
+        Validates the training data, queues workout plan generation and returns immediately with a job id.
+        Poll `/userapi/plan-jobs/{job_id}/` until `status` is `succeeded` (then use `plan_id`) or `failed`.
+        """,
+        tags=["AI Workout Plan"],
+        responses={
+            202: openapi.Response(description="Job queued", examples=JOB_ACCEPTED_EXAMPLE),
+            400: openapi.Response(description="Invalid training data"),
+            404: openapi.Response(description="User profile not found"),
+            409: openapi.Response(description="Active workout plan or generation already in progress"),
+        }
+    )
+    def post(self, request):
+        user = request.user
+
+        # 1. Ensure user has profile
+        if not Profile.objects.filter(user=user).exists():
+            return Response({"detail": "Profile not found."}, status=404)
+
+        # 2. Validate training input (stored with the job and used by the worker)
+        serializer = TrainingDataSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # 3. Queue the job (409 if the user already has an active plan or a running job)
+        try:
+            job = enqueue_plan_job(user, PlanGenerationJob.KIND_WORKOUT, dict(serializer.validated_data))
+        except ActivePlanExists as e:
+            return Response({"detail": str(e)}, status=409)
+
+        return _accepted(job)
+
+
+
+
+class PlanGenerationJobStatusView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_summary="Plan generation job status",
+        operation_description="Returns the status of a meal/workout plan generation job owned by the authenticated user.",
+        tags=["AI Plan Jobs"],
+        responses={
+            200: PlanGenerationJobSerializer,
+            404: openapi.Response(description="Job not found"),
+        }
+    )
+    def get(self, request, job_id):
+        job = PlanGenerationJob.objects.filter(id=job_id, user=request.user).first()
+        if not job:
+            return Response({"detail": "Job not found."}, status=404)
+        return Response(PlanGenerationJobSerializer(job).data)
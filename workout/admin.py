@@ -14,11 +14,12 @@ class WorkoutAdmin(admin.ModelAdmin):
         'time_needed',
         'equipment_needed',
         'tag',
+        'translation_status',
         'created_at',
         'updated_at',
     )
     search_fields = ('workout_name', 'workout_type', 'for_body_part', 'tag')
-    list_filter = ('workout_type', 'for_body_part', 'tag')
+    list_filter = ('workout_type', 'for_body_part', 'tag', 'translation_status')
     readonly_fields = ('created_at', 'updated_at')
 
 
@@ -36,9 +37,10 @@ class WorkoutSpanishAdmin(admin.ModelAdmin):
         'time_needed',
         'equipment_needed',
         'tag',
+        'translation_status',
         'created_at',
         'updated_at',
     )
     search_fields = ('workout_name', 'workout_type', 'for_body_part', 'tag')
-    list_filter = ('workout_type', 'for_body_part', 'tag')
+    list_filter = ('workout_type', 'for_body_part', 'tag', 'translation_status')
     readonly_fields = ('created_at', 'updated_at')
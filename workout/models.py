@@ -1,10 +1,11 @@
 from django.db import models
+from recipe.models import TwinTranslationStatus
 
 # Create your models here.
 
 
 
-class Workout(models.Model):
+class Workout(TwinTranslationStatus):
     unique_id = models.CharField(max_length=100, unique=True,null=True, blank=True,help_text="same WorkoutSpanish data")
     workout_name = models.CharField(max_length=255)
     time_needed = models.DurationField(help_text="Format: hh:mm:ss")
@@ -35,7 +36,7 @@ class Workout(models.Model):
 
 
 
-class WorkoutSpanish(models.Model):
+class WorkoutSpanish(TwinTranslationStatus):
     unique_id = models.CharField(max_length=100, unique=True, null=True, blank=True,help_text="Same as related Workout object")
     workout_name = models.CharField(max_length=255)
     time_needed = models.DurationField(help_text="Formato: hh:mm:ss")
@@ -46,6 +47,7 @@ class WorkoutSpanish(models.Model):
     tag = models.CharField(max_length=200, blank=True)               # Ejemplo: Quema Grasa, Principiante
     image = models.ImageField(upload_to='media/workouts/', null=True, blank=True)
     benefits = models.TextField(help_text="Lista de beneficios separados por comas o líneas.")
+    source_hash = models.CharField(max_length=64, blank=True, default='', help_text="Hash of the English row this twin was last synced from (see recipe.twins)")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
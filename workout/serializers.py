@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from recipe.serializers import TRANSLATION_STATUS_FIELDS
 from .models import Workout,WorkoutSpanish
 
 
@@ -33,3 +34,19 @@ class WorkoutSpanishSerializer(serializers.ModelSerializer):
         fields = ['id','unique_id','workout_name','time_needed','for_body_part','workout_type','calories_burn','equipment_needed','tag','image','benefits','created_at','updated_at',]
         read_only_fields = ['id', 'created_at', 'updated_at']
         extra_kwargs = {'unique_id': {'required': False}}
+
+
+
+
+class WorkoutAdminSerializer(WorkoutSerializer):
+    class Meta(WorkoutSerializer.Meta):
+        fields = WorkoutSerializer.Meta.fields + TRANSLATION_STATUS_FIELDS
+        read_only_fields = WorkoutSerializer.Meta.read_only_fields + TRANSLATION_STATUS_FIELDS
+
+
+
+
+class WorkoutSpanishAdminSerializer(WorkoutSpanishSerializer):
+    class Meta(WorkoutSpanishSerializer.Meta):
+        fields = WorkoutSpanishSerializer.Meta.fields + TRANSLATION_STATUS_FIELDS
+        read_only_fields = WorkoutSpanishSerializer.Meta.read_only_fields + TRANSLATION_STATUS_FIELDS
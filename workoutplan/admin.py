@@ -14,7 +14,7 @@ class WorkoutPlanAdmin(admin.ModelAdmin):
 
 @admin.register(DailyWorkout)
 class DailyWorkoutAdmin(admin.ModelAdmin):
-    list_display = ('id', 'workout_plan', 'date', 'title', 'title_spanish', 'completed')
+    list_display = ('id', 'workout_plan', 'date', 'title', 'title_spanish', 'completed', 'completed_count', 'total_count')
     list_filter = ('completed', 'date')
     search_fields = ('title', 'title_spanish', 'tags', 'tags_spanish', 'workout_plan__workout_plan_name')
 
@@ -0,0 +1,57 @@
+# Muscle-focus fields of TrainingDataSerializer and the keywords matched against Workout.for_body_part,
+# as whole words or their plural ("arm" finds "Arms", not "Forearm")
+MUSCLE_GROUP_KEYWORDS = {
+    "chest":      ["chest", "pec", "pectoral"],
+    "back":       ["back", "lat", "upper back"],
+    "shoulders":  ["shoulder", "delt", "deltoid"],
+    "biceps":     ["bicep", "arm"],
+    "triceps":    ["tricep", "arm"],
+    "quadriceps": ["quad", "quadricep", "leg", "thigh"],
+    "hamstrings": ["hamstring", "leg"],
+    "glutes":     ["glute", "hip"],
+    "calves":     ["calf", "calves", "leg"],
+    "adductors":  ["adductor", "inner thigh"],
+    "lower_back": ["lower back", "core"],
+}
+FULL_BODY_KEYWORDS = ["full body", "total body", "whole body"]
+
+
+
+
+# Day splits the local scheduler rotates through: (key, title, Spanish title, muscle groups)
+WORKOUT_SPLITS = [
+    ("push", "Push Day", "Día de empuje", ["chest", "shoulders", "triceps"]),
+    ("pull", "Pull Day", "Día de tirón", ["back", "biceps", "lower_back"]),
+    ("legs", "Leg Day", "Día de piernas", ["quadriceps", "hamstrings", "glutes", "calves", "adductors"]),
+]
+
+MUSCLE_GROUP_SPANISH = {
+    "chest": "pecho",
+    "back": "espalda",
+    "shoulders": "hombros",
+    "biceps": "bíceps",
+    "triceps": "tríceps",
+    "quadriceps": "cuádriceps",
+    "hamstrings": "isquiotibiales",
+    "glutes": "glúteos",
+    "calves": "pantorrillas",
+    "adductors": "aductores",
+    "lower_back": "espalda baja",
+}
+
+
+
+
+# Workout.equipment_needed values that need no equipment
+NO_EQUIPMENT_KEYWORDS = ["", "none", "no equipment", "bodyweight", "body weight", "mat"]
+
+
+
+
+# (set_of, reps) per fitness level
+SETS_REPS_BY_LEVEL = {
+    "Beginners": (2, 10),
+    "Basic": (3, 10),
+    "Intermediate": (3, 12),
+    "High": (4, 12),
+}
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workoutplan', '0004_dailyworkout_tags_spanish_dailyworkout_title_spanish'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyworkout',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of completed workout entries'),
+        ),
+        migrations.AddField(
+            model_name='dailyworkout',
+            name='total_count',
+            field=models.PositiveIntegerField(default=0, help_text='Number of workout entries'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
 from accounts.models import User
 from workout.models import Workout
 from datetime import date
@@ -36,6 +37,8 @@ class DailyWorkout(models.Model):
     tags = models.CharField(max_length=255, blank=True, help_text="Comma-separated tags")
     tags_spanish = models.CharField(max_length=255, blank=True, help_text="Etiquetas separadas por comas en español")
     completed = models.BooleanField(default=False, help_text="Mark if the workout is completed")
+    completed_count = models.PositiveIntegerField(default=0, help_text="Number of completed workout entries")
+    total_count = models.PositiveIntegerField(default=0, help_text="Number of workout entries")
 
     def __str__(self):
         return f"{self.title} on {self.date} for {self.workout_plan.user.email}"
@@ -55,17 +58,45 @@ class WorkoutEntry(models.Model):
         return f"{workout_name} on {self.daily_workout.date} - Sets: {self.set_of} - Completed: {self.completed}" 
 
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-
-        all_completed = self.daily_workout.workouts.filter(completed=False).count() == 0
-        if all_completed and not self.daily_workout.completed:
-            self.daily_workout.completed = True
-            self.daily_workout.save()
-        elif not all_completed and self.daily_workout.completed:
-            self.daily_workout.completed = False
-            self.daily_workout.save()
-
+    def _update_daily_counters(self, total_delta, completed_delta):
+        """
+        Apply the counter change to the parent DailyWorkout in a single UPDATE and keep
+        `completed` in sync (all entries done). Both expressions use the row's old values.
+        """
+        if not total_delta and not completed_delta:
+            return
+        all_completed = ExpressionWrapper(
+            Q(completed_count=F('total_count') + (total_delta - completed_delta)) & Q(total_count__gt=-total_delta),
+            output_field=BooleanField(),
+        )
+        DailyWorkout.objects.filter(pk=self.daily_workout_id).update(
+            total_count=F('total_count') + total_delta,
+            completed_count=F('completed_count') + completed_delta,
+            completed=all_completed,
+        )
 
-
-  
\ No newline at end of file
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        tracks_completed = update_fields is None or 'completed' in update_fields
+
+        with transaction.atomic():
+            flipped = 0
+            if not adding and tracks_completed:
+                # Only the request whose UPDATE actually flips `completed` moves the counter
+                flipped = WorkoutEntry.objects.filter(pk=self.pk, completed=not self.completed).update(completed=self.completed)
+
+            super().save(*args, **kwargs)
+
+            if adding:
+                self._update_daily_counters(1, int(self.completed))
+            elif flipped:
+                self._update_daily_counters(0, 1 if self.completed else -1)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            completed = WorkoutEntry.objects.select_for_update().filter(pk=self.pk).values_list('completed', flat=True).first()
+            result = super().delete(*args, **kwargs)
+            if result[1].get(self._meta.label):
+                self._update_daily_counters(-1, -int(bool(completed)))
+        return result
@@ -0,0 +1,280 @@
+import re
+from datetime import date, timedelta
+import numpy as np
+from .constants import (
+    MUSCLE_GROUP_KEYWORDS, FULL_BODY_KEYWORDS, WORKOUT_SPLITS, MUSCLE_GROUP_SPANISH,
+    NO_EQUIPMENT_KEYWORDS, SETS_REPS_BY_LEVEL,
+)
+
+
+MUSCLE_GROUPS = list(MUSCLE_GROUP_KEYWORDS)
+DURATION_BUCKET_MINUTES = 5   # knapsack resolution
+MIN_WORKOUTS_PER_DAY = 3
+MAX_WORKOUTS_PER_DAY = 6
+CANDIDATE_POOL = 40           # best-valued workouts considered by the knapsack each day
+FOCUS_WEIGHT = 2.0            # muscle listed in the training focus fields
+SPLIT_WEIGHT = 1.0            # other muscle of the day's split
+FULL_BODY_WEIGHT = 0.5        # full-body workouts count as half a match for every muscle
+BASE_VALUE = 0.1              # every workout is worth something, so spare time gets filled
+RECENT_DAYS = 2               # a workout used within this many days is penalized...
+RECENT_PENALTY = 1.5          # ...by this much
+
+
+
+
+def _keywords_regex(keywords):
+    """Any of `keywords` as a whole word or its plural."""
+    return re.compile(r"\b(" + "|".join(re.escape(keyword) for keyword in keywords) + r")(s|es)?\b", re.IGNORECASE)
+
+
+MUSCLE_GROUP_REGEXES = {muscle: _keywords_regex(keywords) for muscle, keywords in MUSCLE_GROUP_KEYWORDS.items()}
+FULL_BODY_REGEX = _keywords_regex(FULL_BODY_KEYWORDS)
+
+
+
+
+def muscle_groups_of(body_part):
+    """Muscle groups a Workout.for_body_part names; "full body" names none of them."""
+    return {muscle for muscle, regex in MUSCLE_GROUP_REGEXES.items() if regex.search(body_part or '')}
+
+
+
+
+def _minutes(duration):
+    return duration.total_seconds() / 60 if duration else 0.0
+
+
+
+
+def _equipment_items(text):
+    return [part.strip().lower() for part in re.split(r",|/|\band\b|\+", text or "")]
+
+
+
+
+def available_equipment(profile):
+    """Lower-cased equipment from Profile.at_home and at_gym, or None when the profile lists none."""
+    equipment = [e.lower() for e in list(profile.at_home or []) + list(profile.at_gym or [])]
+    return set(equipment) or None
+
+
+
+
+def has_equipment(equipment_needed, equipment):
+    """True when every item of Workout.equipment_needed is bodyweight or in `equipment` (None = no filter)."""
+    if equipment is None:
+        return True
+    for item in _equipment_items(equipment_needed):
+        if item in NO_EQUIPMENT_KEYWORDS:
+            continue
+        if not any(item.rstrip('s') in owned or owned.rstrip('s') in item for owned in equipment):
+            return False
+    return True
+
+
+
+
+def muscle_focus(training_data):
+    """Muscle groups the user asked to focus on (non-empty TrainingDataSerializer focus fields)."""
+    return [muscle for muscle in MUSCLE_GROUPS if training_data.get(muscle)]
+
+
+
+
+def pack_workouts(values, weights, capacity, min_items=MIN_WORKOUTS_PER_DAY, max_items=MAX_WORKOUTS_PER_DAY):
+    """
+    0/1 knapsack with a cardinality constraint: pick between min_items and max_items items of
+    total weight <= capacity with the highest total value. Rows are vectorized over capacity.
+    Relaxes min_items when nothing fits. Returns the selected indices.
+    """
+    n = len(values)
+    max_items = min(max_items, n)
+    if n == 0 or capacity <= 0 or max_items <= 0:
+        return []
+
+    # dp[k, w]: best value with exactly k items and total weight <= w
+    dp = np.full((max_items + 1, capacity + 1), -np.inf)
+    dp[0, :] = 0.0
+    take = np.zeros((n, max_items + 1, capacity + 1), dtype=bool)
+    for i in range(n):
+        w = int(weights[i])
+        if w > capacity:
+            continue
+        for k in range(max_items, 0, -1):
+            candidate = dp[k - 1, :capacity + 1 - w] + values[i]
+            better = candidate > dp[k, w:]
+            dp[k, w:] = np.where(better, candidate, dp[k, w:])
+            take[i, k, w:] = better
+
+    feasible = [k for k in range(1, max_items + 1) if np.isfinite(dp[k, capacity])]
+    if not feasible:
+        return []
+    preferred = [k for k in feasible if k >= min_items] or feasible
+    k = max(preferred, key=lambda count: dp[count, capacity])
+
+    selected, w = [], capacity
+    for i in range(n - 1, -1, -1):
+        if k and take[i, k, w]:
+            selected.append(i)
+            w -= int(weights[i])
+            k -= 1
+    return selected[::-1]
+
+
+
+
+class WorkoutScheduler:
+    """
+    Deterministic workout plan builder. Workouts are filtered by the profile's equipment,
+    days rotate through push/pull/legs splits (only the splits with focused muscles, plus one
+    recovery split when the focus is narrow), and each day is packed against the
+    daily_duration_minutes budget with a knapsack over 5-minute buckets.
+    """
+
+    def __init__(self, profile, training_data, workouts):
+        equipment = available_equipment(profile)
+        self.workouts = [w for w in workouts if w.unique_id and has_equipment(w.equipment_needed, equipment)]
+        self.index = {w.unique_id: i for i, w in enumerate(self.workouts)}
+
+        minutes = np.array([_minutes(w.time_needed) for w in self.workouts])
+        self.weights = np.maximum(1, np.ceil(minutes / DURATION_BUCKET_MINUTES)).astype(int)
+        self.capacity = int(training_data.get("daily_duration_minutes") or 0) // DURATION_BUCKET_MINUTES
+
+        parts = [w.for_body_part or '' for w in self.workouts]
+        self.matches = np.array([
+            [muscle in groups for muscle in MUSCLE_GROUPS] for groups in map(muscle_groups_of, parts)
+        ], dtype=float).reshape(len(parts), len(MUSCLE_GROUPS))
+        full_body = np.array([bool(FULL_BODY_REGEX.search(part)) for part in parts], dtype=bool)
+        self.matches[full_body] = np.maximum(self.matches[full_body], FULL_BODY_WEIGHT)
+
+        self.focus = muscle_focus(training_data)
+        self.rotation = [split for split in WORKOUT_SPLITS if set(split[3]) & set(self.focus)] or list(WORKOUT_SPLITS)
+        if len(self.rotation) == 1:
+            self.rotation.append(next(split for split in WORKOUT_SPLITS if split not in self.rotation))
+
+        level = training_data.get("fitness_level") or profile.fitness_level
+        self.set_of, self.reps = SETS_REPS_BY_LEVEL.get(level, (3, 12))
+        self.last_used = np.full(len(self.workouts), -np.inf)
+
+    def split_for(self, day):
+        return self.rotation[day % len(self.rotation)]
+
+    def values(self, day, split):
+        """Value of every workout on `day` (vector): split/focus relevance minus a recent-use penalty."""
+        weights = np.array([
+            (FOCUS_WEIGHT if muscle in self.focus else SPLIT_WEIGHT) if muscle in split[3] else 0.0
+            for muscle in MUSCLE_GROUPS
+        ])
+        values = self.matches @ weights + BASE_VALUE
+        return values - RECENT_PENALTY * (day - self.last_used <= RECENT_DAYS)
+
+    def _pack(self, values, capacity, exclude=(), min_items=MIN_WORKOUTS_PER_DAY, max_items=MAX_WORKOUTS_PER_DAY):
+        values = values.copy()
+        values[list(exclude)] = -np.inf
+        pool = [i for i in np.argsort(-values, kind='stable')[:CANDIDATE_POOL] if np.isfinite(values[i])]
+        picked = pack_workouts(values[pool], self.weights[pool], capacity, min_items, max_items)
+        return [int(pool[i]) for i in picked]
+
+    def _day(self, day, plan_date, split, indices, sets_reps=None):
+        self.last_used[indices] = day
+        sets_reps = sets_reps or {}
+        return {
+            "date": plan_date.isoformat(),
+            "title": split[1],
+            "title_spanish": split[2],
+            "tags": ",".join(m.replace("_", " ") for m in split[3]),
+            "tags_spanish": ",".join(MUSCLE_GROUP_SPANISH[m] for m in split[3]),
+            "workouts": [{
+                "workout_uid": self.workouts[i].unique_id,
+                "set_of": sets_reps.get(i, (self.set_of, self.reps))[0],
+                "reps": sets_reps.get(i, (self.set_of, self.reps))[1],
+            } for i in indices],
+        }
+
+    def schedule_day(self, day, plan_date):
+        split = self.split_for(day)
+        return self._day(day, plan_date, split, self._pack(self.values(day, split), self.capacity))
+
+    def build(self, days=15, start_date=None):
+        """Plan dict in the same shape as build_workout_plan's output."""
+        start_date = start_date or date.today()
+        plan_days = [self.schedule_day(day, start_date + timedelta(days=day)) for day in range(days)]
+        return dict(self.title(days), days=plan_days)
+
+    def title(self, days):
+        """Plan name and tags, from the split rotation and muscle focus only."""
+        names = "/".join(split[1].split()[0] for split in self.rotation)
+        return {
+            "workout_plan_name": f"{days}-Day {names} Plan",
+            "tags": ",".join(m.replace("_", " ") for m in self.focus) or "strength,balanced",
+        }
+
+    def repair_day(self, day, plan_date, llm_day):
+        """
+        Make one LLM day valid: drop unknown, duplicate and unavailable workouts, trim to the
+        duration budget and MAX_WORKOUTS_PER_DAY (least relevant first), and top up to
+        MIN_WORKOUTS_PER_DAY from the scheduler. Keeps the LLM's titles, tags, sets and reps.
+        """
+        split = self.split_for(day)
+        values = self.values(day, split)
+
+        kept, sets_reps = [], {}
+        for entry in llm_day.get("workouts") or []:
+            i = self.index.get(entry.get("workout_uid"))
+            if i is None or i in sets_reps:
+                continue
+            kept.append(i)
+            sets_reps[i] = (entry.get("set_of") or self.set_of, entry.get("reps") or self.reps)
+
+        kept.sort(key=lambda i: -values[i])
+        while kept and (len(kept) > MAX_WORKOUTS_PER_DAY or self.weights[kept].sum() > self.capacity):
+            kept.pop()
+
+        missing = MIN_WORKOUTS_PER_DAY - len(kept)
+        if missing > 0:
+            spare = self.capacity - int(self.weights[kept].sum())
+            kept += self._pack(values, spare, exclude=kept, min_items=missing, max_items=missing)
+
+        repaired = self._day(day, plan_date, split, kept, sets_reps)
+        for field in ("title", "title_spanish", "tags", "tags_spanish"):
+            if llm_day.get(field):
+                repaired[field] = llm_day[field]
+        return repaired
+
+    def repair(self, result, days=15, start_date=None):
+        """
+        Post-validation pass over an LLM plan: one day per expected date (missing dates are
+        scheduled locally, unexpected ones dropped) and every day repaired with repair_day.
+        """
+        start_date = start_date or date.today()
+        llm_days = {str(d.get("date")): d for d in result.get("days") or [] if isinstance(d, dict)}
+        plan_days = []
+        for day in range(days):
+            plan_date = start_date + timedelta(days=day)
+            llm_day = llm_days.get(plan_date.isoformat())
+            if llm_day is None:
+                plan_days.append(self.schedule_day(day, plan_date))
+            else:
+                plan_days.append(self.repair_day(day, plan_date, llm_day))
+        return dict(result, days=plan_days)
+
+
+
+
+def build_local_workout_plan(profile, training_data, workouts, days=15):
+    """Build a workout plan without the LLM (see WorkoutScheduler)."""
+    return WorkoutScheduler(profile, training_data, workouts).build(days)
+
+
+
+
+def local_plan_title(profile, training_data, workouts, days=15):
+    """{"workout_plan_name", "tags"} the local engine would give this plan."""
+    return WorkoutScheduler(profile, training_data, workouts).title(days)
+
+
+
+
+def repair_workout_plan(result, profile, training_data, workouts, days=15):
+    """Enforce duration budget, equipment and 3–6 workouts per day on an LLM-generated plan."""
+    return WorkoutScheduler(profile, training_data, workouts).repair(result, days)
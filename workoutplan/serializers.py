@@ -45,7 +45,9 @@ class TrainingDataSerializer(serializers.Serializer):
     # Daily workout duration (new field)
     daily_duration_minutes = serializers.IntegerField(
         required=True,
-        help_text="User's preferred workout time per day in minutes"
+        min_value=10,   # the scheduler packs workouts in 5-minute buckets; less leaves days empty
+        max_value=240,
+        help_text="User's preferred workout time per day in minutes (10-240)"
     )
 
     # Muscle‑group fields (all accept comma‑separated input)
@@ -61,6 +63,40 @@ class TrainingDataSerializer(serializers.Serializer):
     adductors    = DelimitedListField(required=False)  
     lower_back   = DelimitedListField(required=False)
 
+    # Plan generation engine: "llm" (OpenAI) or "local" (workoutplan.scheduler)
+    engine = serializers.ChoiceField(choices=["llm", "local"], required=False)
+
+
+
+
+class WorkoutEntryWriteSerializer(serializers.Serializer):
+    workout_uid = serializers.CharField(allow_blank=True, allow_null=True, required=False)
+    set_of      = serializers.IntegerField(min_value=1, required=False, default=1)
+    reps        = serializers.IntegerField(min_value=1, required=False, default=10)
+
+
+
+
+class DailyWorkoutWriteSerializer(serializers.Serializer):
+    date          = serializers.DateField()
+    title         = serializers.CharField(max_length=255, allow_blank=True, required=False)
+    title_spanish = serializers.CharField(max_length=255, allow_blank=True, required=False)
+    tags          = serializers.CharField(max_length=255, allow_blank=True, required=False)
+    tags_spanish  = serializers.CharField(max_length=255, allow_blank=True, required=False)
+    workouts      = WorkoutEntryWriteSerializer(many=True, required=False, default=list)
+
+
+
+
+class WorkoutPlanWriteSerializer(serializers.Serializer):
+    """
+    Validates a generated workout plan payload ({workout_plan_name, tags, days}) before
+    anything is written to the database.
+    """
+    workout_plan_name = serializers.CharField(max_length=255, required=False, default='15-Day AI Plan')
+    tags              = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+    days              = DailyWorkoutWriteSerializer(many=True)
+
 
 
 
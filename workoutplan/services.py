@@ -3,30 +3,52 @@ from datetime import date, timedelta
 
 import openai
 from django.conf import settings
+from django.db import transaction
 from accounts.constants import FITNESS_GOALS, LIFESTYLE_HABITS
 from .utils import get_display_label, get_display_list   # same helpers you used before
+from .models import WorkoutPlan, DailyWorkout, WorkoutEntry
+from .serializers import WorkoutPlanWriteSerializer, DailyWorkoutWriteSerializer
+from .scheduler import WorkoutScheduler, build_local_workout_plan, local_plan_title, repair_workout_plan
+from workout.models import Workout
+from Fitness.prompt_encoding import DELIMITER, encode_table, resolve_aliases, truncate_text
+from Fitness.plan_chunks import chunk_dates, rotation_hints, run_chunks, merge_chunk_days, first_value
+from Fitness.json_stream import StreamingArrayParser, stream_completion
+from userapi import plan_memo
+from AiChat.context import invalidate_chat_context
 
 openai.api_key = settings.OPENAI_API_KEY
 
 
+WORKOUT_BENEFITS_LIMIT = 60
+WORKOUT_COLUMNS = [
+    ("name", "name"), ("type", "type"), ("target", "target"), ("min", "minutes"),
+    ("kcal", "calories"), ("equipment", "equipment"), ("tag", "tag"), ("benefits", "benefits"),
+]
+WORKOUT_PLAN_SYSTEM_PROMPT = "You are a helpful workout‑plan assistant."
 
 
-def build_workout_plan(profile, training_data, workouts_qs, days=15):
+
+
+def workout_plan_prompt(profile, training_data, workouts):
+    """
+    Prompt builder for a workout plan. Returns (prompt_for, aliases) where
+    prompt_for(dates, favoured=()) renders the prompt for a list of ISO dates and
+    aliases maps alias -> workout unique_id.
+    """
     daily_duration_limit = training_data.get("daily_duration_minutes")
-    from datetime import date, timedelta
-    import json
 
     workouts = [{
         "uid":  w.unique_id,
         "name": w.workout_name,
         "type": w.workout_type,
         "target": w.for_body_part,
-        "duration": str(w.time_needed),
+        "minutes": round(w.time_needed.total_seconds() / 60, 1),
         "calories": float(w.calories_burn),
         "equipment": w.equipment_needed,
         "tag": w.tag,
-        "benefits": w.benefits,
-    } for w in workouts_qs]
+        "benefits": truncate_text(w.benefits, WORKOUT_BENEFITS_LIMIT),
+    } for w in workouts[:200]]
+    workout_table, aliases = encode_table(workouts, WORKOUT_COLUMNS, prefix='w')
 
     fitness_goals = get_display_list(profile.fitness_goals, FITNESS_GOALS)
     readable_lifestyle = get_display_label(profile.lifestyle_habits, LIFESTYLE_HABITS)
@@ -51,27 +73,30 @@ def build_workout_plan(profile, training_data, workouts_qs, days=15):
                              "quadriceps", "hamstrings", "glutes",
                              "calves", "adductors", "lower_back"] and v}
 
-    start_date = date.today()
-    date_list = [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
-
     workout_json = ',\n        '.join([
-        '{"set_of": 3, "reps": 12, "workout_uid": "abc123"}'
+        '{"set_of": 3, "reps": 12, "workout_uid": "w1"}'
     ])
 
-    prompt = f"""
+    def prompt_for(chunk, favoured=()):
+        chunk_days = len(chunk)
+        rotation = (
+            f"\nFavour these workouts where they fit (other parts of the plan favour the rest): {', '.join(favoured)}\n"
+            if favoured else ""
+        )
+        return f"""
 You are a certified strength & conditioning coach.
 
 The user’s primary fitness goals are: {", ".join(fitness_goals)}.
 They train in a style described as: {training_data.get("train")}.
 Injuries or discomfort to avoid: {training_data.get("injuries_discomfort") or "none"}.
-Muscle‑group focus (1 means high priority): {json.dumps(muscle_focus, indent=2)}.
+Muscle‑group focus (1 means high priority): {json.dumps(muscle_focus, separators=(",", ":"))}.
 
-Use these exact {days} dates for the workout plan:
-{json.dumps(date_list, indent=2)}
+Use these exact {chunk_days} dates for the workout plan:
+{json.dumps(chunk, separators=(",", ":"))}
 
-Generate a {days}-day workout plan in JSON format. Each day should include:
+Generate a {chunk_days}-day workout plan in JSON format. Each day should include:
 
-Generate a {days}-day workout plan in JSON format. Each day should include:
+Generate a {chunk_days}-day workout plan in JSON format. Each day should include:
 
 - "date"
 - "title": short workout title in English (e.g., "Upper Body Strength")
@@ -79,7 +104,7 @@ Generate a {days}-day workout plan in JSON format. Each day should include:
 - "tags": comma-separated tags in English (e.g., "arms, strength")
 - "tags_spanish": comma-separated Spanish translation (e.g., "brazos, fuerza")
 - "workouts": list of 3–6 workouts (from the provided list), each with:
-    - workout_uid
+    - workout_uid (the workout's "id" from the list, e.g. "w1")
     - set_of
     - reps
 
@@ -102,26 +127,264 @@ Generate a {days}-day workout plan in JSON format. Each day should include:
 }}
 
 User profile:
-{json.dumps(profile_dict, indent=2)}
+{json.dumps(profile_dict, separators=(",", ":"))}
+
+Available workouts ("{DELIMITER}"-separated, min = minutes per workout, daily total ≤ {daily_duration_limit} minutes):
+{workout_table}
+{rotation}"""
+
+    return prompt_for, aliases
+
+
 
-Available workouts (duration ≤ {daily_duration_limit} minutes):
-{json.dumps(workouts[:200], indent=2)}
-"""
 
+def _complete_json(prompt):
     chat = openai.ChatCompletion.create(
         model="gpt-5-nano",
         response_format={"type": "json_object"},
         messages=[
-            {"role": "system", "content": "You are a helpful workout‑plan assistant."},
+            {"role": "system", "content": WORKOUT_PLAN_SYSTEM_PROMPT},
             {"role": "user", "content": prompt},
         ],
         # temperature=0.4,
     )
+    return json.loads(chat.choices[0].message.content)
+
+
+
+
+def plan_dates(days, start_date=None):
+    start_date = start_date or date.today()
+    return [(start_date + timedelta(days=i)).isoformat() for i in range(days)]
+
+
 
-    response_json = json.loads(chat.choices[0].message.content)
+
+def build_workout_plan(profile, training_data, workouts, days=15):
+    """
+    Ask the LLM for a workout plan (see workout_plan_prompt). With settings.PLAN_CHUNK_DAYS the
+    date range is requested in concurrent chunks that share the workout table, each asked to
+    favour a different share of it (rotation_hints).
+    """
+    prompt_for, aliases = workout_plan_prompt(profile, training_data, workouts)
+    date_list = plan_dates(days)
+    chunks = chunk_dates(date_list)
+    hints = rotation_hints([list(aliases)], len(chunks))
+
+    responses = run_chunks(lambda chunk, favoured: _complete_json(prompt_for(chunk, favoured)), chunks, hints)
+    plan_days = merge_chunk_days(responses, date_list, "workouts", "workout_uid")
 
     return {
-        "workout_plan_name": response_json.get("workout_plan_name", f"{days}-Day AI Workout Plan"),
-        "tags": response_json.get("tags", ""),
-        "days": response_json["days"],
+        "workout_plan_name": first_value(responses, "workout_plan_name", f"{days}-Day AI Workout Plan"),
+        "tags": first_value(responses, "tags", ""),
+        "days": resolve_aliases(plan_days, "workouts", "workout_uid", aliases),
     }
+
+
+
+
+def save_workout_plan(user, result, workouts, days=15):
+    """
+    Validate a generated plan and write WorkoutPlan, DailyWorkout and WorkoutEntry rows in
+    one transaction. Entries are bulk inserted, so WorkoutEntry.save() (and its per-entry
+    completion recount) is never called; DailyWorkout.completed is set directly instead.
+    Raises serializers.ValidationError before touching the database if the payload is invalid.
+    """
+    serializer = WorkoutPlanWriteSerializer(data=result)
+    serializer.is_valid(raise_exception=True)
+    data = serializer.validated_data
+
+    # Workouts are already evaluated by the caller, so this costs no query
+    uid_cache = {w.unique_id: w for w in workouts}
+    tags = data["tags"]
+    today = date.today()
+
+    with transaction.atomic():
+        workout_plan = WorkoutPlan.objects.create(
+            user=user,
+            workout_plan_name=data["workout_plan_name"],
+            tags=tags,
+            start_date=today,
+            end_date=today + timedelta(days=days - 1),
+        )
+
+        create_daily_workouts(workout_plan, data["days"], uid_cache, tags)
+
+    return workout_plan
+
+
+
+
+def create_daily_workouts(workout_plan, days_data, uid_cache, tags=""):
+    """Bulk insert validated days (DailyWorkoutWriteSerializer data) and their entries for `workout_plan`."""
+    daily_workouts = DailyWorkout.objects.bulk_create([
+        DailyWorkout(
+            workout_plan=workout_plan,
+            date=day["date"],
+            title=day.get("title") or f"Workout - {day['date']}",
+            title_spanish=day.get("title_spanish", day.get("title", "")),
+            tags=day.get("tags", tags),
+            tags_spanish=day.get("tags_spanish", day.get("tags", "")),
+            # Every entry of a freshly generated day starts as not completed
+            completed=False,
+            completed_count=0,
+            total_count=len(day["workouts"]),
+        )
+        for day in days_data
+    ])
+
+    entries = []
+    for daily, day in zip(daily_workouts, days_data):
+        for w in day["workouts"]:
+            entries.append(WorkoutEntry(
+                daily_workout=daily,
+                workout=uid_cache.get(w.get("workout_uid")),
+                completed=False,
+                set_of=w["set_of"],
+                reps=w["reps"],
+            ))
+    WorkoutEntry.objects.bulk_create(entries, batch_size=500)
+    return daily_workouts
+
+
+
+
+def generate_workout_plan(user, profile, training_data, days=15):
+    """
+    Generate and save a workout plan. `training_data` is TrainingDataSerializer's validated
+    data; its optional "engine" ("llm" or "local") defaults to settings.WORKOUT_PLAN_ENGINE.
+    LLM output is repaired by the local scheduler (duration, equipment, 3–6 workouts), and
+    the scheduler alone is used when requested or, with WORKOUT_PLAN_LOCAL_FALLBACK, when
+    the LLM call fails. LLM plans are memoized by fingerprint (userapi.plan_memo) and reused
+    ("memo") for matching inputs. Returns (workout_plan, engine_used).
+    """
+    # Get all valid workouts (evaluated once, reused for the prompt and the uid lookup)
+    workouts = list(Workout.objects.exclude(unique_id__isnull=True).exclude(unique_id__exact=""))
+
+    engine = training_data.get("engine") or settings.WORKOUT_PLAN_ENGINE
+    if engine == "llm":
+        # Reuse a plan generated for the same inputs (re-based to today) when there is one
+        fingerprint = None
+        if plan_memo.memo_enabled():
+            fingerprint = plan_memo.workout_fingerprint(profile, training_data)
+            memo = plan_memo.lookup_plan("workout", fingerprint)
+            if memo is not None and len(memo[0]["days"]) == days:
+                result = dict(memo[0], **local_plan_title(profile, training_data, workouts, days=days))
+                return save_workout_plan(user, result, workouts, days=days), "memo"
+
+        try:
+            result = build_workout_plan(profile, training_data, workouts, days=days)
+            result = repair_workout_plan(result, profile, training_data, workouts, days=days)
+            workout_plan = save_workout_plan(user, result, workouts, days=days)
+            if fingerprint:
+                plan_memo.store_plan("workout", fingerprint, result)
+            return workout_plan, engine
+        except Exception:
+            if not settings.WORKOUT_PLAN_LOCAL_FALLBACK:
+                raise
+            engine = "local"
+    if engine == "local":
+        result = build_local_workout_plan(profile, training_data, workouts, days=days)
+
+    return save_workout_plan(user, result, workouts, days=days), engine
+
+
+
+
+def stream_workout_plan(user, profile, training_data, days=15):
+    """
+    Generate a workout plan with a streamed LLM completion and persist every day as soon as
+    its JSON object is complete (after the scheduler's repair pass). Yields progress events:
+
+      {"event": "plan", "workout_plan_id"}
+      {"event": "day", "date", "daily_workout_id", "workouts"}
+      {"event": "done", "workout_plan_id", "days", "filled_locally", "engine"}
+      {"event": "error", "detail"}
+
+    Dates the LLM skipped are scheduled locally; if the LLM fails before the first day and
+    WORKOUT_PLAN_LOCAL_FALLBACK is off, an error event is sent. The plan is deleted unless
+    "done" is sent, also when the client goes away mid-stream.
+    """
+    workouts = list(Workout.objects.exclude(unique_id__isnull=True).exclude(unique_id__exact=""))
+    uid_cache = {w.unique_id: w for w in workouts}
+    scheduler = WorkoutScheduler(profile, training_data, workouts)
+    prompt_for, aliases = workout_plan_prompt(profile, training_data, workouts)
+    today = date.today()
+    date_list = plan_dates(days, today)
+
+    workout_plan = WorkoutPlan.objects.create(
+        user=user,
+        workout_plan_name=f"{days}-Day AI Workout Plan",
+        tags="",
+        start_date=today,
+        end_date=today + timedelta(days=days - 1),
+    )
+    finished = False
+    try:
+        yield {"event": "plan", "workout_plan_id": workout_plan.id}
+
+        def save_day(day):
+            serializer = DailyWorkoutWriteSerializer(data=day)
+            if not serializer.is_valid():
+                return None
+            daily = create_daily_workouts(workout_plan, [serializer.validated_data], uid_cache)[0]
+            return {"event": "day", "date": day["date"], "daily_workout_id": daily.id, "workouts": len(day["workouts"])}
+
+        saved = set()
+        parser = StreamingArrayParser("days")
+        error = None
+        try:
+            for text in stream_completion(
+                model="gpt-5-nano",
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": WORKOUT_PLAN_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt_for(date_list)},
+                ],
+            ):
+                for day in parser.feed(text):
+                    day_date = str(day.get("date"))
+                    if day_date not in date_list or day_date in saved:
+                        continue
+                    resolve_aliases([day], "workouts", "workout_uid", aliases)
+                    offset = date_list.index(day_date)
+                    event = save_day(scheduler.repair_day(offset, today + timedelta(days=offset), day))
+                    if event is None:
+                        continue  # scheduled locally below
+                    saved.add(day_date)
+                    yield event
+        except Exception as e:
+            error = e
+
+        if error is not None and not saved and not settings.WORKOUT_PLAN_LOCAL_FALLBACK:
+            yield {"event": "error", "detail": f"OpenAI error: {error}"}
+            return
+
+        header = parser.result()
+        WorkoutPlan.objects.filter(pk=workout_plan.pk).update(
+            workout_plan_name=str(header.get("workout_plan_name") or workout_plan.workout_plan_name)[:255],
+            tags=str(header.get("tags") or "")[:255],
+        )
+
+        for offset, day_date in enumerate(date_list):
+            if day_date not in saved:
+                event = save_day(scheduler.schedule_day(offset, today + timedelta(days=offset)))
+                if event is None:
+                    yield {"event": "error", "detail": f"Could not schedule {day_date} locally."}
+                    return
+                yield event
+
+        # Days were bulk inserted, which sends no signals for the chat context cache
+        invalidate_chat_context(user.pk)
+        finished = True
+        yield {
+            "event": "done",
+            "workout_plan_id": workout_plan.id,
+            "days": days,
+            "filled_locally": days - len(saved),
+            "engine": "llm" if len(saved) == days else "llm+local",
+        }
+    finally:
+        # Client gone, exception or error event: never leave a half-built plan behind
+        if not finished:
+            workout_plan.delete()
@@ -1,3 +1,189 @@
-from django.test import TestCase
+import uuid
+from datetime import date, timedelta
+from io import StringIO
+from types import SimpleNamespace
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User
+from workout.models import Workout, WorkoutSpanish
+from .models import WorkoutPlan, DailyWorkout, WorkoutEntry
+from .scheduler import (
+    MAX_WORKOUTS_PER_DAY, MIN_WORKOUTS_PER_DAY, build_local_workout_plan, muscle_groups_of, repair_workout_plan,
+)
+from .serializers import TrainingDataSerializer
 
 # Create your tests here.
+
+
+
+
+class CompletionCounterTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="u", email="u@example.com")
+        plan = WorkoutPlan.objects.create(user=user, workout_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        self.day = DailyWorkout.objects.create(workout_plan=plan, date=date.today(), title="Legs")
+        self.entries = [WorkoutEntry.objects.create(daily_workout=self.day) for _ in range(2)]
+
+    def state(self):
+        self.day.refresh_from_db()
+        return self.day.completed_count, self.day.total_count, self.day.completed
+
+    def test_day_is_completed_with_its_last_entry(self):
+        for entry in self.entries:
+            entry.completed = True
+            entry.save()
+        self.assertEqual(self.state(), (2, 2, True))
+        self.entries[1].completed = False
+        self.entries[1].save()
+        self.assertEqual(self.state(), (1, 2, False))
+        self.entries[1].delete()
+        self.assertEqual(self.state(), (1, 1, True))
+
+    def test_concurrent_toggles_count_once(self):
+        first, second = WorkoutEntry.objects.get(pk=self.entries[0].pk), WorkoutEntry.objects.get(pk=self.entries[0].pk)
+        first.completed = second.completed = True
+        first.save()
+        second.save()
+        self.assertEqual(self.state(), (1, 2, False))
+
+    def test_deleting_twice_counts_once(self):
+        first, second = WorkoutEntry.objects.get(pk=self.entries[0].pk), WorkoutEntry.objects.get(pk=self.entries[0].pk)
+        first.delete()
+        second.delete()
+        self.assertEqual(self.state(), (0, 1, False))
+
+    def test_marking_the_day_keeps_the_counters(self):
+        day = DailyWorkout.objects.get(pk=self.day.pk)
+        self.entries[0].completed = True
+        self.entries[0].save()
+        day.completed = True
+        day.save(update_fields=["completed"])
+        self.assertEqual(self.state(), (1, 2, True))
+
+    def test_backfill(self):
+        WorkoutEntry.objects.filter(pk=self.entries[0].pk).update(completed=True)
+        DailyWorkout.objects.filter(pk=self.day.pk).update(completed_count=0, total_count=0)
+        call_command("backfill_workout_counters", stdout=StringIO())
+        self.assertEqual(self.state()[:2], (1, 2))
+
+
+
+
+class TrainingDataSerializerTests(SimpleTestCase):
+    def test_daily_duration_is_bounded(self):
+        for minutes, valid in [(0, False), (4, False), (10, True), (240, True), (241, False)]:
+            with self.subTest(minutes=minutes):
+                serializer = TrainingDataSerializer(data={
+                    "fitness_level": "Basic", "train": "gym", "daily_duration_minutes": minutes,
+                })
+                self.assertEqual(serializer.is_valid(), valid)
+
+
+
+
+def _workout(uid, body_part, minutes=10, equipment="None"):
+    return Workout(
+        unique_id=uid, workout_name=uid, for_body_part=body_part, time_needed=timedelta(minutes=minutes),
+        workout_type="Strength", calories_burn=50, equipment_needed=equipment, benefits="",
+    )
+
+
+
+
+class WorkoutSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.profile = SimpleNamespace(at_home=None, at_gym=None, fitness_level="Basic")
+        self.workouts = [
+            _workout("push-up", "Chest"), _workout("bench", "Chest, Triceps"), _workout("raise", "Lateral deltoid"),
+            _workout("pulldown", "Lats"), _workout("row", "Upper back"), _workout("curl", "Arms"),
+            _workout("squat", "Legs"), _workout("lunge", "Thighs, Glutes"), _workout("wrist", "Forearms"),
+            _workout("burpee", "Full body", minutes=15), _workout("plank", "Core", minutes=5),
+        ]
+
+    def test_body_parts_match_whole_words(self):
+        for body_part, groups in [
+            ("Lats", {"back"}),
+            ("Lateral deltoid", {"shoulders"}),
+            ("Forearms", set()),
+            ("Warm-up", set()),
+            ("Arms", {"biceps", "triceps"}),
+            ("Legs", {"quadriceps", "hamstrings", "calves"}),
+            ("Calves", {"calves"}),
+            ("Legend press", set()),
+        ]:
+            with self.subTest(body_part=body_part):
+                self.assertEqual(muscle_groups_of(body_part), groups)
+
+    def test_days_fit_the_duration_budget(self):
+        plan = build_local_workout_plan(self.profile, {"daily_duration_minutes": 40, "chest": ["x"]}, self.workouts, days=4)
+        minutes = {w.unique_id: w.time_needed.total_seconds() / 60 for w in self.workouts}
+        for day in plan["days"]:
+            uids = [entry["workout_uid"] for entry in day["workouts"]]
+            with self.subTest(date=day["date"]):
+                self.assertTrue(MIN_WORKOUTS_PER_DAY <= len(uids) <= MAX_WORKOUTS_PER_DAY)
+                self.assertLessEqual(sum(minutes[uid] for uid in uids), 40)
+        self.assertNotIn("wrist", [entry["workout_uid"] for entry in plan["days"][0]["workouts"]])
+
+    def test_repair_drops_unknown_and_trims_to_the_budget(self):
+        llm_day = {"date": date.today().isoformat(), "title": "Chest Day", "workouts": [
+            {"workout_uid": uid, "set_of": 4, "reps": 8}
+            for uid in ["made-up", "push-up", "push-up", "bench", "burpee", "squat", "curl", "row"]
+        ]}
+        result = repair_workout_plan({"days": [llm_day]}, self.profile, {"daily_duration_minutes": 30}, self.workouts, days=1)
+        day = result["days"][0]
+        uids = [entry["workout_uid"] for entry in day["workouts"]]
+        self.assertEqual(day["title"], "Chest Day")
+        self.assertNotIn("made-up", uids)
+        self.assertEqual(len(uids), len(set(uids)))
+        self.assertLessEqual(sum(w.time_needed.total_seconds() / 60 for w in self.workouts if w.unique_id in uids), 30)
+        self.assertGreaterEqual(len(uids), MIN_WORKOUTS_PER_DAY)
+
+
+
+
+
+def _saved_workout_with_twin(name):
+    workout = _workout(str(uuid.uuid4()), "Chest")
+    workout.workout_name = name
+    workout.save()
+    WorkoutSpanish.objects.create(
+        unique_id=workout.unique_id, workout_name=f"ES {name}", time_needed=workout.time_needed, for_body_part="Pecho",
+        workout_type="Fuerza", calories_burn=50, equipment_needed="Ninguno", benefits="",
+    )
+    return workout
+
+
+
+
+@override_settings(CATALOG_TWIN_CACHE_SECONDS=0)
+class SpanishWorkoutViewQueryTests(TestCase):
+    """The Spanish workout views cost the same number of queries for 1 entry as for many."""
+
+    def day_with_entries(self, count):
+        user = User.objects.create_user(username=f"u{count}", email=f"u{count}@example.com")
+        plan = WorkoutPlan.objects.create(user=user, workout_plan_name="Plan", start_date=date.today(), end_date=date.today())
+        daily_workout = DailyWorkout.objects.create(workout_plan=plan, date=date.today())
+        for i in range(count):
+            WorkoutEntry.objects.create(daily_workout=daily_workout, workout=_saved_workout_with_twin(f"Workout {count}-{i}"))
+        client = APIClient()
+        client.force_authenticate(user)
+        return client, daily_workout
+
+    def queries(self, count, url_name, by_day=False):
+        client, daily_workout = self.day_with_entries(count)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse(url_name, args=[daily_workout.pk] if by_day else []))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f"ES Workout {count}-0", response.content.decode())
+        return len(queries)
+
+    def test_daily_workout_details(self):
+        self.assertEqual(self.queries(1, "spanish-daily-workout-details", by_day=True),
+                         self.queries(5, "spanish-daily-workout-details", by_day=True))
+
+    def test_todays_workouts(self):
+        self.assertEqual(self.queries(1, "spanish-today-workouts"), self.queries(5, "spanish-today-workouts"))
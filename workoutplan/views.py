@@ -1,16 +1,21 @@
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework import status,generics
+from rest_framework import status,generics,serializers
 from datetime import date, timedelta
 from workout.models import Workout
 from workout.serializers import WorkoutSerializer
 from .models import WorkoutPlan, DailyWorkout, WorkoutEntry
 from workout.models import Workout,WorkoutSpanish
+from recipe.twins import TwinResolver
 from accounts.models import Profile
 from accounts.permissions import IsUserRole
 from .serializers import TrainingDataSerializer,WorkoutEntrySerializer, WorkoutEntryUpdateSerializer
-from .services import build_workout_plan
+from .services import generate_workout_plan, stream_workout_plan
+from userapi.jobs import plan_conflict
+from userapi.models import PlanGenerationJob
+from django.http import StreamingHttpResponse
+import json
 from rest_framework.request import Request
 
 from drf_yasg.utils import swagger_auto_schema
@@ -31,7 +36,8 @@ class GenerateWorkoutPlanView(APIView):
         training preferences, and available workouts.
 
         🔐 Requires authentication  
-        🧠 Uses OpenAI (GPT-4)  
+        🧠 Uses OpenAI (GPT-4), or the local scheduler with `engine: "local"`  
+        ⏱️ Every day fits `daily_duration_minutes` and the user's equipment  
         📌 Saves full plan to database
         """,
         tags=["AI Workout Plan"],
@@ -43,7 +49,8 @@ class GenerateWorkoutPlanView(APIView):
                         "detail": "Workout plan created successfully",
                         "workout_plan_id": 101,
                         "workout_plan_name": "Lean Strength Plan",
-                        "tags": "strength,endurance,home"
+                        "tags": "strength,endurance,home",
+                        "engine": "llm"
                     }
                 }
             ),
@@ -55,14 +62,9 @@ class GenerateWorkoutPlanView(APIView):
     def post(self, request):
         user = request.user
         
-        active_workout_plan = WorkoutPlan.objects.filter(
-            user=user,
-            is_completed=False,
-            is_cancelled=False,
-        ).first()
-
-        if active_workout_plan:
-            return Response({"detail": "User already has an active workout plan."}, status=409)
+        conflict = plan_conflict(user, PlanGenerationJob.KIND_WORKOUT)
+        if conflict:
+            return Response({"detail": conflict}, status=409)
 
         # 1. Validate user profile
         try:
@@ -75,63 +77,74 @@ class GenerateWorkoutPlanView(APIView):
         serializer.is_valid(raise_exception=True)
         training_data = serializer.validated_data
 
-        # 3. Get all valid workouts
-        workouts_qs = Workout.objects.exclude(unique_id__isnull=True).exclude(unique_id__exact="")
-
-        # 4. Call OpenAI to build the plan
+        # 3. Build the plan (OpenAI + repair pass, or the local scheduler) and save WorkoutPlan,
+        #    DailyWorkout and WorkoutEntry rows in one transaction
         try:
-            result = build_workout_plan(profile, training_data, workouts_qs, days=15)
-            workout_plan_name = result.get("workout_plan_name", "15-Day AI Plan")
-            tags = result.get("tags", "")
-            plan_days = result.get("days", [])
+            workout_plan, engine = generate_workout_plan(user, profile, training_data, days=15)
+        except serializers.ValidationError as e:
+            return Response({"detail": "Generated workout plan is invalid.", "errors": e.detail}, status=500)
         except Exception as e:
             return Response({"detail": f"OpenAI error: {str(e)}"}, status=500)
 
-        # 5. Create WorkoutPlan instance
-        today = date.today()
-        workout_plan = WorkoutPlan.objects.create(
-            user=user,
-            workout_plan_name=workout_plan_name,
-            tags=tags,
-            start_date=today,
-            end_date=today + timedelta(days=14),
-        )
-
-        # 6. Cache workouts for quick lookup
-        uid_cache = {w.unique_id: w for w in workouts_qs}
-
-        # 7. Create DailyWorkout and WorkoutEntry entries
-        for day in plan_days:
-            daily = DailyWorkout.objects.create(
-                workout_plan=workout_plan,
-                date=day["date"],
-                title=day.get("title", f"Workout - {day['date']}"),
-                title_spanish=day.get("title_spanish", day.get("title", "")),
-                tags=day.get("tags", tags),
-                tags_spanish=day.get("tags_spanish", day.get("tags", "")),
-            )
-            for w in day.get("workouts", []):
-                workout = uid_cache.get(w["workout_uid"])
-                WorkoutEntry.objects.create(
-                    daily_workout=daily,
-                    workout=workout,
-                    completed=False,
-                    set_of=w.get("set_of", 1),
-                    reps=w.get("reps", 10)
-                )
-
-
-        # 8. Return response
+        # 4. Return response
         return Response({
             "detail": "Workout plan created successfully",
             "workout_plan_id": workout_plan.id,
-            "workout_plan_name": workout_plan_name,
-            "tags": tags
+            "workout_plan_name": workout_plan.workout_plan_name,
+            "tags": workout_plan.tags,
+            "engine": engine
         }, status=status.HTTP_201_CREATED)
 
 
 
 
+class GenerateWorkoutPlanStreamView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        request_body=TrainingDataSerializer,
+        operation_summary="Generate a 15-Day AI Workout Plan (streamed)",
+        operation_description="""
+        Same as the generate endpoint, but every day is repaired, saved and reported as soon as OpenAI
+        has produced it. Progress is streamed as newline-delimited JSON (`application/x-ndjson`):
+
+        - `{"event": "plan", "workout_plan_id": 101}`
+        - `{"event": "day", "date": "2025-08-05", "daily_workout_id": 9, "workouts": 4}`
+        - `{"event": "done", "workout_plan_id": 101, "days": 15, "filled_locally": 0, "engine": "llm"}`
+        - `{"event": "error", "detail": "..."}`
+        """,
+        tags=["AI Workout Plan"],
+        responses={
+            200: openapi.Response(description="NDJSON progress stream"),
+            400: openapi.Response(description="Invalid training data"),
+            404: openapi.Response(description="User profile not found"),
+            409: openapi.Response(description="User already has an active workout plan or one being generated"),
+        }
+    )
+    def post(self, request):
+        user = request.user
+
+        conflict = plan_conflict(user, PlanGenerationJob.KIND_WORKOUT)
+        if conflict:
+            return Response({"detail": conflict}, status=409)
+
+        try:
+            profile = user.profile
+        except Profile.DoesNotExist:
+            return Response({"detail": "Profile not found."}, status=404)
+
+        serializer = TrainingDataSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        events = (json.dumps(event) + "\n" for event in stream_workout_plan(user, profile, serializer.validated_data, days=15))
+        response = StreamingHttpResponse(events, content_type="application/x-ndjson")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+
+
 class ActiveWorkoutPlanView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -282,7 +295,7 @@ class CompleteTodayWorkoutView(APIView):
             return Response({"detail": "No workout scheduled for today."}, status=404)
 
         daily_workout.completed = completed
-        daily_workout.save()
+        daily_workout.save(update_fields=["completed"])
 
         return Response({
             "detail": f"Today's workout marked as {'completed' if completed else 'not completed'}.",
@@ -349,7 +362,8 @@ class SpanishDailyWorkoutDetailsView(APIView):
         except DailyWorkout.DoesNotExist:
             return Response({"detail": "Daily workout not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        workout_entries = WorkoutEntry.objects.filter(daily_workout=daily_workout).select_related('workout')
+        workout_entries = list(WorkoutEntry.objects.filter(daily_workout=daily_workout).select_related('workout'))
+        twins = TwinResolver(WorkoutSpanish).prefetch([entry.workout.unique_id for entry in workout_entries if entry.workout])
         
         total_duration_minutes = 0
         total_calories = 0
@@ -357,7 +371,7 @@ class SpanishDailyWorkoutDetailsView(APIView):
 
         for entry in workout_entries:
             workout = entry.workout
-            spanish_workout = WorkoutSpanish.objects.filter(unique_id=workout.unique_id).first()
+            spanish_workout = twins.get(workout.unique_id)
 
             if spanish_workout:
                 duration = spanish_workout.time_needed.total_seconds() // 60 if spanish_workout.time_needed else 0
@@ -392,7 +406,7 @@ class SpanishDailyWorkoutDetailsView(APIView):
         return Response({
             "workouts": response_data,
             "status": {
-                "total_workout": workout_entries.count(),
+                "total_workout": len(workout_entries),
                 "total_duration_minutes": total_duration_minutes,
                 "total_calories_burn": total_calories
             }
@@ -489,6 +503,7 @@ class SpanishWorkoutEntryListView(APIView):
             daily_workout__workout_plan__user=user,
             daily_workout__date=today
         ).select_related('daily_workout', 'workout')  # optimization
+        twins = TwinResolver(WorkoutSpanish).prefetch([entry.workout.unique_id for entry in entries if entry.workout])
 
         workouts_data = []
         total_duration = 0
@@ -501,9 +516,8 @@ class SpanishWorkoutEntryListView(APIView):
         for entry in entries:
             # Match WorkoutSpanish using unique_id
             if entry.workout:
-                try:
-                    spanish = WorkoutSpanish.objects.get(unique_id=entry.workout.unique_id)
-                except WorkoutSpanish.DoesNotExist:
+                spanish = twins.get(entry.workout.unique_id)
+                if spanish is None:
                     continue
 
                 duration_minutes = spanish.time_needed.total_seconds() / 60
@@ -524,7 +538,7 @@ class SpanishWorkoutEntryListView(APIView):
                         "calories_burn": float(spanish.calories_burn),
                         "equipment_needed": spanish.equipment_needed,
                         "tag": spanish.tag,
-                        "image" : request.build_absolute_uri(spanish.image.url) if spanish.image.url else None,
+                        "image" : request.build_absolute_uri(spanish.image.url) if spanish.image else None,
                         "benefits":spanish.benefits,
                         "unique_id":spanish.unique_id,
 